@@ -0,0 +1,162 @@
+"""Measure the accuracy of the estimates of the time remaining in a run.
+
+Replays a sequence of recorded test runs against each estimator. Every
+run is recorded into the history of the suite before the next one is
+replayed, so that later runs are estimated from the durations of earlier
+ones. After each test finishes, the estimate of the time remaining is
+compared with the time at which the run actually finished; the mean
+absolute error is reported, in seconds and as a proportion of the
+duration of the run.
+
+Recorded runs are the output streams of test workers, as captured with:
+
+    $ pytest --cricket=execute > run-1.stream
+
+If no streams are given, runs of a synthetic suite are generated. Most of
+its tests are quick, but a few are slow integration tests; some
+tests are added between runs, and each run is on a machine with a
+different speed.
+
+Usage:
+
+    $ python benchmarks/eta.py [--workers N] [stream ...]
+"""
+
+import argparse
+import random
+
+from tree_load import test_ids
+
+from cricket import protocol
+from cricket.eta import HistoryEstimator, MeanEstimator
+from cricket.executor import Executor, plan_shards
+from cricket.model import TestMethod
+from cricket.pytest.model import PyTestTestSuite
+
+ESTIMATORS = [("mean", MeanEstimator), ("history", HistoryEstimator)]
+
+
+def read_stream(path):
+    "Read the (path, start_time, end_time) of each test in a recorded stream"
+    parser = protocol.FrameParser()
+    with open(path, "rb") as f:
+        messages = parser.feed(f.read())
+
+    timings = []
+    test = None
+    for kind, body in messages:
+        if kind == protocol.TEST_START:
+            test = [body["path"], float(body["start_time"]), None]
+            timings.append(test)
+        elif kind == protocol.TEST_RESULT and test is not None:
+            test[2] = float(body["end_time"])
+    return [tuple(test) for test in timings if test[2] is not None]
+
+
+def synthetic_runs(count, runs, workers, seed=42):
+    "Generate runs of a synthetic suite, on `workers` workers"
+    rng = random.Random(seed)
+    ids = list(test_ids(count))
+    # One test in 200 is slow; every test has a typical duration.
+    typical = {
+        test_id: (
+            rng.uniform(0.5, 3.0)
+            if rng.random() < 0.005
+            else rng.lognormvariate(-5, 0.5)
+        )
+        for test_id in ids
+    }
+
+    recorded = []
+    for run in range(runs):
+        # 2% of the tests are new in each run.
+        present = ids[: int(count * (0.9 + 0.02 * run))]
+        speed = rng.uniform(0.7, 1.5)
+        suite = PyTestTestSuite()
+        suite.put_tests(present)
+        shards = [
+            sorted(test.path for test in tests)
+            for tests in queued_tests(suite, plan_shards(suite, None, workers))
+        ]
+
+        timings = []
+        for shard in shards:
+            now = 0.0
+            for test_id in shard:
+                duration = typical[test_id] * speed * rng.uniform(0.8, 1.2)
+                timings.append((test_id, now, now + duration))
+                now += duration
+        recorded.append((shards, timings))
+    return recorded
+
+
+def queued_tests(suite, shards):
+    executor = Executor(suite)
+    return [executor._queued_tests(shard) for shard in shards]
+
+
+def replay(suite, estimator, shards, timings):
+    """Replay a run against an estimator.
+
+    `shards` is a list of the test paths run by each worker; `timings` are
+    the (path, start_time, end_time) of every test in the run. Returns the
+    absolute error of each estimate, and the duration of the run.
+    """
+    suite.put_tests(path for path, _, _ in timings)
+    estimator.start(
+        [[suite.find_node(path) for path in shard] for shard in shards],
+        len(timings),
+    )
+    start = min(start for _, start, _ in timings)
+    end = max(end for _, _, end in timings)
+
+    errors = []
+    for path, start_time, end_time in sorted(timings, key=lambda timing: timing[2]):
+        estimator.finished(suite.find_node(path), start_time, end_time)
+        estimate = estimator.remaining()
+        if estimate is not None:
+            errors.append(abs(estimate - (end - end_time)))
+    return errors, end - start
+
+
+def record(suite, timings):
+    "Record the results of a run in the history of the suite"
+    for path, start_time, end_time in timings:
+        suite.find_node(path).set_result(
+            "", TestMethod.STATUS_PASS, None, None, end_time - start_time
+        )
+
+
+def main(streams, workers):
+    if streams:
+        recorded = []
+        for stream in streams:
+            timings = read_stream(stream)
+            recorded.append(([[path for path, *_ in timings]], timings))
+    else:
+        recorded = synthetic_runs(5000, 6, workers)
+
+    print(f"{'run':>4} {'duration':>10}", end="")
+    for name, _ in ESTIMATORS:
+        print(f" {name + ' error':>22}", end="")
+    print()
+
+    suites = {name: PyTestTestSuite() for name, _ in ESTIMATORS}
+    for run, (shards, timings) in enumerate(recorded, 1):
+        print(f"{run:>4}", end="")
+        for index, (name, Estimator) in enumerate(ESTIMATORS):
+            errors, duration = replay(suites[name], Estimator(), shards, timings)
+            record(suites[name], timings)
+            if index == 0:
+                print(f" {duration:>9.1f}s", end="")
+            mean = sum(errors) / len(errors) if errors else 0.0
+            print(f" {mean:>9.1f}s ({mean / duration:>7.1%})", end="")
+        print()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("streams", nargs="*")
+    options = parser.parse_args()
+    main(options.streams, options.workers)
@@ -0,0 +1,66 @@
+"""Benchmark finding the tests to execute for a selection of labels.
+
+This is the work done when "Run selected" is pressed: the selected nodes
+are reduced to the minimal set of labels that will execute them. Also
+measures running "all except a few" tests, where listing the tests that
+are excluded is much cheaper than listing those that are included.
+
+Usage:
+
+    $ python benchmarks/find_tests.py [count] [selected]
+"""
+
+import random
+import sys
+import time
+
+from tree_load import test_ids
+
+from cricket.pytest.model import PyTestTestSuite
+
+
+def main(count, selected):
+    suite = PyTestTestSuite()
+    suite.put_tests(test_ids(count))
+
+    rng = random.Random(42)
+    labels = set(rng.sample(list(suite._tests), selected))
+
+    start = time.perf_counter()
+    found, found_labels = suite.find_tests(labels=labels)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"Selected {selected} of {count} tests: "
+        f"{found} tests, {len(found_labels)} labels in {elapsed:.3f}s"
+    )
+
+    start = time.perf_counter()
+    suite.find_tests()
+    elapsed = time.perf_counter() - start
+    print(f"All {count} tests: {elapsed * 1_000_000:.1f}us")
+
+    for test_id in rng.sample(list(suite._tests), 5):
+        suite._tests[test_id].set_active(False)
+
+    start = time.perf_counter()
+    found, found_labels = suite.find_tests()
+    elapsed = time.perf_counter() - start
+    print(
+        f"All except 5 tests: {found} tests, "
+        f"{len(found_labels)} labels in {elapsed:.3f}s"
+    )
+
+    start = time.perf_counter()
+    found, found_labels, deselected = suite.find_selection()
+    elapsed = time.perf_counter() - start
+    print(
+        f"All except 5 tests, encoded compactly: {found} tests, "
+        f"{len(found_labels or [])} labels, {len(deselected)} deselected "
+        f"in {elapsed:.3f}s"
+    )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args) if args else main(100_000, 5_000)
@@ -0,0 +1,85 @@
+"""Benchmark parsing the output of a test run.
+
+Parses a synthetic stream of results, as written by the pytest plugin,
+feeding it to the parser in chunks of different sizes.
+
+Usage:
+
+    $ python benchmarks/protocol.py [count] [output_bytes]
+"""
+
+import os
+import platform
+import sys
+import time
+
+from tree_load import test_ids
+
+from cricket.protocol import (
+    RUN_END,
+    TEST_RESULT,
+    TEST_START,
+    FrameParser,
+    encode,
+)
+
+
+def make_stream(ids, output_bytes):
+    "The output of a run of the given tests"
+    output = ("x" * 79 + "\n") * (output_bytes // 80)
+    frames = []
+    for n, test_id in enumerate(ids):
+        frames.append(encode(TEST_START, {"path": test_id, "start_time": n}))
+        frames.append(
+            encode(
+                TEST_RESULT,
+                {
+                    "status": "OK",
+                    "end_time": n + 0.001,
+                    "description": test_id,
+                    "output": output,
+                },
+            )
+        )
+    frames.append(encode(RUN_END))
+    return "".join(frames).encode("ascii")
+
+
+def parse(stream, chunk_size):
+    parser = FrameParser()
+    results = 0
+    for pos in range(0, len(stream), chunk_size):
+        for kind, _body in parser.feed(stream[pos : pos + chunk_size]):
+            if kind == TEST_RESULT:
+                results += 1
+    return results
+
+
+def main(count, output_bytes):
+    stream = make_stream(list(test_ids(count)), output_bytes)
+    # Throughput depends heavily on the machine; report what it was.
+    print(
+        f"Python {platform.python_version()} on {platform.machine()}, "
+        f"{os.cpu_count()} CPUs ({platform.platform()})"
+    )
+    print(
+        f"Parsing {count} results, {output_bytes} bytes of output each "
+        f"({len(stream) / 1024 / 1024:.1f}MB)"
+    )
+    print(f"{'chunk':>10} {'time':>10} {'results/s':>12} {'MB/s':>10}")
+    for chunk_size in [4 * 1024, 64 * 1024, 256 * 1024]:
+        start = time.perf_counter()
+        results = parse(stream, chunk_size)
+        elapsed = time.perf_counter() - start
+        assert results == count
+        print(
+            f"{chunk_size // 1024:>8}KB {elapsed:>9.2f}s {count / elapsed:>12.0f} "
+            f"{len(stream) / elapsed / 1024 / 1024:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    count = int(args[0]) if args else 100_000
+    output_bytes = int(args[1]) if len(args) > 1 else 0
+    main(count, output_bytes)
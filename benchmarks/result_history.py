@@ -0,0 +1,41 @@
+"""Benchmark the result history of a large test suite.
+
+Records a number of runs for every test in a synthetic suite, and reports
+the time taken and the memory used by the history.
+
+Usage:
+
+    $ python benchmarks/result_history.py [count] [runs]
+"""
+
+import sys
+import time
+
+from tree_load import test_ids
+
+from cricket.model import TestMethod
+from cricket.pytest.model import PyTestTestSuite
+
+
+def main(count, runs):
+    suite = PyTestTestSuite()
+    suite.put_tests(test_ids(count))
+    tests = list(suite._tests.values())
+
+    start = time.perf_counter()
+    for run in range(runs):
+        status = TestMethod.STATUS_FAIL if run % 7 == 0 else TestMethod.STATUS_PASS
+        for test in tests:
+            test.set_result("", status, None, None, 0.01 * run)
+    elapsed = time.perf_counter() - start
+
+    nbytes = suite.history.nbytes
+    print(
+        f"{runs} runs of {count} tests in {elapsed:.2f}s; "
+        f"history uses {nbytes / 1024 / 1024:.1f}MB ({nbytes / count:.0f}B per test)"
+    )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:]]
+    main(*args) if args else main(100_000, 50)
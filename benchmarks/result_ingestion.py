@@ -0,0 +1,131 @@
+"""Benchmark the ingestion of test results during a run.
+
+Replays the output of a run of many quick tests through the executor,
+with a display and tree listener that simulate the cost of repainting
+the GUI. Compares delivering every result as it arrives with delivering
+results in batches at most once per update interval.
+
+Usage:
+
+    $ python benchmarks/result_ingestion.py [count] [repaint_ms]
+"""
+
+import asyncio
+import sys
+import tempfile
+import time
+
+from tree_load import test_ids
+
+from cricket.executor import Executor
+from cricket.protocol import RUN_END, TEST_RESULT, TEST_START, encode
+from cricket.pytest.model import PyTestTestSuite
+
+
+def busy_wait(duration):
+    "Simulate work (such as repainting a widget) that takes `duration` seconds"
+    end = time.perf_counter() + duration
+    while time.perf_counter() < end:
+        pass
+
+
+class ReplaySuite(PyTestTestSuite):
+    "A test suite that replays recorded output instead of running tests."
+
+    def __init__(self, output):
+        super().__init__()
+        self.output = output
+
+    def execute_commandline(self, labels, labels_file=None):
+        return ["cat", self.output]
+
+
+class RepaintingListener:
+    "A tree listener that repaints on every notification."
+
+    def __init__(self, repaint):
+        self.repaint = repaint
+        self.repaints = 0
+
+    def source_change(self, item):
+        self.repaints += 1
+        busy_wait(self.repaint)
+
+    def source_change_many(self, items):
+        self.repaints += 1
+        busy_wait(self.repaint)
+
+
+class Display:
+    "A display that repaints on every update."
+
+    def __init__(self, repaint):
+        self.repaint = repaint
+        self.repaints = 0
+
+    def executor_test_start(self, test_path):
+        self.repaints += 1
+        busy_wait(self.repaint)
+
+    def executor_test_end(self, test_path, result, remaining_time):
+        self.repaints += 1
+        busy_wait(self.repaint)
+
+    async def executor_suite_end(self, error=None):
+        pass
+
+
+def write_output(ids, file):
+    "Write the output of a run of the given tests, as the pytest plugin would."
+    for test_id in ids:
+        now = time.time()
+        file.write(encode(TEST_START, {"path": test_id, "start_time": now}))
+        file.write(
+            encode(
+                TEST_RESULT,
+                {
+                    "status": "OK",
+                    "end_time": now + 0.0001,
+                    "description": test_id,
+                    "output": "",
+                },
+            )
+        )
+    file.write(encode(RUN_END))
+    file.flush()
+
+
+def run(output, ids, interval, repaint):
+    suite = ReplaySuite(output)
+    suite.put_tests(ids)
+    listener = RepaintingListener(repaint)
+    suite.add_listener(listener)
+    display = Display(repaint)
+
+    executor = Executor(suite, display, interval=interval)
+    start = time.perf_counter()
+    asyncio.run(executor.run(len(ids), None))
+    elapsed = time.perf_counter() - start
+    return elapsed, listener.repaints + display.repaints
+
+
+def main(count, repaint_ms):
+    ids = list(test_ids(count))
+    with tempfile.NamedTemporaryFile("w", suffix=".txt") as output:
+        write_output(ids, output)
+
+        print(f"Ingesting {count} results; {repaint_ms}ms per repaint")
+        print(f"{'interval':>10} {'time':>10} {'results/s':>12} {'repaints':>10}")
+        for interval in [0, 0.05]:
+            elapsed, repaints = run(output.name, ids, interval, repaint_ms / 1000)
+            print(
+                f"{interval * 1000:>8.0f}ms {elapsed:>9.2f}s "
+                f"{count / elapsed:>12.0f} {repaints:>10}"
+            )
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    count = int(args[0]) if args else 30_000
+    repaint_ms = float(args[1]) if len(args) > 1 else 0.5
+    main(count, repaint_ms)
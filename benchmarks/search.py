@@ -0,0 +1,53 @@
+"""Benchmark searching for tests in a large test suite.
+
+Compares the name index used by ``TestSuite.search`` with a substring
+scan over the path of every test, for a selection of queries.
+
+Usage:
+
+    $ python benchmarks/search.py [count]
+"""
+
+import sys
+import time
+
+from tree_load import test_ids
+
+from cricket.pytest.model import PyTestTestSuite
+
+QUERIES = [
+    "te",
+    "package_42",
+    "test_module_7",
+    "TestCase3",
+    "test_module_7.py::TestCase3::test_method_1",
+    "nothing_matches",
+]
+
+
+def main(count):
+    suite = PyTestTestSuite()
+    start = time.perf_counter()
+    suite.put_tests(test_ids(count))
+    print(f"Loaded {count} tests in {time.perf_counter() - start:.2f}s")
+
+    paths = list(suite._tests)
+    print(f"{'query':>45} {'matches':>8} {'index':>10} {'scan':>10}")
+    for query in QUERIES:
+        start = time.perf_counter()
+        matches = suite.search(query)
+        indexed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        lower = query.lower()
+        [path for path in paths if lower in path.lower()]
+        scanned = time.perf_counter() - start
+
+        print(
+            f"{query:>45} {len(matches):>8} "
+            f"{indexed * 1000:>8.2f}ms {scanned * 1000:>8.2f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
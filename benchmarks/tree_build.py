@@ -0,0 +1,76 @@
+"""Benchmark the construction of a test tree with many siblings.
+
+A single test module containing a large number of (e.g., parametrized)
+tests is the worst case for building the tree, because every new test
+has to be inserted into the same list of children.
+
+This compares the insertion strategy used by ``TestNode`` with the
+"append, sort, then search" strategy it replaced.
+
+Usage:
+
+    $ python benchmarks/tree_build.py [size ...]
+"""
+
+import random
+import sys
+import time
+
+from cricket.model import TestMethod, TestNode
+from cricket.pytest.model import PyTestTestSuite
+
+
+class LegacyTestNode(TestNode):
+    "A test node that uses the original append/sort/index insertion strategy."
+
+    def _insert_child(self, label, child):
+        self._child_labels.append(label)
+        self._child_labels.sort()
+        index = self._child_labels.index(label)
+
+        self._child_nodes[label] = child
+
+        # The parent and count bookkeeping is the same for both strategies.
+        child._parent = self
+        self._add_counts(child._counts)
+        return index
+
+
+def build(node_class, labels):
+    "Insert a test for every label into a single node; return the elapsed time."
+    suite = PyTestTestSuite()
+    module = node_class(suite, "test_module.py", "test_module.py")
+    tests = [TestMethod(suite, f"test_module.py::{label}", label) for label in labels]
+
+    start = time.perf_counter()
+    for label, test in zip(labels, tests, strict=True):
+        module[label] = test
+    return time.perf_counter() - start
+
+
+def main(sizes):
+    rng = random.Random(42)
+    print(f"{'siblings':>10} {'legacy':>12} {'sorted':>12} {'speedup':>10}")
+    for size in sizes:
+        labels = [f"test_param[{i}]" for i in range(size)]
+        rng.shuffle(labels)
+
+        # The legacy strategy is quadratic; beyond a certain size,
+        # it takes too long to be worth measuring.
+        if size <= 20_000:
+            legacy = build(LegacyTestNode, labels)
+        else:
+            legacy = None
+        current = build(TestNode, labels)
+
+        if legacy is None:
+            print(f"{size:>10} {'(skipped)':>12} {current:>11.3f}s {'-':>10}")
+        else:
+            print(
+                f"{size:>10} {legacy:>11.3f}s {current:>11.3f}s "
+                f"{legacy / current:>9.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [1_000, 10_000, 100_000])
@@ -0,0 +1,75 @@
+"""Benchmark loading a large test suite into the test tree.
+
+Compares inserting tests one at a time with ``put_test`` (which notifies
+listeners of every new node) against the bulk ``put_tests`` path used by
+``TestSuite.refresh``. Reports the wall time, and the number of
+notifications a listener (such as the Tree widget) receives.
+
+Usage:
+
+    $ python benchmarks/tree_load.py [count]
+"""
+
+import sys
+import time
+
+from cricket.pytest.model import PyTestTestSuite
+
+
+class CountingListener:
+    "A listener that counts the notifications it receives."
+
+    def __init__(self):
+        self.count = 0
+
+    def source_insert(self, parent, index, item):
+        self.count += 1
+
+    def source_remove(self, parent, index, item):
+        self.count += 1
+
+    def source_change(self, item):
+        self.count += 1
+
+
+def test_ids(count):
+    """Generate `count` test ids, spread over packages, modules and test cases.
+
+    Each test case holds 10 tests, each module 10 test cases, and each
+    package 10 modules.
+    """
+    for n in range(count):
+        package, n = divmod(n, 1000)
+        module, n = divmod(n, 100)
+        case, method = divmod(n, 10)
+        yield (
+            f"tests/package_{package}/test_module_{module}.py"
+            f"::TestCase{case}::test_method_{method}"
+        )
+
+
+def load(bulk, count):
+    suite = PyTestTestSuite()
+    listener = CountingListener()
+    suite.add_listener(listener)
+
+    ids = list(test_ids(count))
+    start = time.perf_counter()
+    if bulk:
+        suite.put_tests(ids)
+    else:
+        for test_id in ids:
+            suite.put_test(test_id)
+    return time.perf_counter() - start, listener.count
+
+
+def main(count):
+    print(f"Loading {count} tests")
+    print(f"{'strategy':>10} {'time':>10} {'events':>10}")
+    for label, bulk in [("put_test", False), ("put_tests", True)]:
+        elapsed, events = load(bulk, count)
+        print(f"{label:>10} {elapsed:>9.3f}s {events:>10}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,43 @@
+"""Benchmark the memory used by the test tree.
+
+Loads a synthetic test suite, and uses tracemalloc to report the memory
+that is retained by the tree (including the index of test ids).
+
+Usage:
+
+    $ python benchmarks/tree_memory.py [count ...]
+"""
+
+import sys
+import tracemalloc
+
+from tree_load import test_ids
+
+from cricket.pytest.model import PyTestTestSuite
+
+
+def measure(count):
+    "Return the number of bytes retained by a suite of `count` tests."
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    suite = PyTestTestSuite()
+    suite.put_tests(test_ids(count))
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Make sure the suite is still alive when memory is measured.
+    assert suite.test_count == count
+    return after - before
+
+
+def main(counts):
+    print(f"{'tests':>10} {'total':>12} {'per test':>10}")
+    for count in counts:
+        total = measure(count)
+        print(f"{count:>10} {total / 1024 / 1024:>10.1f}MB {total / count:>9.0f}B")
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or [10_000, 100_000])
@@ -4,9 +4,11 @@ load a Test Suite for discovering and executing tests, and
 to initiate the GUI main loop.
 """
 
+import os
 from argparse import ArgumentParser
 
 from cricket.model import ModelLoadError
+from cricket.store import ResultStore
 from cricket.view import Cricket
 
 
@@ -21,6 +23,39 @@ def main(Model):
     parser.add_argument(
         "--version", help="Display version number and exit", action="store_true"
     )
+    parser.add_argument(
+        "--workers",
+        help="The number of test processes to run concurrently "
+        "(default: the number of CPUs)",
+        type=int,
+        default=os.cpu_count() or 1,
+    )
+    parser.add_argument(
+        "--timeout",
+        help="The time (in seconds) after which a test is stopped, and reported "
+        "as an error",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--output-timeout",
+        help="The time (in seconds) a test process can run without producing "
+        "output before it is stopped",
+        type=float,
+        default=None,
+    )
+    parser.add_argument(
+        "--results",
+        help="The file where test results are stored between sessions",
+        default=".cricket/results.sqlite3",
+    )
+    parser.add_argument(
+        "--no-results",
+        help="Don't load or store test results between sessions",
+        dest="results",
+        action="store_const",
+        const=None,
+    )
 
     options = parser.parse_args()
 
@@ -41,6 +76,8 @@ def main(Model):
         try:
             # Create the test_suite objects
             test_suite = Model(options)
+            if options.results:
+                test_suite.store = ResultStore(options.results)
             test_suite.refresh()
         except ModelLoadError as e:
             # Load failed; destroy the test_suite and show an error dialog.
@@ -54,6 +91,10 @@ def main(Model):
     else:
         app.ignorable_test_load_error = None
 
+    app.workers = options.workers
+    app.timeout = options.timeout
+    app.output_timeout = options.output_timeout
+
     # Set the test_suite for the main window.
     # This populates the tree, and sets listeners for
     # future tree modifications.
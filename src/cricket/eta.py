@@ -0,0 +1,205 @@
+"""Estimators for the time remaining in a test run.
+
+An estimator is told which tests have been queued on each worker when a
+run starts, and is then told about each test as it finishes; at any
+point, it can be asked how much longer the run is expected to take.
+"""
+
+from cricket.model import TestMethod
+
+# The limits on the correction applied to recorded durations, based on
+# how long the tests in the current run are actually taking.
+MIN_SCALE = 0.25
+MAX_SCALE = 4.0
+
+
+def format_remaining(seconds):
+    "Describe an amount of remaining time, for display"
+    if seconds is None:
+        return "unknown"
+    elif seconds > 7200:
+        return f"{int(seconds / 3600)} hours"
+    elif seconds > 3600:
+        return f"{int(seconds / 3600)} hour"
+    elif seconds > 120:
+        return f"{int(seconds / 60)} mins"
+    elif seconds > 60:
+        return f"{int(seconds / 60)} min"
+    else:
+        return f"{int(seconds)}s"
+
+
+class MeanEstimator:
+    """Estimate the time remaining from the average time per test so far.
+
+    The elapsed time of the run is divided by the number of tests that
+    have finished, and multiplied by the number that remain. This doesn't
+    need any history, but it swings wildly if a few tests are much slower
+    than the rest.
+    """
+
+    def start(self, shards, total):
+        """Start estimating a test run.
+
+        `shards` is a list with the tests queued on each worker; `total`
+        is the number of tests in the run.
+        """
+        self.total = total
+        self.completed = 0
+        self.start_time = None
+        self.end_time = None
+
+    def finished(self, test, start_time, end_time):
+        "A test has finished"
+        self.completed += 1
+        if self.start_time is None or start_time < self.start_time:
+            self.start_time = start_time
+        if self.end_time is None or end_time > self.end_time:
+            self.end_time = end_time
+
+    def shard_finished(self, index):
+        "The worker running a shard has finished"
+
+    def remaining(self):
+        "The expected time (in seconds) until the run is complete, or None"
+        if not self.completed:
+            return None
+        time_per_test = (self.end_time - self.start_time) / self.completed
+        return max(self.total - self.completed, 0) * time_per_test
+
+
+class HistoryEstimator:
+    """Estimate the time remaining from the recorded durations of tests.
+
+    Each queued test is expected to take as long as it has taken in its
+    recorded results. A test without a recorded duration is expected to
+    take the average time of the tests in the same module (or the closest
+    ancestor with recorded durations); if there are none at all, it is
+    expected to take the average time of the tests finished in this run.
+
+    Expected durations are corrected by the ratio of the actual and
+    expected durations of the tests that have finished, so that a run on
+    a slower (or busier) machine is estimated accurately.
+
+    Workers run their shards concurrently, so the time remaining is the
+    time remaining for the shard with the most work left.
+    """
+
+    def start(self, shards, total):
+        """Start estimating a test run.
+
+        `shards` is a list with the tests queued on each worker; `total`
+        is the number of tests in the run.
+        """
+        averages = {}
+        # The shard of each queued test, and its expected duration (or
+        # None, if there is nothing to base an expectation on).
+        self._queued = {}
+        # The recorded work remaining on each shard, and the number of
+        # tests remaining on each shard without an expected duration.
+        self._work = []
+        self._unknown = []
+        for index, tests in enumerate(shards):
+            work = 0.0
+            unknown = 0
+            for test in tests:
+                expected = _recorded_duration(test)
+                if expected is None:
+                    expected = _module_average(test, averages)
+                self._queued[test] = (index, expected)
+                if expected is None:
+                    unknown += 1
+                else:
+                    work += expected
+            self._work.append(work)
+            self._unknown.append(unknown)
+
+        # The actual and expected durations of the finished tests that
+        # had an expected duration, and the total duration of all the
+        # finished tests.
+        self._actual = 0.0
+        self._expected = 0.0
+        self._total_duration = 0.0
+        self._completed = 0
+
+    def finished(self, test, start_time, end_time):
+        "A test has finished"
+        duration = end_time - start_time
+        self._completed += 1
+        self._total_duration += duration
+
+        try:
+            index, expected = self._queued.pop(test)
+        except KeyError:
+            # The test wasn't expected to be part of the run.
+            return
+
+        if expected is None:
+            self._unknown[index] -= 1
+        else:
+            self._work[index] -= expected
+            self._actual += duration
+            self._expected += expected
+
+    def shard_finished(self, index):
+        "The worker running a shard has finished"
+        self._work[index] = 0.0
+        self._unknown[index] = 0
+
+    def remaining(self):
+        "The expected time (in seconds) until the run is complete, or None"
+        if self._expected > 0:
+            scale = min(max(self._actual / self._expected, MIN_SCALE), MAX_SCALE)
+        else:
+            scale = 1.0
+
+        if self._completed:
+            average = self._total_duration / self._completed
+        elif any(self._unknown):
+            # Nothing is known about some of the tests.
+            return None
+        else:
+            average = 0.0
+
+        return max(
+            (
+                max(work, 0.0) * scale + unknown * average
+                for work, unknown in zip(self._work, self._unknown, strict=True)
+            ),
+            default=0.0,
+        )
+
+
+def _recorded_duration(test):
+    "The average recorded duration of a test, or None if it hasn't been run"
+    durations = [duration for _status, duration in test.history]
+    if durations:
+        return sum(durations) / len(durations)
+
+    # Results that haven't been loaded from the result store yet are
+    # ignored, rather than loading them all when the run starts.
+    if test.result_loaded:
+        return test.duration
+    return None
+
+
+def _module_average(test, averages):
+    """The average duration of the tests near a test, or None if unknown.
+
+    The closest ancestor of the test with recorded durations is used.
+    Averages are cached in `averages`, keyed by node.
+    """
+    node = test.parent
+    while node is not None:
+        try:
+            average = averages[node]
+        except KeyError:
+            timed = node.test_count - node.count_tests(
+                status={TestMethod.STATUS_UNKNOWN}
+            )
+            average = node.duration / timed if timed else None
+            averages[node] = average
+        if average is not None:
+            return average
+        node = node.parent
+    return None
@@ -1,8 +1,41 @@
 import asyncio
-import json
-
+import heapq
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from collections import deque
+from pathlib import Path
+
+from cricket import eta, protocol
 from cricket.model import TestMethod
-from cricket.pipes import PipedTestResult, PipedTestRunner
+
+# The amount of output read from a test process at a time.
+CHUNK_SIZE = 256 * 1024
+
+# The number of lines of error output from the test processes that are
+# retained, and the longest line that is retained.
+ERROR_LINES = 500
+ERROR_LINE_LENGTH = 4096
+
+# The error reported for a test that was running when the test run was
+# stopped, or when its output ended.
+INTERRUPTED = "The test run was stopped while this test was running."
+INCOMPLETE = "The test output ended while this test was running."
+
+# The errors reported for a test that was stopped by the watchdog, because
+# it ran for too long, or because the test process stopped producing output.
+TIMED_OUT = "The test timed out after {timeout:g}s."
+NO_OUTPUT = "The test timed out after {timeout:g}s without output."
+
+# The time allowed for a test process to write a stack dump before it is
+# killed by the watchdog.
+DUMP_TIME = 0.5
+
+# The signal that can't be ignored (SIGKILL isn't defined on Windows).
+SIGKILL = getattr(signal, "SIGKILL", signal.SIGTERM)
 
 
 def enqueue_output(out, queue):
@@ -39,26 +72,151 @@ def parse_status_and_error(post):
     return status, error
 
 
+def plan_shards(test_suite, labels, workers):
+    """Split the tests identified by `labels` into shards for `workers` workers.
+
+    `labels` is a list of test labels (as returned by `TestSuite.find_tests`),
+    or None to run every test. Returns a list of (at most `workers`) label
+    lists, or `[labels]` if the tests can't be split.
+
+    Shards are balanced by the expected duration of their tests. The total
+    durations recorded on the test tree are used; tests that haven't been
+    run yet are expected to take the average duration of those that have.
+    Labels are split into the nodes below them until there are enough to
+    balance, and none of them is more than a small part of the total; they
+    are then allocated (largest first) to the least loaded shard.
+    """
+    if workers <= 1:
+        return [labels]
+
+    timed = len(test_suite.slowest_tests)
+    average = test_suite.duration / timed if timed else 1.0
+
+    def unit(seq, label, node):
+        if node is None:
+            weight = average
+        elif node.can_have_children():
+            untimed = node.count_tests(status={TestMethod.STATUS_UNKNOWN})
+            weight = node.duration + untimed * average
+        elif node.duration is None:
+            weight = average
+        else:
+            weight = node.duration
+        # Units are kept on a heap, largest first.
+        return (-weight, seq, label, node)
+
+    if labels is None:
+        units = [unit(0, None, test_suite)]
+    else:
+        units = [
+            unit(seq, label, test_suite.find_node(label))
+            for seq, label in enumerate(labels)
+        ]
+    heapq.heapify(units)
+
+    # Split the largest units, until there are enough to balance and
+    # none of them is a large part of the total. Units that can't be
+    # split are set aside. Like the keys of the heap, the limit is
+    # negative.
+    whole = []
+    seq = len(units)
+    limit = sum(weight for weight, *_ in units) / (workers * 4)
+    while units and (len(units) + len(whole) < workers * 4 or units[0][0] < limit):
+        item = heapq.heappop(units)
+        node = item[3]
+        if node is None or not node.can_have_children() or len(node) == 0:
+            whole.append(item)
+            continue
+        for child in node._child_nodes.values():
+            heapq.heappush(units, unit(seq, child.path, child))
+            seq += 1
+    units.extend(whole)
+
+    if len(units) == 1 and units[0][2] is None:
+        return [labels]
+
+    # Allocate each unit to the least loaded shard.
+    shards = [(0.0, index, []) for index in range(workers)]
+    for weight, _, label, _ in sorted(units):
+        load, index, shard_labels = heapq.heappop(shards)
+        shard_labels.append(label)
+        heapq.heappush(shards, (load - weight, index, shard_labels))
+
+    return [shard_labels for _, _, shard_labels in sorted(shards) if shard_labels]
+
+
+def _read_dump(dump_file):
+    "Read the stack dump written by a test process, if there is one"
+    if dump_file is None:
+        return ""
+    try:
+        return dump_file.read_text(encoding="utf-8", errors="replace").strip()
+    except FileNotFoundError:
+        return ""
+
+
+def _signal_group(proc, sig):
+    "Send a signal to the process group of a test process"
+    try:
+        if sys.platform == "win32":
+            # Process groups can only be interrupted on Windows; termination
+            # only applies to the process itself.
+            if sig == signal.SIGINT:
+                proc.send_signal(signal.CTRL_BREAK_EVENT)
+            else:
+                proc.kill()
+        else:
+            os.killpg(proc.pid, sig)
+    except ProcessLookupError:
+        # The process has already exited.
+        pass
+
+
 class Executor:
     "A wrapper around the subprocess that executes tests."
 
-    def __init__(self, test_suite, display=None):
+    def __init__(
+        self,
+        test_suite,
+        display=None,
+        interval=0.05,
+        workers=1,
+        estimator=None,
+        timeout=None,
+        output_timeout=None,
+    ):
         self.test_suite = test_suite
         self.display = display
 
-        # The TestMethod object currently under execution.
-        self.current_test = None
+        # The longest time (in seconds) that a test can run, and that a
+        # test process can run without producing output, before the test
+        # process is killed. The tests that remain are run in a new test
+        # process. None means there is no limit.
+        self.timeout = timeout
+        self.output_timeout = output_timeout
+
+        # The estimator of the time remaining in the test run.
+        self.estimator = eta.HistoryEstimator() if estimator is None else estimator
 
-        # An accumulator of ouput from the tests. If buffer is None,
-        # then the test suite isn't currently running - it's in suite
-        # setup/teardown.
-        self.buffer = None
+        # The minimum time (in seconds) between updates of the display.
+        # Results that arrive between updates are delivered together, by
+        # an update that is scheduled for the end of the interval.
+        self.interval = interval
+        self._last_update = 0
+        self._last_result = None
+        self._last_start = None
+        self._scheduled_update = None
 
-        # An accumulator for error output from the tests.
-        self.error_buffer = []
+        # The number of worker subprocesses to run concurrently,
+        # and the subprocesses that have been started.
+        self.workers = workers
+        self.procs = []
 
-        # The timestamp when current_test started
-        self.start_time = None
+        # Has the test run been stopped?
+        self.stopped = False
+
+        # The most recent lines of error output from the tests.
+        self.error_buffer = deque(maxlen=ERROR_LINES)
 
         # The count of tests that have been executed.
         self.completed_count = 0
@@ -66,153 +224,462 @@ class Executor:
         # The count of specific test results.
         self.result_count = {}
 
-    async def run(self, count, labels):
+    async def run(self, count, labels, deselected=()):
+        """Run the tests identified by `labels`, except those in `deselected`.
+
+        `count` is the number of tests that will be run. `labels` is None
+        to run every test.
+        """
         self.total_count = count
 
-        self.proc = await asyncio.create_subprocess_shell(
-            " ".join(self.test_suite.execute_commandline(labels)),
-            stdin=None,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-        )
+        # Recover the space used by the output of earlier runs
+        # that has since been replaced.
+        self.test_suite.payloads.compact()
+
+        # Results are delivered to the tree in batches.
+        self.test_suite.hold_changes()
+        try:
+            # Split the tests between the workers, and run the shards
+            # concurrently. Results are merged into the same test suite.
+            shards = plan_shards(self.test_suite, labels, self.workers)
+            self.estimator.start(
+                [self._queued_tests(shard, deselected) for shard in shards], count
+            )
+            errors = await asyncio.gather(
+                *(
+                    self._run_shard(index, shard, deselected)
+                    for index, shard in enumerate(shards)
+                )
+            )
+        finally:
+            # Deliver any results that haven't been displayed, even if the
+            # run failed, so that the tree isn't left holding changes.
+            self._update_display(force=True)
+            self.test_suite.release_changes()
+
+            # Make sure every result has been written to the result store.
+            if self.test_suite.store is not None:
+                self.test_suite.store.flush()
+
+        # If the output of any of the test processes stopped before the
+        # end of the test run, report the error output.
+        error = None
+        if any(errors):
+            error = "\n".join(
+                [message for message in errors if message] + list(self.error_buffer)
+            )
 
-        line = await self.proc.stdout.readline()
-        while line:
-            line = line.strip().decode("utf-8")
-            if line in {
-                PipedTestResult.RESULT_SEPARATOR,
-                PipedTestRunner.START_TEST_RESULTS,
-                PipedTestRunner.END_TEST_RESULTS,
-            }:
-                if self.buffer is None:
-                    # Preamble is finished. Set up the line buffer.
-                    self.buffer = []
-                else:
-                    # Start of new test result; record the last result
-                    # Then, work out what content goes where.
-                    pre = json.loads(self.buffer[0])
-                    if len(self.buffer) == 2:
-                        # No subtests are present, or only one subtest
-                        post = json.loads(self.buffer[1])
-                        status, error = parse_status_and_error(post)
-                    else:
-                        # We have subtests; capture the most important status
-                        # (until we can capture all the statuses)
-                        status = (
-                            TestMethod.STATUS_PASS
-                        )  # Assume pass until told otherwise
-                        error = ""
-                        for line_num in range(1, len(self.buffer)):
-                            post = json.loads(self.buffer[line_num])
-                            subtest_status, subtest_error = parse_status_and_error(post)
-                            status = max(status, subtest_status)
-                            if subtest_error:
-                                error += subtest_error + "\n\n"
-
-                    # Increase the count of executed tests
-                    self.completed_count = self.completed_count + 1
-
-                    # Get the start and end times for the test
-                    start_time = float(pre["start_time"])
-                    end_time = float(post["end_time"])
-
-                    self.current_test.set_result(
-                        description=post["description"],
-                        status=status,
-                        output=post.get("output"),
-                        error=error,
-                        duration=end_time - start_time,
+        # Update the display
+        if self.display:
+            await self.display.executor_suite_end(error=error)
+
+    def _queued_tests(self, labels, deselected=()):
+        "The test methods identified by `labels`, except those `deselected`"
+        if labels is None:
+            roots = [self.test_suite]
+        else:
+            roots = [self.test_suite.find_node(label) for label in labels]
+        excluded = {self.test_suite.find_node(label) for label in deselected}
+
+        tests = []
+        nodes = [node for node in roots if node is not None]
+        while nodes:
+            node = nodes.pop()
+            if node in excluded:
+                continue
+            if node.can_have_children():
+                nodes.extend(node._child_nodes.values())
+            else:
+                tests.append(node)
+        return tests
+
+    async def _run_shard(self, index, labels, deselected=()):
+        """Run the tests identified by `labels` in a worker subprocess.
+
+        `index` is the position of the shard in the test run. If a test
+        times out, the worker is killed, and the tests that haven't been
+        run yet are run in a new worker. Returns a description of the
+        error if the worker's output ended unexpectedly, or None.
+        """
+        watchdog = self.timeout is not None or self.output_timeout is not None
+        if labels is None and not deselected and not watchdog:
+            error, _ = await self._run_process(
+                self.test_suite.execute_commandline(None), []
+            )
+        else:
+            # The labels are passed to the worker in files, as there may be
+            # too many of them to pass as arguments.
+            with tempfile.TemporaryDirectory(prefix="cricket-") as directory:
+                options = {}
+                if labels is not None:
+                    options["labels_file"] = Path(directory) / "labels.txt"
+                    options["labels_file"].write_text(
+                        "".join(f"{label}\n" for label in labels), encoding="utf-8"
                     )
 
-                    # Work out how long the suite has left to run (approximately)
-                    if self.start_time is None:
-                        self.start_time = start_time
-                    total_duration = end_time - self.start_time
-                    time_per_test = total_duration / self.completed_count
-                    remaining_time = (
-                        self.total_count - self.completed_count
-                    ) * time_per_test
-                    if remaining_time > 4800:
-                        remaining = f"{int(remaining_time / 2400)} hours"
-                    elif remaining_time > 2400:
-                        remaining = f"{int(remaining_time / 2400)} hour"
-                    elif remaining_time > 120:
-                        remaining = f"{int(remaining_time / 60)} mins"
-                    elif remaining_time > 60:
-                        remaining = f"{int(remaining_time / 60)} min"
-                    else:
-                        remaining = f"{int(remaining_time)}s"
-
-                    # Update test result counts
-                    self.result_count.setdefault(status, 0)
-                    self.result_count[status] = self.result_count[status] + 1
-
-                    # Update the display
-                    if self.display:
-                        self.display.executor_test_end(
-                            test_path=self.current_test.path,
-                            result=status,
-                            remaining_time=remaining,
+                # The tests that have been started by earlier workers are
+                # deselected when a new worker resumes the shard.
+                started = []
+                attempt = 0
+                resume = True
+                while resume:
+                    attempt += 1
+                    if deselected or started:
+                        options["deselect_file"] = (
+                            Path(directory) / f"deselect-{attempt}.txt"
                         )
+                        options["deselect_file"].write_text(
+                            "".join(
+                                f"{label}\n"
+                                for group in (deselected, started)
+                                for label in group
+                            ),
+                            encoding="utf-8",
+                        )
+                    if watchdog:
+                        options["dump_file"] = Path(directory) / f"dump-{attempt}.txt"
+                        options["timeout"] = self.timeout
+                    error, resume = await self._run_process(
+                        self.test_suite.execute_commandline(labels, **options),
+                        started,
+                        dump_file=options.get("dump_file"),
+                    )
 
-                    # Clear the decks for the next test.
-                    self.current_test = None
-                    self.buffer = []
+        # Any tests in the shard that weren't run won't be run now.
+        self.estimator.shard_finished(index)
+        return error
+
+    async def _run_process(self, commandline, started, dump_file=None):
+        """Run a test subprocess, processing its results as they arrive.
+
+        The path of each test that is started is appended to `started`.
+        Returns a description of the error if the test process's output
+        ended unexpectedly (or None), and whether the test process was
+        killed by the watchdog, so that the remaining tests should be run
+        in a new test process. If the test process was started with a
+        `dump_file`, the stack dump that it writes when it is stopped by
+        the watchdog is added to the error of the test that was running.
+        """
+        # The TestMethod object currently under execution, the time it
+        # started, and the results it has reported.
+        current_test = None
+        start_time = None
+        results = []
+
+        if self.stopped:
+            return None, False
+
+        # Each test process is started in its own process group, so that
+        # it can be stopped along with any processes that it starts.
+        if sys.platform == "win32":
+            group = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+        else:
+            group = {"start_new_session": True}
+
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *commandline,
+                stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                **group,
+            )
+        except OSError as e:
+            # The test runner couldn't be started (e.g., it isn't installed).
+            return f"Unable to start {commandline[0]}: {e}", False
+        self.procs.append(proc)
+        if self.stopped:
+            # The run was stopped while the process was starting.
+            _signal_group(proc, SIGKILL)
+
+        # Error output is read concurrently, so that the test process
+        # can't be blocked by a full pipe.
+        drain = asyncio.create_task(self._drain_errors(proc.stderr))
+
+        parser = protocol.FrameParser()
+        finished = False
+
+        # The times (on the monotonic clock) when the current test started,
+        # and when the test process last produced output; and, once the
+        # watchdog has killed the test process, the reason why, and the
+        # test that was running.
+        test_started = None
+        last_output = time.monotonic()
+        timed_out = None
+        hung_test = None
+
+        while True:
+            try:
+                data = await asyncio.wait_for(
+                    proc.stdout.read(CHUNK_SIZE),
+                    None
+                    if timed_out
+                    else self._watchdog_delay(test_started, last_output),
+                )
+            except asyncio.TimeoutError:
+                if (
+                    self.timeout is not None
+                    and test_started is not None
+                    and (time.monotonic() - test_started >= self.timeout)
+                ):
+                    timed_out = TIMED_OUT.format(timeout=self.timeout)
+                else:
+                    timed_out = NO_OUTPUT.format(timeout=self.output_timeout)
+                hung_test = current_test
+                await self._kill_hung_process(proc, dump_file)
+                # Results that were written before the process was killed
+                # are still processed.
+                continue
+            if not data:
+                break
+            last_output = time.monotonic()
+
+            for kind, body in parser.feed(data):
+                if kind == protocol.TEST_RESULT:
+                    results.append(body)
+                    continue
+
+                # The start of a new test, or the end of the run, completes
+                # the current test.
+                if current_test is not None:
+                    self._complete_test(current_test, start_time, results)
+                current_test = None
+                test_started = None
+                results = []
+
+                if kind == protocol.TEST_START:
+                    current_test = self.test_suite.put_test(body["path"])
+                    start_time = float(body["start_time"])
+                    test_started = last_output
+                    started.append(current_test.path)
+
+                    # Update the display; if it has been updated
+                    # recently, the test is shown at the next update,
+                    # unless it has finished by then.
+                    self._last_start = current_test.path
+                    self._update_display()
+                else:
+                    finished = True
+
+        if current_test is not None:
+            error = None
+            if current_test is hung_test:
+                error = timed_out
+                dump = _read_dump(dump_file)
+                if dump:
+                    error += "\n\n" + dump
+            self._complete_test(current_test, start_time, results, error=error)
+
+        await drain
+        await proc.wait()
+
+        if finished or self.stopped:
+            return None, False
+
+        if timed_out:
+            if hung_test is None:
+                # The test process stopped before any test started; there
+                # is no test to skip, so it isn't restarted.
+                return timed_out, False
+            return None, True
+
+        # The test process stopped producing output before the end of the
+        # test run; any output that wasn't part of the results (such as an
+        # internal error from pytest) describes why.
+        unframed = parser.unframed.decode("utf-8", errors="replace").strip()
+        return unframed or "Test output ended unexpectedly", False
+
+    def _watchdog_delay(self, test_started, last_output):
+        "The time until the watchdog should stop the test process, or None"
+        deadlines = []
+        if self.timeout is not None and test_started is not None:
+            deadlines.append(test_started + self.timeout)
+        if self.output_timeout is not None:
+            deadlines.append(last_output + self.output_timeout)
+        if not deadlines:
+            return None
+        return max(min(deadlines) - time.monotonic(), 0)
+
+    async def _kill_hung_process(self, proc, dump_file):
+        "Kill a test process that has timed out, after it has dumped its stack"
+        if dump_file is not None:
+            # On Windows, the test process writes its dump when its own
+            # timer expires, as a signal can't be sent to request it.
+            if hasattr(signal, "SIGUSR1"):
+                try:
+                    proc.send_signal(signal.SIGUSR1)
+                except ProcessLookupError:
+                    pass
+            await asyncio.sleep(DUMP_TIME)
+        _signal_group(proc, SIGKILL)
+
+    async def _drain_errors(self, stream):
+        "Read the error output of a test process, retaining the last lines"
+        partial = b""
+        data = await stream.read(CHUNK_SIZE)
+        while data:
+            lines = (partial + data).split(b"\n")
+            partial = lines.pop()[:ERROR_LINE_LENGTH]
+            self.error_buffer.extend(
+                line[:ERROR_LINE_LENGTH].decode("utf-8", errors="replace")
+                for line in lines[-ERROR_LINES:]
+            )
+            data = await stream.read(CHUNK_SIZE)
+        if partial:
+            self.error_buffer.append(partial.decode("utf-8", errors="replace"))
+
+    def _complete_test(self, test, start_time, results, error=None):
+        """Record the results of a test that is no longer running.
+
+        If the test didn't report a result, it is recorded as an error. If
+        `error` is provided, it describes why the test was stopped, and
+        is recorded as an error in addition to any results it reported.
+        """
+        if error is not None or not results:
+            if error is None:
+                error = INTERRUPTED if self.stopped else INCOMPLETE
+            # The test was stopped before it reported its final result.
+            results = [
+                *results,
+                {
+                    "status": "E",
+                    "end_time": time.time(),
+                    "description": test.path,
+                    "error": error,
+                    "output": "",
+                },
+            ]
+        self._record_result(test, start_time, results)
+
+    def _record_result(self, test, start_time, results):
+        "Record the results reported by a test"
+        if len(results) == 1:
+            # No subtests are present, or only one subtest
+            post = results[0]
+            status, error = parse_status_and_error(post)
+        else:
+            # We have subtests; capture the most important status
+            # (until we can capture all the statuses)
+            status = TestMethod.STATUS_PASS  # Assume pass until told otherwise
+            error = ""
+            for post in results:
+                subtest_status, subtest_error = parse_status_and_error(post)
+                status = max(status, subtest_status)
+                if subtest_error:
+                    error += subtest_error + "\n\n"
+
+        # Increase the count of executed tests
+        self.completed_count = self.completed_count + 1
+
+        end_time = float(post["end_time"])
+        test.set_result(
+            description=post["description"],
+            status=status,
+            output=post.get("output"),
+            error=error,
+            duration=end_time - start_time,
+        )
+        if self.test_suite.store is not None:
+            self.test_suite.store.record(
+                test.path,
+                status=status,
+                duration=end_time - start_time,
+                description=post["description"],
+                output=post.get("output"),
+                error=error,
+            )
+
+        # Work out how long the suite has left to run (approximately)
+        self.estimator.finished(test, start_time, end_time)
+        remaining = eta.format_remaining(self.estimator.remaining())
+
+        # Update test result counts
+        self.result_count.setdefault(status, 0)
+        self.result_count[status] = self.result_count[status] + 1
 
-                    if line == PipedTestRunner.END_TEST_RESULTS:
-                        # End of test execution.
-                        # Mark the runner as finished, and move back
-                        # to a pre-test state in the results.
-                        self.buffer = None
+        # Update the display
+        self._last_result = (test.path, status, remaining)
+        if self._last_start == test.path:
+            self._last_start = None
+        self._update_display()
+
+    def _display_due(self):
+        "Has the display been updated within the update interval?"
+        return time.monotonic() - self._last_update >= self.interval
+
+    def _update_display(self, force=False):
+        """Deliver held changes, the latest result, and the latest test to
+        start, to the display.
+
+        Unless `force` is set, nothing is delivered if the display has been
+        updated within the update interval; instead, an update is scheduled
+        for the end of the interval, so that a slow test doesn't hold back
+        the results of the quick tests that ran before it.
+        """
+        if not (force or self._display_due()):
+            if self._scheduled_update is None:
+                self._scheduled_update = asyncio.get_running_loop().call_later(
+                    self.interval - (time.monotonic() - self._last_update),
+                    self._update_display,
+                    True,
+                )
+            return
+        if self._scheduled_update is not None:
+            self._scheduled_update.cancel()
+            self._scheduled_update = None
+        self._last_update = time.monotonic()
+
+        self.test_suite.flush_changes()
+        if self.display and self._last_result is not None:
+            test_path, result, remaining_time = self._last_result
+            self.display.executor_test_end(
+                test_path=test_path,
+                result=result,
+                remaining_time=remaining_time,
+            )
+        if self.display and self._last_start is not None:
+            self.display.executor_test_start(test_path=self._last_start)
+        self._last_result = None
+        self._last_start = None
+
+    async def terminate(self, timeout=5.0):
+        """Stop the executor.
+
+        Each test process (and any process it has started) is interrupted,
+        so that it can stop cleanly. Processes that haven't exited after
+        `timeout` seconds are terminated, and then killed if they still
+        haven't exited after another `timeout` seconds.
+
+        Results that have already been reported are retained; the tests
+        that were running are reported as errors.
+        """
+        self.stopped = True
+        await asyncio.gather(
+            *(self._stop_process(proc, timeout) for proc in self.procs)
+        )
 
+    def kill(self):
+        "Kill the test processes immediately, without waiting for them to exit"
+        self.stopped = True
+        for proc in self.procs:
+            if proc.returncode is None:
+                _signal_group(proc, SIGKILL)
+
+    async def _stop_process(self, proc, timeout):
+        "Stop a test process, escalating until it exits"
+        for sig in [signal.SIGINT, signal.SIGTERM]:
+            if proc.returncode is not None:
+                return
+            _signal_group(proc, sig)
+            try:
+                await asyncio.wait_for(proc.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
             else:
-                # Not a separator line, so it's actual content.
-                if self.buffer is not None:
-                    # Suite is running - have we got an active test?
-                    # Doctest (and some other tools) output invisible escape sequences.
-                    # Strip these if they exist.
-                    if line.startswith("\x1b"):
-                        line = line[line.find("{") :]
-
-                    # Store the cleaned buffer
-                    self.buffer.append(line)
-
-                    # If we don't have an currently active test, this line will
-                    # contain the path for the test.
-                    if self.current_test is None:
-                        try:
-                            # No active test; first line tells us which test is running.
-                            pre = json.loads(line)
-                            self.current_test = self.test_suite.put_test(pre["path"])
-
-                            # Update the display
-                            if self.display:
-                                self.display.executor_test_start(
-                                    test_path=self.current_test.path,
-                                )
-
-                        except ValueError:
-                            self.current_test = None
-                # else:
-                #     # We haven't started the suite yet;
-                #     # we're still collecting the preamble
-            line = await self.proc.stdout.readline()
+                return
 
-        # Update the display
-        if self.display:
-            await self.display.executor_suite_end()
-
-        # elif stopped:
-        #     # Suite has stopped producing output.
-        #     if self.error_buffer:
-        #         self.emit('suite_error', error='\n'.join(self.error_buffer))
-        #     else:
-        #         self.emit('suite_error', error='Test output ended unexpectedly')
-
-    async def terminate(self):
-        "Stop the executor."
-        self.proc.terminate()
-        await self.proc.wait()
+        _signal_group(proc, SIGKILL)
+        await proc.wait()
 
     @property
     def any_failed(self):
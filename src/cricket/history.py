@@ -0,0 +1,80 @@
+from array import array
+
+
+class ResultHistory:
+    """The recent results of every test in a suite.
+
+    Results are stored in flat arrays that are shared by all tests, rather
+    than in per-test lists of objects. Each test that has a result is given
+    an ordinal; the results for that test occupy `depth` consecutive slots,
+    used as a ring buffer, so only the most recent `depth` results are
+    retained.
+
+    Statuses are stored as a single byte (the status code divided by 100;
+    0 marks an empty slot), and durations as single precision floats. The
+    storage for 100k tests at a depth of 50 is a little over 25MB.
+    """
+
+    def __init__(self, depth=50):
+        self.depth = depth
+
+        self._statuses = array("B")
+        self._durations = array("f")
+        # The total number of results recorded for each ordinal.
+        self._counts = array("L")
+        # Ordinals that have been released, and can be reused.
+        self._free = []
+
+    def __len__(self):
+        "The number of ordinals in use"
+        return len(self._counts) - len(self._free)
+
+    @property
+    def nbytes(self):
+        "The number of bytes used to store results"
+        return sum(
+            data.itemsize * len(data)
+            for data in (self._statuses, self._durations, self._counts)
+        )
+
+    def allocate(self):
+        "Allocate an ordinal for a new test"
+        if self._free:
+            return self._free.pop()
+
+        self._statuses.frombytes(bytes(self.depth))
+        self._durations.frombytes(bytes(self.depth * self._durations.itemsize))
+        self._counts.append(0)
+        return len(self._counts) - 1
+
+    def release(self, ordinal):
+        "Discard the history of a test, making its ordinal available for reuse"
+        start = ordinal * self.depth
+        self._statuses[start : start + self.depth] = array("B", bytes(self.depth))
+        self._counts[ordinal] = 0
+        self._free.append(ordinal)
+
+    def record(self, ordinal, status, duration):
+        "Record a result for the test with the given ordinal"
+        count = self._counts[ordinal]
+        slot = ordinal * self.depth + count % self.depth
+        self._statuses[slot] = status // 100
+        self._durations[slot] = duration or 0.0
+        self._counts[ordinal] = count + 1
+
+    def count(self, ordinal):
+        "The total number of results recorded for a test (including discarded ones)"
+        return self._counts[ordinal]
+
+    def results(self, ordinal):
+        "The retained results of a test, as (status, duration) pairs, oldest first"
+        count = self._counts[ordinal]
+        start = ordinal * self.depth
+        if count <= self.depth:
+            slots = range(start, start + count)
+        else:
+            head = count % self.depth
+            slots = [
+                start + (head + offset) % self.depth for offset in range(self.depth)
+            ]
+        return [(self._statuses[slot] * 100, self._durations[slot]) for slot in slots]
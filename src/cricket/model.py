@@ -7,10 +7,17 @@ can bind to events on the model to be notified of changes.
 """
 
 import subprocess
+import sys
+from bisect import bisect_left
 
 import toga
 from toga.sources import Source
 
+from cricket.history import ResultHistory
+from cricket.payload import PayloadLog
+from cricket.ranking import Ranking
+from cricket.search import NameIndex
+
 
 class ModelLoadError(Exception):
     def __init__(self, trace):
@@ -18,7 +25,42 @@ class ModelLoadError(Exception):
         self.trace = trace
 
 
+# The icons used to display nodes in the test tree, keyed by resource path.
+_icons = {}
+
+
+def icon(path):
+    """Retrieve the icon for the resource at `path`.
+
+    The icon is loaded the first time it is requested; after that, the
+    same icon instance is shared by every node that displays it.
+    """
+    try:
+        return _icons[path]
+    except KeyError:
+        _icons[path] = toga.Icon(path)
+        return _icons[path]
+
+
 class TestNode:
+    # The tree can contain a very large number of nodes, so they don't
+    # have an instance __dict__. `_impl` is used by Toga's Tree widget.
+    __slots__ = (
+        "_child_labels",
+        "_child_nodes",
+        "_counts",
+        "_duration",
+        "_generation",
+        "_impl",
+        "_name",
+        "_parent",
+        "_path",
+        "_source",
+    )
+
+    # Should the path of the node be cached once it has been computed?
+    CACHE_PATH = True
+
     def __init__(self, source, path, name):
         super().__init__()
         self._child_labels = []
@@ -26,9 +68,19 @@ class TestNode:
 
         self._source = source
 
+        self._parent = None
         self._path = path
         self._name = name
-        self._active = True
+
+        # The discovery generation in which this node was last seen.
+        self._generation = 0
+
+        # Aggregate counts of the test methods below this node,
+        # keyed by (active, status).
+        self._counts = {}
+
+        # The total duration of the test methods below this node.
+        self._duration = 0.0
 
     ######################################################################
     # Methods required by the TreeSource interface
@@ -51,29 +103,55 @@ class TestNode:
     ######################################################################
 
     def __setitem__(self, label, child):
-        # Insert the item, sort the list,
-        # and find out where the item was inserted.
-        self._child_labels.append(label)
-        self._child_labels.sort()
-        index = self._child_labels.index(label)
-
-        self._child_nodes[label] = child
-
+        index = self._insert_child(label, child)
         self._source.notify("insert", parent=self, index=index, item=child)
 
     def __delitem__(self, label):
         # Find the label in the list of children, and remove it.
-        index = self._child_labels.index(label)
+        index = bisect_left(self._child_labels, label)
         child = self._child_nodes[label]
 
-        self._source.notify("remove", item=child)
         del self._child_labels[index]
         del self._child_nodes[label]
+        self._add_counts(child._counts, sign=-1)
+        if child._duration:
+            self._add_duration(-child._duration)
+        if child.can_have_children():
+            self._source._discard_durations(child)
+
+        # Listeners see the counts and rankings without the child; the
+        # child is only detached afterwards, so that listeners can still
+        # find where it was in the tree.
+        self._source.notify("remove", parent=self, index=index, item=child)
+        child._parent = None
+
+    def _insert_child(self, label, child):
+        """Add a child node, without notifying listeners.
+
+        Child labels are kept in sorted order, so the insertion point
+        can be found with a binary search. Returns the index at which
+        the child was inserted.
+        """
+        labels = self._child_labels
+        if not labels or labels[-1] < label:
+            # Discovery usually reports siblings in sorted order;
+            # in that case, the new label goes on the end.
+            index = len(labels)
+            labels.append(label)
+        else:
+            index = bisect_left(labels, label)
+            labels.insert(index, label)
+
+        self._child_nodes[label] = child
+
+        child._parent = self
+        self._add_counts(child._counts)
+        return index
 
     @property
     def path(self):
         "The dotted-path name that identifies this node to the test runner"
-        return self._path
+        return _node_path(self)
 
     @property
     def name(self):
@@ -82,8 +160,50 @@ class TestNode:
 
     @property
     def active(self):
-        "Is this test method currently active?"
-        return self._active
+        "Is any test method below this node currently active?"
+        return self.active_count > 0
+
+    @property
+    def partially_active(self):
+        "Are some, but not all, of the test methods below this node active?"
+        return 0 < self.active_count < self.test_count
+
+    def set_active(self, is_active):
+        """Explicitly set the active state of the node.
+
+        Forces all test methods below this node to the same active status.
+        """
+        delta = self._set_subtree_active(is_active)
+        if delta and self._parent is not None:
+            self._parent._add_counts(delta)
+
+    def toggle_active(self):
+        """Toggle the current active status of this node.
+
+        If any test method below this node is inactive, all of them are
+        made active; otherwise, all of them are made inactive.
+        """
+        self.set_active(self.active_count < self.test_count)
+
+    def _set_subtree_active(self, is_active):
+        """Set the active state of every test method below this node.
+
+        Updates the counts of this node and its descendants in a single
+        pass, and returns the change in this node's counts so that it can
+        be applied to the ancestors of this node.
+        """
+        if self.active_count == (self.test_count if is_active else 0):
+            # Every test method below this node is already in this state.
+            return {}
+
+        delta = {}
+        for child in self._child_nodes.values():
+            for key, count in child._set_subtree_active(is_active).items():
+                delta[key] = delta.get(key, 0) + count
+
+        for key, count in delta.items():
+            self._counts[key] = self._counts.get(key, 0) + count
+        return delta
 
     def find_tests(self, active=True, status=None, labels=None):
         """Find the test labels matching the search criteria.
@@ -96,71 +216,93 @@ class TestNode:
         Returns a count of tests found, plus the labels needed to
         execute those tests.
         """
+        return self._find_tests(active, status, self._selection(labels))
+
+    def find_selection(self, active=True, status=None, labels=None):
+        """Find the tests matching the search criteria, encoded compactly.
+
+        The criteria are the same as `find_tests()`. If most of the tests
+        below this node match, it is cheaper to list the tests that don't
+        match than those that do; the shorter of the two lists is used.
+
+        Returns a count of tests found, the labels needed to execute those
+        tests, and a list of labels for tests that must be deselected from
+        the tests identified by the labels.
+        """
+        selection = self._selection(labels)
+        count, included = self._find_tests(active, status, selection)
+        if included is None or len(included) <= 1:
+            return count, included, []
+
+        excluded = self._find_excluded(active, status, selection)
+        if len(excluded) + 1 < len(included):
+            return count, None if self.path is None else [self.path], excluded
+        return count, included, []
+
+    def _selection(self, labels):
+        "The part of the tree of selected `labels` that applies to this node"
+        if not labels:
+            return None
+
+        # Compile the labels into a tree of name components, then find
+        # the part of that tree that applies to this node.
+        selection = self._source.select_labels(labels)
+        ancestors = []
+        node = self
+        while node._parent is not None:
+            ancestors.append(node._name)
+            node = node._parent
+        for name in reversed(ancestors):
+            if selection is None:
+                break
+            selection = selection.get(name, {})
+        return selection
+
+    def _find_tests(self, active, status, selection):
+        """Find the tests below this node matching the search criteria.
+
+        `selection` is None if every test below this node has been
+        selected; otherwise, it is the part of the tree returned by
+        `TestSuite.select_labels()` that applies to this node.
+        """
+        # The aggregate counts tell us if every test below this node
+        # (or none of them) matches, without searching the subtree.
+        count = self.count_tests(active, status)
+        if selection is None and count == self.test_count:
+            return count, None
+        elif count == 0:
+            return 0, []
+
+        if selection is None:
+            # All tests have been requested, but at least one is excluded.
+            children = [
+                (self._child_nodes[label], None) for label in self._child_labels
+            ]
+            found_partial = False
+        else:
+            # Only search the children that have been selected.
+            children = [
+                (self._child_nodes[name], selection[name])
+                for name in sorted(selection)
+                if name in self._child_nodes
+            ]
+            # If any child hasn't been selected, this node is a partial match.
+            found_partial = len(children) < len(self._child_nodes)
+
         tests = []
         count = 0
-        found_partial = False
-        for child_node in self._child_nodes.values():
-            # If only active tests have been requested,
-            # the child node must be active.
-            # If only "status == X" tests have been requested,
-            # the child node must have that status.
-            if (
-                active
-                and not child_node.active
-                or status
-                and child_node.status not in status
-            ):
-                # There's at least one child marked inactive;
-                # this node is therefore a partial selection
-                subcount = 0
-                subtests = []
-                found_partial = True
+        for child_node, child_selection in children:
+            subcount, subtests = child_node._find_tests(active, status, child_selection)
+
+            # If subtests have been found, but the list of subtests
+            # is None, then this node's path can be provided as a
+            # specifier for "all subtests of this node"
+            if subtests is None:
+                subtests = [child_node.path]
             else:
-                if labels:
-                    # A specific set of tests has been requested.
-                    if child_node.path in labels:
-                        # This child node exactly matches a requested label.
-                        # Find *all* subtests of this node.
-                        subcount, subtests = child_node.find_tests(active, status)
-
-                        # If subtests have been found, but the list of subtests
-                        # is None, then this node's path can be provided as a
-                        # specifier for "all subtests of this node"
-                        if subtests is None:
-                            subtests = [child_node.path]
-                        else:
-                            # At least one descendent of this child is excluded
-                            # that means this node is a partial match.
-                            found_partial = True
-                    else:
-                        # Search children of this child for the provided labels.
-                        subcount, subtests = child_node.find_tests(
-                            active, status, labels
-                        )
-
-                        # If subtests have been found, but the list of subtests
-                        # is None, then this node's path can be provided as a
-                        # specifier for "all subtests of this node"
-                        if subtests is None:
-                            subtests = [child_node.path]
-                        else:
-                            # At least one descendent of this child is excluded
-                            # that means this node is a partial match.
-                            found_partial = True
-
-                else:
-                    # All tests have been requested.
-                    subcount, subtests = child_node.find_tests(active, status)
-
-                    # If subtests have been found, but the list of subtests
-                    # is empty, then this node's path can be provided as a
-                    # specifier for "all subtests of this node"
-                    if subtests is None:
-                        subtests = [child_node.path]
-                    else:
-                        # At least one descendent of this child is excluded
-                        # that means this node is a partial match.
-                        found_partial = True
+                # At least one descendent of this child is excluded
+                # that means this node is a partial match.
+                found_partial = True
 
             count = count + subcount
             tests.extend(subtests)
@@ -174,10 +316,137 @@ class TestNode:
         # Return the count of tests, and the labels needed to target them.
         return count, tests
 
+    def _find_excluded(self, active, status, selection):
+        """Find the labels of the tests below this node that don't match.
+
+        This is the complement of `_find_tests()`; it returns the labels of
+        the largest nodes that contain no matching tests.
+        """
+        count = self.count_tests(active, status)
+        if selection is None and count == self.test_count:
+            return []
+        elif count == 0:
+            return [self.path]
+
+        labels = []
+        for label in self._child_labels:
+            child_node = self._child_nodes[label]
+            if selection is None:
+                labels.extend(child_node._find_excluded(active, status, None))
+            elif label not in selection:
+                # Children that haven't been selected are excluded entirely.
+                labels.append(child_node.path)
+            else:
+                labels.extend(
+                    child_node._find_excluded(active, status, selection[label])
+                )
+        return labels
+
+    @property
+    def parent(self):
+        "The node that contains this node"
+        return self._parent
+
+    @property
+    def test_count(self):
+        "The number of test methods below this node"
+        return sum(self._counts.values())
+
+    @property
+    def active_count(self):
+        "The number of active test methods below this node"
+        return self.count_tests(active=True)
+
+    def count_tests(self, active=False, status=None):
+        """Count the test methods below this node matching the search criteria.
+
+        This will check:
+            * active: if the method is currently an active test
+            * status: if the last run status of the method is in the provided list
+
+        The count is computed from the aggregate counts held on this node,
+        so it doesn't require a search of the subtree.
+        """
+        return sum(
+            count
+            for (is_active, test_status), count in self._counts.items()
+            if (is_active or not active) and (not status or test_status in status)
+        )
+
+    def _add_counts(self, counts, sign=1):
+        """Add a set of test counts to this node, and all its ancestors.
+
+        `counts` is a dictionary of counts, keyed by (active, status).
+        If `sign` is -1, the counts are removed instead.
+        """
+        node = self
+        while node is not None:
+            node_counts = node._counts
+            for key, count in counts.items():
+                node_counts[key] = node_counts.get(key, 0) + sign * count
+            node = node._parent
+
+    @property
+    def duration(self):
+        "The total duration of the test methods below this node"
+        return self._duration
+
+    def _add_duration(self, duration):
+        """Add to the total duration of this node, and all its ancestors.
+
+        The ranking of the slowest nodes in the suite is kept up to date.
+        """
+        ranking = self._source.slowest_nodes
+        node = self
+        while node is not None:
+            node._duration += duration
+            if node._parent is not None:
+                ranking.update(node, node._duration)
+            node = node._parent
+
+
+def _node_path(node):
+    """Compute the path of a node.
+
+    A node that was constructed with an explicit path uses that path;
+    otherwise, the path is derived from the node's parent. If the node's
+    class allows it, the derived path is cached on the node.
+    """
+    path = node._path
+    if path is None and node._parent is not None:
+        path = node._source.join_path(node._parent, type(node), node._name)
+        if node.CACHE_PATH:
+            node._path = path
+    return path
+
+
+# A marker for a test whose result hasn't been loaded from the result store.
+_UNLOADED = object()
+
 
 class TestMethod:
     """A data representation of an individual test method."""
 
+    __slots__ = (
+        "_active",
+        "_description",
+        "_duration",
+        "_error",
+        "_generation",
+        "_impl",
+        "_name",
+        "_ordinal",
+        "_output",
+        "_parent",
+        "_path",
+        "_source",
+        "_status",
+    )
+
+    # Test methods are the bulk of the tree; their paths are derived
+    # from their parent each time they are needed.
+    CACHE_PATH = False
+
     STATUS_UNKNOWN = None
     STATUS_PASS = 100
     STATUS_SKIP = 200
@@ -189,27 +458,27 @@ class TestMethod:
     FAILING_STATES = (STATUS_FAIL, STATUS_UNEXPECTED_SUCCESS, STATUS_ERROR)
 
     def status_icon(self, status):
-        return {
-            self.STATUS_UNKNOWN: toga.Icon("resources/status/unknown.png"),
-            self.STATUS_PASS: toga.Icon("resources/status/pass.png"),
-            self.STATUS_SKIP: toga.Icon("resources/status/skip.png"),
-            self.STATUS_EXPECTED_FAIL: toga.Icon("resources/status/expected_fail.png"),
-            self.STATUS_UNEXPECTED_SUCCESS: toga.Icon(
-                "resources/status/unexpected_success.png"
-            ),
-            self.STATUS_FAIL: toga.Icon("resources/status/fail.png"),
-            self.STATUS_ERROR: toga.Icon("resources/status/error.png"),
-        }[status]
+        return icon(STATUS_ICONS[status])
 
     def __init__(self, source, path, name):
         self._source = source
 
+        self._parent = None
         self._path = path
         self._name = name
         self._active = True
 
-        # Test status
-        self._description = ""
+        # The discovery generation in which this test was last seen.
+        self._generation = 0
+
+        # The slot of this test in the result history of the suite;
+        # allocated when the first result is recorded.
+        self._ordinal = None
+
+        # Test status. If the suite has a result store, the stored result
+        # is loaded the first time the result is needed; until then, the
+        # test is counted as having an unknown status.
+        self._description = "" if source.store is None else _UNLOADED
         self._status = self.STATUS_UNKNOWN
         self._output = None
         self._error = None
@@ -231,19 +500,32 @@ class TestMethod:
 
     @property
     def path(self):
-        return self._path
+        return _node_path(self)
 
     @property
     def name(self):
         return self._name
 
+    @property
+    def parent(self):
+        "The node that contains this test method"
+        return self._parent
+
     @property
     def label(self):
         "The display label for the node"
         return (self.status_icon(self.status), self.name)
 
+    # The result getters don't load a stored result that hasn't been
+    # loaded yet; they are read while the tree is being drawn, which is no
+    # place to query the result store, or to notify listeners of a change.
+    # Stored results are loaded in batches by `TestSuite.load_results()`,
+    # or explicitly with `load_result()`.
+
     @property
     def description(self):
+        if self._description is _UNLOADED:
+            return ""
         return self._description
 
     @property
@@ -252,67 +534,194 @@ class TestMethod:
 
     @property
     def output(self):
-        return self._output
+        if self._output is None:
+            return None
+        return self._source.payloads.read(self._output)
 
     @property
     def error(self):
-        return self._error
+        if self._error is None:
+            return None
+        return self._source.payloads.read(self._error)
 
     @property
     def duration(self):
         return self._duration
 
+    @property
+    def result_loaded(self):
+        "Has the result of this test been set, or loaded from the result store?"
+        return self._description is not _UNLOADED
+
+    def load_result(self, result=_UNLOADED):
+        """Load the result of this test from the result store of the suite.
+
+        `result` is the (status, duration, description, output, error)
+        tuple that is stored for the test (or None if there is no stored
+        result). If it isn't provided, it is retrieved from the store.
+        """
+        if result is _UNLOADED:
+            result = self._source.store.get(self.path)
+
+        if result is None:
+            self._description = ""
+        else:
+            status, duration, description, output, error = result
+            self._update_counts(self._active, status)
+            self._description = description
+            self._set_payloads(output, error)
+            self._set_duration(duration)
+            self._record_history(status, duration)
+
+            self._source.notify("change", item=self)
+
+    @property
+    def history(self):
+        "The recent results of this test, as (status, duration) pairs, oldest first"
+        if self._ordinal is None:
+            return []
+        return self._source.history.results(self._ordinal)
+
     @property
     def active(self):
         "Is this test method currently active?"
         return self._active
 
+    @property
+    def _counts(self):
+        "The contribution of this test method to the counts of its ancestors"
+        return {(self._active, self._status): 1}
+
+    def _update_counts(self, active, status):
+        "Move this test method to a new (active, status) count on its ancestors"
+        if (active, status) != (self._active, self._status):
+            if self._parent is not None:
+                self._parent._add_counts(
+                    {(self._active, self._status): -1, (active, status): 1}
+                )
+            self._active = active
+            self._status = status
+
+    def _set_payloads(self, output, error):
+        """Write the output and error of the test to the payload log.
+
+        Only the record ids of the payloads are retained by the test.
+        """
+        payloads = self._source.payloads
+        self._release_payloads()
+        self._output = None if output is None else payloads.append(output)
+        self._error = None if error is None else payloads.append(error)
+
+    def _release_payloads(self):
+        "Release the payload records used by the test"
+        payloads = self._source.payloads
+        if self._output is not None:
+            payloads.release(self._output)
+            self._output = None
+        if self._error is not None:
+            payloads.release(self._error)
+            self._error = None
+
+    def _set_duration(self, duration):
+        """Set the duration of the test.
+
+        The total durations of the ancestors of the test, and the ranking of
+        the slowest tests in the suite, are kept up to date.
+        """
+        change = (duration or 0.0) - (self._duration or 0.0)
+        self._duration = duration
+
+        if duration is None:
+            self._source.slowest_tests.discard(self)
+        else:
+            self._source.slowest_tests.update(self, duration)
+        if change and self._parent is not None:
+            self._parent._add_duration(change)
+
+    def _record_history(self, status, duration):
+        "Add a result to the history of the test"
+        history = self._source.history
+        if self._ordinal is None:
+            self._ordinal = history.allocate()
+        history.record(self._ordinal, status, duration)
+
     def set_result(self, description, status, output, error, duration):
+        self._update_counts(self._active, status)
         self._description = description
-        self._status = status
-        self._output = output
-        self._error = error
-        self._duration = duration
+        self._set_payloads(output, error)
+        self._set_duration(duration)
+
+        self._record_history(status, duration)
 
         self._source.notify("change", item=self)
 
-    def set_active(self, is_active, cascade=True):
-        """Explicitly set the active state of the test method
+    def set_active(self, is_active):
+        """Explicitly set the active state of the test method.
 
-        If cascade is True, the parent testCase will be prompted
-        to check it's current active status.
+        The counts of every ancestor of the test method are updated.
         """
-        if self._active:
-            if not is_active:
-                self._active = False
-                if cascade:
-                    self.parent._update_active()
-        else:
-            if is_active:
-                self._active = True
-                if cascade:
-                    self.parent._update_active()
+        self._update_counts(is_active, self._status)
 
     def toggle_active(self):
         "Toggle the current active status of this test method"
         self.set_active(not self.active)
 
+    def _set_subtree_active(self, is_active):
+        """Set the active state of the test method, without updating ancestors.
+
+        Returns the change in counts that the parent must apply.
+        """
+        if self._active == is_active:
+            return {}
+        delta = {(self._active, self._status): -1, (is_active, self._status): 1}
+        self._active = is_active
+        return delta
+
     def find_tests(self, active=True, status=None, labels=None):
-        if labels:
-            if self.path in labels:
-                return 1, None
-            else:
-                return 0, []
-        else:
-            return 1, None
+        if labels and self.path not in labels:
+            return 0, []
+        return self._find_tests(active, status, None)
+
+    def _find_tests(self, active, status, selection):
+        # A selection that extends below a test method can't match it.
+        if selection is not None or not self.count_tests(active, status):
+            return 0, []
+        return 1, None
+
+    def _find_excluded(self, active, status, selection):
+        if selection is not None or not self.count_tests(active, status):
+            return [self.path]
+        return []
+
+    def count_tests(self, active=False, status=None):
+        "Return 1 if this test method matches the search criteria; 0 otherwise"
+        if active and not self._active:
+            return 0
+        if status and self._status not in status:
+            return 0
+        return 1
+
+
+# The resource path of the icon for each test status.
+STATUS_ICONS = {
+    TestMethod.STATUS_UNKNOWN: "resources/status/unknown.png",
+    TestMethod.STATUS_PASS: "resources/status/pass.png",
+    TestMethod.STATUS_SKIP: "resources/status/skip.png",
+    TestMethod.STATUS_EXPECTED_FAIL: "resources/status/expected_fail.png",
+    TestMethod.STATUS_UNEXPECTED_SUCCESS: "resources/status/unexpected_success.png",
+    TestMethod.STATUS_FAIL: "resources/status/fail.png",
+    TestMethod.STATUS_ERROR: "resources/status/error.png",
+}
 
 
 class TestCase(TestNode):
     """A data representation of a test case, wrapping multiple test methods."""
 
+    __slots__ = ()
+
     @property
     def TEST_CASE_ICON(self):
-        return toga.Icon("resources/test_case.png")
+        return icon("resources/test_case.png")
 
     def __repr__(self):
         return f"<TestCase {self.path}>"
@@ -322,56 +731,16 @@ class TestCase(TestNode):
         "The display label for the node"
         return (self.TEST_CASE_ICON, self.name)
 
-    def set_active(self, is_active, cascade=True):
-        """Explicitly set the active state of the test case.
-
-        Forces all methods on this test case to set to the same
-        active status.
-
-        If cascade is True, the parent test module will be prompted
-        to check it's current active status.
-        """
-        if self._active:
-            if not is_active:
-                self._active = False
-                # self.emit('inactive')
-                if cascade:
-                    self.parent._update_active()
-                for testMethod in self.values():
-                    testMethod.set_active(False, cascade=False)
-        else:
-            if is_active:
-                self._active = True
-                # self.emit('active')
-                if cascade:
-                    self.parent._update_active()
-                for testMethod in self.values():
-                    testMethod.set_active(True, cascade=False)
-
-    def toggle_active(self):
-        "Toggle the current active status of this test case"
-        self.set_active(not self.active)
-
-    def _update_active(self):
-        """Check the active status of all child nodes, and update the status
-        of this node accordingly"""
-        for testMethod in self.values():
-            if testMethod.active:
-                # As soon as we find an active child, this node
-                # must be marked active, and no other checks are
-                # required.
-                self.set_active(True)
-                return
-        self.set_active(False)
-
 
 class TestModule(TestNode):
     """A data representation of a module. It may contain test cases,
     or other modules."""
 
+    __slots__ = ()
+
     @property
     def TEST_MODULE_ICON(self):
-        return toga.Icon("resources/test_module.png")
+        return icon("resources/test_module.png")
 
     def __repr__(self):
         return f"<TestModule {self.path}>"
@@ -381,47 +750,6 @@ class TestModule(TestNode):
         "The display label for the node"
         return (self.TEST_MODULE_ICON, self.name)
 
-    def set_active(self, is_active, cascade=True):
-        """Explicitly set the active state of the test case.
-
-        Forces all test cases and test modules held by this test module
-        to be set to the same active status
-
-        If cascade is True, the parent test module will be prompted
-        to check it's current active status.
-        """
-        if self._active:
-            if not is_active:
-                self._active = False
-                # self.emit('inactive')
-                if cascade:
-                    self.parent._update_active()
-                for testModule in self.values():
-                    testModule.set_active(False, cascade=False)
-        else:
-            if is_active:
-                self._active = True
-                # self.emit('active')
-                if cascade:
-                    self.parent._update_active()
-                for testModule in self.values():
-                    testModule.set_active(True, cascade=False)
-
-    def toggle_active(self):
-        "Toggle the current active status of this test case"
-        self.set_active(not self.active)
-
-    def _purge(self, timestamp):
-        """Search all submodules and test cases looking for stale test methods.
-
-        Purge any test module without any test cases, and any test Case with no
-        test methods.
-        """
-        for testModule_name, testModule in self.items():
-            testModule._purge(timestamp)
-            if len(testModule) == 0:
-                self.pop(testModule_name)
-
 
 class TestSuite(TestNode, Source):
     """A data representation of a test suite, containing 1+ test cases."""
@@ -431,9 +759,109 @@ class TestSuite(TestNode, Source):
         self.errors = []
         self.coverage = False
 
+        # A flat index of every test method in the tree, keyed by test id.
+        self._tests = {}
+
+        # The recent results of every test method in the tree.
+        self.history = ResultHistory()
+
+        # The persistent store of results, if there is one.
+        self.store = None
+
+        # The output and errors produced by tests.
+        self.payloads = PayloadLog()
+
+        # The test methods, and the modules and test cases, that have
+        # taken the longest to run.
+        self.slowest_tests = Ranking()
+        self.slowest_nodes = Ranking()
+
+        # Incremented every time the suite is rediscovered; nodes are
+        # stamped with the generation in which they were last seen.
+        self._current_generation = 0
+
+        # An index of the names of every node in the tree.
+        self._index = NameIndex()
+
+        # The items with change notifications that are being held back;
+        # None if change notifications are delivered immediately. Holds
+        # can be nested; changes are held until every hold is released.
+        self._held_changes = None
+        self._hold_depth = 0
+
     def __repr__(self):
         return "<TestSuite>"
 
+    def close(self):
+        """Release the resources used by the suite.
+
+        Results that are waiting to be written are written to the result
+        store, and the result store and payload log are closed.
+        """
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+        self.payloads.close()
+
+    ######################################################################
+    # Notification batching
+    ######################################################################
+
+    def notify(self, notification, **kwargs):
+        if self._held_changes is not None:
+            if notification == "change":
+                self._held_changes[kwargs["item"]] = None
+                return
+            # Inserts and removals describe the current shape of the tree,
+            # so they can't be deferred; deliver them immediately, after any
+            # changes that were held, so listeners see events in order.
+            self.flush_changes()
+        super().notify(notification, **kwargs)
+
+    def hold_changes(self):
+        """Hold back change notifications until `flush_changes()` is called.
+
+        While changes are held, multiple changes to the same item are
+        coalesced into a single notification. Every call must be matched
+        by a call to `release_changes()`.
+        """
+        self._hold_depth += 1
+        if self._held_changes is None:
+            self._held_changes = {}
+
+    def flush_changes(self):
+        """Deliver any change notifications that have been held.
+
+        Listeners that implement `source_change_many(items)` receive all
+        the changes in a single call; other listeners receive a
+        `source_change(item)` notification for each changed item.
+        """
+        if not self._held_changes:
+            return
+
+        items = list(self._held_changes)
+        self._held_changes = {}
+        for listener in self.listeners:
+            change_many = getattr(listener, "source_change_many", None)
+            if change_many is not None:
+                change_many(items=items)
+            else:
+                change = getattr(listener, "source_change", None)
+                if change is not None:
+                    for item in items:
+                        change(item=item)
+
+    def release_changes(self):
+        """Release a hold on change notifications.
+
+        Once every hold has been released, any held changes are delivered,
+        and change notifications are no longer held back.
+        """
+        self._hold_depth -= 1
+        if self._hold_depth == 0:
+            self.flush_changes()
+            self._held_changes = None
+
     def refresh(self, test_list=None, errors=None):
         """Rediscover the tests in the test suite."""
         if test_list is None:
@@ -455,34 +883,258 @@ class TestSuite(TestNode, Source):
             if errors and not test_list:
                 raise ModelLoadError("\n".join(errors))
 
-        # datetime.now()
-
-        # Make sure there is a data representation for every test in the list.
-        for test_id in test_list:
-            self.put_test(test_id)
+        # Make sure there is a data representation for every test in the
+        # list, then remove any test that wasn't in the list.
+        self._current_generation += 1
+        self.put_tests(test_list)
+        self._sweep(self._current_generation)
 
         self.errors = errors if errors is not None else []
 
+    def select_labels(self, labels):
+        """Compile a collection of test labels into a tree of name components.
+
+        Each level of the tree is a dictionary, keyed by the name of a
+        node. The value is None if that node (and everything below it)
+        has been selected; otherwise, it is the tree of selections
+        below that node.
+        """
+        selection = {}
+        for label in labels:
+            try:
+                # If the label is a test id, the names can be read from the
+                # ancestors of the test, rather than parsing the label.
+                test = self._tests[label]
+            except KeyError:
+                parents = [part for _, part in self.split_test_id(label)]
+                name = parents.pop()
+            else:
+                name = test._name
+                parents = []
+                node = test._parent
+                while node is not self:
+                    parents.append(node._name)
+                    node = node._parent
+                parents.reverse()
+
+            node = selection
+            for part in parents:
+                node = node.setdefault(part, {})
+                if node is None:
+                    # An ancestor of this label has already been selected.
+                    break
+            else:
+                node[name] = None
+        return selection
+
     def put_test(self, test_id):
         """An idempotent insert method for tests.
 
         Ensures that a test identified as `test_id` exists in the test tree.
         """
+        try:
+            return self._tests[test_id]
+        except KeyError:
+            pass
+
         parent = self
 
         for NodeClass, part in self.split_test_id(test_id):
             try:
                 child = parent[part]
             except KeyError:
-                child = NodeClass(
-                    source=self, path=self.join_path(parent, NodeClass, part), name=part
-                )
+                # The same names occur many times in a test suite,
+                # so only keep one copy of each. The path of the
+                # node is derived from its parent.
+                part = sys.intern(part)
+                child = NodeClass(source=self, path=None, name=part)
+                child._generation = self._current_generation
+                self._index.add(child)
                 parent[part] = child
             parent = child
 
+        self._tests[test_id] = child
         return child
 
+    def put_tests(self, test_ids):
+        """An idempotent bulk insert method for tests.
+
+        Ensures that every test identified in `test_ids` exists in the test
+        tree. Listeners aren't notified as each node is created; once the
+        tree has been built, a single insert notification is emitted for
+        the root of each new subtree.
+
+        Every node on the path to each test is stamped with the current
+        discovery generation.
+        """
+        generation = self._current_generation
+        # Nodes that have been created by this call, and nodes whose
+        # list of children has been modified.
+        created = set()
+        modified = set()
+        # The (parent, label) pairs for the roots of new subtrees.
+        new_subtrees = []
+
+        for test_id in test_ids:
+            try:
+                node = self._tests[test_id]
+            except KeyError:
+                pass
+            else:
+                # The test already exists; stamp it and its ancestors. Stop
+                # at the first ancestor that has already been stamped.
+                while node is not None and node._generation != generation:
+                    node._generation = generation
+                    node = node._parent
+                continue
+
+            parent = self
+            for NodeClass, part in self.split_test_id(test_id):
+                try:
+                    child = parent[part]
+                except KeyError:
+                    part = sys.intern(part)
+                    child = NodeClass(source=self, path=None, name=part)
+                    # Don't sort the labels yet; that is done once
+                    # all the tests have been added.
+                    parent._child_labels.append(part)
+                    parent._child_nodes[part] = child
+                    child._parent = parent
+                    self._index.add(child)
+
+                    created.add(child)
+                    modified.add(parent)
+                    if parent not in created:
+                        new_subtrees.append((parent, part))
+                child._generation = generation
+                parent = child
+
+            self._tests[test_id] = child
+            if child in created:
+                child._parent._add_counts(child._counts)
+
+        for node in modified:
+            node._child_labels.sort()
+
+        # Notify listeners in order of index, so that every index
+        # is valid at the time the notification is received.
+        inserts = sorted(
+            (
+                (bisect_left(parent._child_labels, label), parent, label)
+                for parent, label in new_subtrees
+            ),
+            key=lambda insert: insert[0],
+        )
+        for index, parent, label in inserts:
+            self.notify("insert", parent=parent, index=index, item=parent[label])
+
+    def _sweep(self, generation):
+        """Remove every node that wasn't seen in the given discovery generation.
+
+        A single remove notification is emitted for the topmost node of each
+        stale subtree.
+        """
+        # Nodes that haven't been seen can't be in the index any more.
+        tests = {}
+        for test_id, test in self._tests.items():
+            if test._generation == generation:
+                tests[test_id] = test
+            else:
+                self._discard(test)
+        self._tests = tests
+
+        nodes = [self]
+        while nodes:
+            node = nodes.pop()
+            for label in list(node._child_labels):
+                child = node._child_nodes[label]
+                if child._generation != generation:
+                    del node[label]
+                elif child.can_have_children():
+                    nodes.append(child)
+
+    def _discard(self, test):
+        "Release the resources used by a test that has been removed"
+        if test._ordinal is not None:
+            self.history.release(test._ordinal)
+        test._release_payloads()
+        self.slowest_tests.discard(test)
+
+    def _discard_durations(self, node):
+        "Remove a node that has been removed (and the nodes below it) from the ranking"
+        nodes = [node]
+        while nodes:
+            node = nodes.pop()
+            if node.can_have_children():
+                self.slowest_nodes.discard(node)
+                nodes.extend(node._child_nodes.values())
+
+    def find_node(self, path):
+        "Find the node identified by `path`; returns None if it doesn't exist"
+        try:
+            return self._tests[path]
+        except KeyError:
+            pass
+
+        node = self
+        try:
+            for _NodeClass, part in self.split_test_id(path):
+                node = node[part]
+        except (KeyError, ValueError):
+            return None
+        return node
+
+    def search(self, query):
+        """Find the nodes whose path matches a search query.
+
+        See `NameIndex.search()` for the details of how queries are matched.
+        """
+        return self._index.search(query)
+
+    def load_results(self, batch_size=500):
+        """Load the stored results of every test that hasn't been loaded yet.
+
+        Results are retrieved from the result store in batches. This is a
+        generator that yields after each batch, so loading can be
+        interleaved with other work.
+        """
+        if self.store is None:
+            return
+
+        tests = [
+            (test_id, test)
+            for test_id, test in self._tests.items()
+            if not test.result_loaded
+        ]
+        # Deliver the changes for each batch together, unless changes
+        # are also being held by something else (e.g., a test run).
+        self.hold_changes()
+        try:
+            for start in range(0, len(tests), batch_size):
+                batch = tests[start : start + batch_size]
+                results = self.store.get_many(test_id for test_id, _ in batch)
+                for test_id, test in batch:
+                    # The test may have been given a result, or removed from
+                    # the tree, since the batch was prepared.
+                    if test._parent is not None and not test.result_loaded:
+                        test.load_result(results.get(test_id))
+                if self._hold_depth == 1:
+                    self.flush_changes()
+                yield
+        finally:
+            self.release_changes()
+
     def del_test(self, test_id):
+        """Remove the test identified as `test_id` from the test tree.
+
+        Any node that is left without children is also removed.
+        """
+        test = self._tests.pop(test_id, None)
+        if test is None:
+            # The test isn't in the tree.
+            return
+        self._discard(test)
+
         parent = self
         parents = []
         for _NodeClass, part in self.split_test_id(test_id):
@@ -504,7 +1156,7 @@ class TestSuite(TestNode, Source):
         # If at any point we find a parent with children,
         # we can bail (as the parent of a node with children
         # must also have children)
-        while parents:
+        while len(parents) > 1:
             child = parents.pop()
             if len(child) == 0:
                 del parents[-1][child.name]
@@ -512,10 +1164,215 @@ class TestSuite(TestNode, Source):
                 return
 
 
-class TestSuiteProblems(TestSuite):
-    def __init__(self, suite):
+class FilteredNode:
+    """A node in a filtered view of a test suite.
+
+    A filtered node wraps a node of the underlying test suite. Only the
+    children that lead to a test included in the view are visible; every
+    other attribute is read from the wrapped node, so result data is
+    never copied.
+    """
+
+    # `_impl` is used by Toga's Tree widget.
+    __slots__ = ("_child_labels", "_child_nodes", "_impl", "_node", "_parent")
+
+    def __init__(self, node, parent):
         super().__init__()
+        self._child_labels = []
+        self._child_nodes = {}
+
+        self._node = node
+        self._parent = parent
+
+    def __repr__(self):
+        return f"<Filtered {self._node!r}>"
+
+    def __getattr__(self, name):
+        # Private attributes (such as the implementation details that
+        # widgets attach to nodes) belong to the filtered node itself.
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self._node, name)
+
+    ######################################################################
+    # Methods required by the TreeSource interface
+    ######################################################################
+
+    def __len__(self):
+        return len(self._child_labels)
+
+    def __getitem__(self, index_or_name):
+        if isinstance(index_or_name, (int, slice)):
+            return self._child_nodes[self._child_labels[index_or_name]]
+        else:
+            return self._child_nodes[index_or_name]
+
+    def can_have_children(self):
+        return self._node.can_have_children()
+
+    ######################################################################
+    # Methods used by Cricket
+    ######################################################################
+
+    @property
+    def node(self):
+        "The node of the underlying test suite that this node wraps"
+        return self._node
+
+    def _insert_child(self, label, child):
+        "Add a child node in sorted order, returning its index"
+        index = bisect_left(self._child_labels, label)
+        self._child_labels.insert(index, label)
+        self._child_nodes[label] = child
+        return index
+
+
+class FilteredTestSuite(FilteredNode, Source):
+    """A view of a test suite that only contains some of its tests.
+
+    The view shares the nodes of the underlying suite, wrapping each of
+    them in a lightweight FilteredNode.
+    """
+
+    def __init__(self, suite):
+        super().__init__(suite, None)
         self.suite = suite
+
+        # The filtered node for each test in the view, keyed by test method.
+        self._tests = {}
+
+    def __repr__(self):
+        return "<FilteredTestSuite>"
+
+    def __getattr__(self, name):
+        # The root of the view doesn't stand in for the suite.
+        raise AttributeError(name)
+
+    def __contains__(self, test):
+        return test in self._tests
+
+    @property
+    def test_count(self):
+        "The number of tests in the view"
+        return len(self._tests)
+
+    def add(self, test):
+        """Add a test method of the underlying suite to the view.
+
+        Filtered nodes are created for any ancestors of the test that
+        aren't already in the view. A single insert notification is
+        emitted, for the topmost node that was created.
+
+        Returns the filtered node for the test.
+        """
+        try:
+            return self._tests[test]
+        except KeyError:
+            pass
+
+        parent, index, item = self._add(test)
+        self.notify("insert", parent=parent, index=index, item=item)
+        return self._tests[test]
+
+    def _add(self, test):
+        """Add a test method to the view, without notifying listeners.
+
+        Returns the (parent, index, node) of the topmost node that was
+        created.
+        """
+        ancestors = []
+        node = test
+        while node is not self.suite:
+            ancestors.append(node)
+            node = node._parent
+
+        parent = self
+        new_subtree = None
+        for node in reversed(ancestors):
+            try:
+                child = parent._child_nodes[node._name]
+            except KeyError:
+                child = FilteredNode(node, parent)
+                index = parent._insert_child(node._name, child)
+                if new_subtree is None:
+                    new_subtree = (parent, index, child)
+            parent = child
+
+        self._tests[test] = child
+        return new_subtree
+
+    def reset(self, tests):
+        """Replace the contents of the view with the given test methods.
+
+        Listeners are notified that the view has been cleared, and then of
+        the insertion of each top level node.
+        """
+        self._child_labels = []
+        self._child_nodes = {}
+        self._tests = {}
+        self.notify("clear")
+
+        for test in tests:
+            if test not in self._tests:
+                self._add(test)
+
+        for index, label in enumerate(self._child_labels):
+            self.notify("insert", parent=self, index=index, item=self[label])
+
+    def remove(self, node):
+        """Remove a node of the underlying suite from the view.
+
+        Every test below the node is removed, along with any ancestor that
+        is left without children. A single remove notification is emitted,
+        for the topmost node that was removed.
+        """
+        filtered = self._find(node)
+        if filtered is None:
+            return
+
+        # Forget every test below the filtered node.
+        nodes = [filtered]
+        while nodes:
+            node = nodes.pop()
+            if node._node.can_have_children():
+                nodes.extend(node._child_nodes.values())
+            else:
+                del self._tests[node._node]
+
+        while filtered._parent is not self and len(filtered._parent) == 1:
+            filtered = filtered._parent
+
+        parent = filtered._parent
+        label = filtered._node._name
+        index = bisect_left(parent._child_labels, label)
+        self.notify("remove", parent=parent, index=index, item=filtered)
+        del parent._child_labels[index]
+        del parent._child_nodes[label]
+
+    def _find(self, node):
+        "Find the filtered node wrapping a node of the underlying suite"
+        if not node.can_have_children():
+            return self._tests.get(node)
+
+        ancestors = []
+        while node is not self.suite:
+            ancestors.append(node._name)
+            node = node._parent
+
+        filtered = self
+        for name in reversed(ancestors):
+            try:
+                filtered = filtered._child_nodes[name]
+            except KeyError:
+                return None
+        return filtered
+
+
+class TestSuiteProblems(FilteredTestSuite):
+    """A view of the tests in a test suite that aren't passing."""
+
+    def __init__(self, suite):
+        super().__init__(suite)
         # Listen to any changes on the test suite
         self.suite.add_listener(self)
 
@@ -525,20 +1382,144 @@ class TestSuiteProblems(TestSuite):
     def source_change(self, item):
         if item.status in TestMethod.FAILING_STATES:
             # Test didn't pass. Make sure it exists in the problem tree.
-            failing_item = self.put_test(item.path)
-
-            failing_item.set_result(
-                description=item.description,
-                status=item.status,
-                output=item.output,
-                error=item.error,
-                duration=item.duration,
-            )
+            try:
+                # The result has changed; make sure it is redisplayed.
+                self.notify("change", item=self._tests[item])
+            except KeyError:
+                self.add(item)
         else:
-            self.del_test(item.path)
+            # If the test has never failed, this is a no-op.
+            self.remove(item)
+
+    def source_remove(self, parent, index, item):
+        # Tests that have been removed from the suite are no longer problems.
+        self.remove(item)
+
+
+class TestSuiteSearch(FilteredTestSuite):
+    """A view of the tests in a test suite that match a search query."""
+
+    def __init__(self, suite):
+        super().__init__(suite)
+        self.query = ""
+        # Listen to any changes on the test suite
+        self.suite.add_listener(self)
+
+    def __repr__(self):
+        return "<TestSuiteSearch>"
+
+    def search(self, query):
+        """Show the tests whose path matches `query`.
+
+        Every test under a node that matches the query is shown. Tests
+        that are discovered later are shown when the query is next changed.
+        """
+        self.query = query
+
+        tests = []
+        nodes = self.suite.search(query)
+        while nodes:
+            node = nodes.pop()
+            if node.can_have_children():
+                nodes.extend(node._child_nodes.values())
+            else:
+                tests.append(node)
+        self.reset(tests)
+
+    def source_change(self, item):
+        # Make sure a changed result is redisplayed.
+        try:
+            self.notify("change", item=self._tests[item])
+        except KeyError:
+            pass
+
+    def source_remove(self, parent, index, item):
+        # Tests that have been removed from the suite are no longer matches.
+        self.remove(item)
+
+
+class RankedNode(FilteredNode):
+    """A node in a ranking of the slowest parts of a test suite."""
+
+    __slots__ = ()
+
+    def __repr__(self):
+        return f"<Ranked {self._node!r}>"
+
+    @property
+    def duration_label(self):
+        "The duration of the node, for display"
+        return f"{self._node.duration:0.2f}s"
+
+
+class TestSuiteSlowest(Source):
+    """The slowest nodes in a test suite, slowest first.
+
+    The list is updated as results are reported; `ranking` is one of the
+    rankings maintained by the suite, and `size` is the number of nodes
+    in the list.
+    """
+
+    def __init__(self, suite, ranking, size=50):
+        super().__init__()
+        self.suite = suite
+        self.ranking = ranking
+        self.size = size
+
+        self._rows = []
+        self.refresh()
+
+        # Listen to any changes on the test suite
+        self.suite.add_listener(self)
+
+    def __repr__(self):
+        return "<TestSuiteSlowest>"
+
+    ######################################################################
+    # Methods required by the ListSource interface
+    ######################################################################
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __getitem__(self, index):
+        return self._rows[index]
+
+    def index(self, row):
+        return self._rows.index(row)
+
+    ######################################################################
+    # Methods used by Cricket
+    ######################################################################
+
+    def refresh(self, changed=()):
+        """Update the list from the ranking.
+
+        If the slowest nodes have changed, the list is rebuilt. Otherwise,
+        listeners are notified of a change to the rows for any of the
+        `changed` test methods, or for any of their ancestors.
+        """
+        nodes = self.ranking.top(self.size)
+        if nodes != [row._node for row in self._rows]:
+            self._rows = [RankedNode(node, None) for node in nodes]
+            self.notify("clear")
+            for index, row in enumerate(self._rows):
+                self.notify("insert", index=index, item=row)
+        elif changed:
+            affected = set()
+            for node in changed:
+                while node is not None and node not in affected:
+                    affected.add(node)
+                    node = node._parent
+            for row in self._rows:
+                if row._node in affected:
+                    self.notify("change", item=row)
+
+    def source_change(self, item):
+        self.refresh([item])
 
-    def split_test_id(self, test_id):
-        return self.suite.split_test_id(test_id)
+    def source_change_many(self, items):
+        self.refresh(items)
 
-    def join_path(self, parent, klass, part):
-        return self.suite.join_path(parent, klass, part)
+    def source_remove(self, parent, index, item):
+        self.refresh()
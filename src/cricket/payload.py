@@ -0,0 +1,217 @@
+import hashlib
+import mmap
+import re
+import tempfile
+from array import array
+
+# Details that vary between otherwise identical payloads, such as
+# object addresses and timestamps, are ignored when grouping payloads.
+NORMALIZE_PATTERNS = [
+    (re.compile(rb"\bat 0x[0-9a-fA-F]{6,16}\b"), b"at 0x?"),
+    (
+        re.compile(rb"\b\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"),
+        b"?-?-? ?:?:?",
+    ),
+]
+
+
+def normalize(data):
+    "Normalize a payload, so that near-identical payloads can be grouped"
+    for pattern, replacement in NORMALIZE_PATTERNS:
+        data = pattern.sub(replacement, data)
+    return data
+
+
+class PayloadLog:
+    """An append-only log of the output and errors produced by tests.
+
+    Payloads are written to a temporary segment file, rather than being
+    kept in memory. Each payload is identified by an integer record id;
+    the log keeps the offset and length of every record in flat arrays,
+    and payloads are read back through a memory map of the segment when
+    they are needed.
+
+    Payloads are interned by a hash of their content, so when many tests
+    produce the same output (e.g., the traceback of a broken fixture), it
+    is only stored once, and the record is shared. Payloads that only
+    differ in object addresses and timestamps are stored separately, but
+    are counted as near duplicates.
+
+    Records are reference counted. When a payload is no longer needed, its
+    record is released. The space used by records that are no longer
+    referenced is recovered by `compact()`, which rewrites the segment;
+    record ids are not changed by compaction.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory
+
+        self._file = None
+        self._map = None
+        self._size = 0
+        # Has data been written to the segment since it was last mapped?
+        self._dirty = False
+
+        self._offsets = array("Q")
+        self._lengths = array("L")
+        self._refcounts = array("L")
+        # The record for each payload digest, and the digest of each record.
+        self._records = {}
+        self._digests = []
+        # The number of records in each group of near-identical payloads,
+        # keyed by the digest of the normalized payload, and the group of
+        # each record.
+        self._group_sizes = {}
+        self._groups = []
+        # Record ids that have been released, and can be reused.
+        self._free = []
+
+        # The number of bytes that have been shared, rather than written.
+        self._saved = 0
+
+    def __del__(self):
+        self.close()
+
+    def __len__(self):
+        "The number of records in use"
+        return len(self._offsets) - len(self._free)
+
+    @property
+    def size(self):
+        "The number of bytes in the segment file"
+        return self._size
+
+    @property
+    def live_size(self):
+        "The number of bytes in the segment file that are in use"
+        return sum(self._lengths)
+
+    @property
+    def near_duplicates(self):
+        "The number of records that only differ from another in addresses or times"
+        return sum(size - 1 for size in self._group_sizes.values())
+
+    @property
+    def bytes_saved(self):
+        "The number of bytes that would be used if payloads weren't shared"
+        return self._saved
+
+    def _new_segment(self):
+        "Create a new segment file; it is deleted when it is closed"
+        # The segment is held open for the lifetime of the log.
+        return tempfile.TemporaryFile(prefix="cricket-", dir=self.directory)
+
+    def append(self, text):
+        """Write a payload to the log, returning its record id.
+
+        If an identical payload is already in the log, its record is shared.
+        """
+        data = text.encode("utf-8")
+        digest = hashlib.blake2b(data, digest_size=16).digest()
+        try:
+            record = self._records[digest]
+        except KeyError:
+            pass
+        else:
+            self._refcounts[record] += 1
+            self._saved += self._lengths[record]
+            return record
+
+        group = hashlib.blake2b(normalize(data), digest_size=16).digest()
+        self._group_sizes[group] = self._group_sizes.get(group, 0) + 1
+
+        if data:
+            if self._file is None:
+                self._file = self._new_segment()
+            self._file.seek(self._size)
+            self._file.write(data)
+            self._dirty = True
+
+        if self._free:
+            record = self._free.pop()
+            self._offsets[record] = self._size
+            self._lengths[record] = len(data)
+            self._refcounts[record] = 1
+            self._digests[record] = digest
+            self._groups[record] = group
+        else:
+            record = len(self._offsets)
+            self._offsets.append(self._size)
+            self._lengths.append(len(data))
+            self._refcounts.append(1)
+            self._digests.append(digest)
+            self._groups.append(group)
+        self._records[digest] = record
+        self._size += len(data)
+        return record
+
+    def read(self, record):
+        "Read the payload with the given record id"
+        offset = self._offsets[record]
+        length = self._lengths[record]
+        if length == 0:
+            return ""
+
+        if self._dirty:
+            # Make sure the map covers everything that has been written.
+            self._file.flush()
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._dirty = False
+
+        return self._map[offset : offset + length].decode("utf-8")
+
+    def release(self, record):
+        "Release a reference to a record that is no longer needed"
+        refcount = self._refcounts[record] - 1
+        self._refcounts[record] = refcount
+        if refcount:
+            self._saved -= self._lengths[record]
+        else:
+            del self._records[self._digests[record]]
+            self._digests[record] = None
+            group = self._groups[record]
+            self._groups[record] = None
+            if self._group_sizes[group] == 1:
+                del self._group_sizes[group]
+            else:
+                self._group_sizes[group] -= 1
+            self._lengths[record] = 0
+            self._free.append(record)
+
+    def compact(self):
+        """Rewrite the segment, discarding the data of released records.
+
+        The segment is only rewritten if released records are using at
+        least half of the segment.
+        """
+        live_size = self.live_size
+        if self._file is None or not self._size or live_size * 2 > self._size:
+            return
+
+        segment = self._new_segment()
+        if self._dirty:
+            self._file.flush()
+        with mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) as old:
+            offset = 0
+            for record, length in enumerate(self._lengths):
+                if length:
+                    start = self._offsets[record]
+                    segment.write(old[start : start + length])
+                    self._offsets[record] = offset
+                    offset += length
+
+        self.close()
+        self._file = segment
+        self._size = live_size
+        self._dirty = True
+
+    def close(self):
+        "Close (and delete) the segment file"
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,5 +1,3 @@
-import json
-
 try:
     from StringIO import StringIO
 except ImportError:
@@ -9,6 +7,8 @@ import time
 import traceback
 import unittest
 
+from cricket import protocol
+
 
 def trim_docstring(docstring):
     """Trim leading spaces in docstring indentation.
@@ -45,12 +45,9 @@ class PipedTestResult(unittest.result.TestResult):
     Used by PipedTestRunner.
     """
 
-    RESULT_SEPARATOR = "\x1f"  # ASCII US (Unit Separator)
-
     def __init__(self, stream):
         super().__init__()
         self.stream = stream
-        self._first = True
 
         # Create a clean buffer for stdout content.
         self._stdout = StringIO()
@@ -62,6 +59,10 @@ class PipedTestResult(unittest.result.TestResult):
         # for the misbehaving test.
         self._current_test = None
 
+    def _send(self, kind, body):
+        self.stream.write(protocol.encode(kind, body))
+        self.stream.flush()
+
     def description(self, test):
         try:
             # Wrapped _ErrorHolder objects have their own description
@@ -82,14 +83,7 @@ class PipedTestResult(unittest.result.TestResult):
 
         path = test.id()
 
-        body = {"path": path, "start_time": time.time()}
-        if self._first:
-            self.stream.write(PipedTestRunner.START_TEST_RESULTS + "\n")
-            self._first = False
-        else:
-            self.stream.write(self.RESULT_SEPARATOR + "\n")
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_START, {"path": path, "start_time": time.time()})
 
     def addSuccess(self, test):
         super().addSuccess(test)
@@ -99,8 +93,7 @@ class PipedTestResult(unittest.result.TestResult):
             "description": self.description(test),
             "output": self._stdout.getvalue(),
         }
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_RESULT, body)
         self._current_test = None
 
     def addError(self, test, err):
@@ -117,8 +110,7 @@ class PipedTestResult(unittest.result.TestResult):
             "error": "\n".join(traceback.format_exception(*err)),
             "output": self._stdout.getvalue(),
         }
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_RESULT, body)
         self._current_test = None
 
     def addFailure(self, test, err):
@@ -130,8 +122,7 @@ class PipedTestResult(unittest.result.TestResult):
             "error": "\n".join(traceback.format_exception(*err)),
             "output": self._stdout.getvalue(),
         }
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_RESULT, body)
         self._current_test = None
 
     def addSubTest(self, test, subtest, err):
@@ -143,8 +134,7 @@ class PipedTestResult(unittest.result.TestResult):
                 "description": self.description(test),
                 "output": self._stdout.getvalue(),
             }
-            self.stream.write(f"{json.dumps(body)}\n")
-            self.stream.flush()
+            self._send(protocol.TEST_RESULT, body)
         elif issubclass(err[0], test.failureException):
             body = {
                 "status": "F",
@@ -153,8 +143,7 @@ class PipedTestResult(unittest.result.TestResult):
                 "error": "\n".join(traceback.format_exception(*err)),
                 "output": self._stdout.getvalue(),
             }
-            self.stream.write(f"{json.dumps(body)}\n")
-            self.stream.flush()
+            self._send(protocol.TEST_RESULT, body)
         else:
             body = {
                 "status": "E",
@@ -163,8 +152,7 @@ class PipedTestResult(unittest.result.TestResult):
                 "error": "\n".join(traceback.format_exception(*err)),
                 "output": self._stdout.getvalue(),
             }
-            self.stream.write(f"{json.dumps(body)}\n")
-            self.stream.flush()
+            self._send(protocol.TEST_RESULT, body)
 
     def addSkip(self, test, reason):
         super().addSkip(test, reason)
@@ -175,8 +163,7 @@ class PipedTestResult(unittest.result.TestResult):
             "error": reason,
             "output": self._stdout.getvalue(),
         }
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_RESULT, body)
         self._current_test = None
 
     def addExpectedFailure(self, test, err):
@@ -188,8 +175,7 @@ class PipedTestResult(unittest.result.TestResult):
             "error": "\n".join(traceback.format_exception(*err)),
             "output": self._stdout.getvalue(),
         }
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_RESULT, body)
         self._current_test = None
 
     def addUnexpectedSuccess(self, test):
@@ -200,8 +186,7 @@ class PipedTestResult(unittest.result.TestResult):
             "description": self.description(test),
             "output": self._stdout.getvalue(),
         }
-        self.stream.write(f"{json.dumps(body)}\n")
-        self.stream.flush()
+        self._send(protocol.TEST_RESULT, body)
         self._current_test = None
 
 
@@ -212,9 +197,6 @@ class PipedTestRunner(unittest.TextTestRunner):
     occur, and a summary of the results at the end of the test run.
     """
 
-    START_TEST_RESULTS = "\x02"  # ASCII STX (Start of Text)
-    END_TEST_RESULTS = "\x03"  # ASCII ETX (End of Text)
-
     def __init__(self, stream=sys.stdout):
         self.stream = stream
 
@@ -228,7 +210,7 @@ class PipedTestRunner(unittest.TextTestRunner):
         test(result)
 
         # Report end of test run
-        self.stream.write(self.END_TEST_RESULTS + "\n")
+        self.stream.write(protocol.encode(protocol.RUN_END))
         self.stream.flush()
 
         # Restore the stdout reference
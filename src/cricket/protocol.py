@@ -0,0 +1,161 @@
+"""The protocol used by test runners to report results to Cricket.
+
+A test runner writes a stream of messages to its stdout. Each message is a
+frame, made up of:
+
+* the frame marker (ASCII RS, ``\\x1e``);
+* a single byte identifying the kind of message;
+* the length of the payload in bytes, as ASCII decimal digits;
+* a newline;
+* the payload - a JSON object, encoded as ASCII.
+
+The messages that make up a test run are:
+
+* ``TEST_START``, when a test starts. The payload contains the ``path`` of
+  the test, and its ``start_time``.
+* ``TEST_RESULT``, for each result reported by the test that was most
+  recently started. A test with subtests may report several results. The
+  payload contains the ``status``, ``end_time``, ``description``,
+  ``output`` and ``error`` of the result.
+* ``RUN_END``, when the test run is complete. The payload is empty.
+
+Anything that is written to stdout outside of a frame (e.g., output from
+tests that isn't captured, or the escape sequences some libraries emit
+when they are imported) is ignored.
+"""
+
+import json
+
+FRAME_MARKER = b"\x1e"  # ASCII RS (Record Separator)
+
+TEST_START = "S"
+TEST_RESULT = "R"
+RUN_END = "E"
+
+KINDS = {ord(kind): kind for kind in (TEST_START, TEST_RESULT, RUN_END)}
+
+# The longest length header that will be accepted; anything longer is not
+# a frame.
+MAX_HEADER = 16
+
+# The amount of output outside of frames that is retained.
+MAX_UNFRAMED = 64 * 1024
+
+_decode = json.JSONDecoder().decode
+
+
+def encode(kind, body=None):
+    """Encode a message as a frame.
+
+    Returns a string; the payload is pure ASCII, so the frame can be written
+    to a text stream, regardless of its encoding.
+    """
+    payload = "" if body is None else json.dumps(body)
+    return f"\x1e{kind}{len(payload)}\n{payload}"
+
+
+class FrameParser:
+    """An incremental parser for the frames written by a test runner.
+
+    Data is passed to the parser with `feed()` as it is read, in chunks of
+    any size. Each call returns the (kind, body) pairs of the messages that
+    were completed by the chunk; a partial frame at the end of a chunk is
+    retained until the rest of it arrives.
+
+    The parser never raises an error for malformed input. Bytes that aren't
+    part of a well formed frame are skipped; the most recent of them are
+    kept in `unframed`, as they are usually an indication of what went
+    wrong if a test run ends unexpectedly.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self.unframed = bytearray()
+
+    @property
+    def pending(self):
+        "The number of bytes received that haven't been parsed yet"
+        return len(self._buffer)
+
+    def _skip(self, data):
+        self.unframed += data
+        if len(self.unframed) > MAX_UNFRAMED:
+            del self.unframed[:-MAX_UNFRAMED]
+
+    def feed(self, data):
+        "Parse a chunk of data; returns a list of (kind, body) messages"
+        if self._buffer:
+            # Large frames may arrive over many chunks; extend the retained
+            # data in place, rather than copying it for every chunk.
+            self._buffer += data
+            buffer = self._buffer
+        else:
+            buffer = data
+        # Frames are read through a view of the buffer, so that payloads
+        # are decoded without copying them out of the buffer first. The
+        # buffer is compacted once, when the whole chunk has been parsed.
+        with memoryview(buffer) as view:
+            messages, pos = self._parse(buffer, view)
+            if buffer is self._buffer:
+                view.release()
+                del buffer[:pos]
+            else:
+                self._buffer = bytearray(view[pos:])
+        return messages
+
+    def _parse(self, buffer, view):
+        """Parse the frames in a buffer.
+
+        Returns the messages that were found, and the offset of the first
+        byte that hasn't been parsed.
+        """
+        messages = []
+        end = len(buffer)
+        pos = 0
+        while True:
+            start = buffer.find(FRAME_MARKER, pos)
+            if start < 0:
+                self._skip(view[pos:])
+                return messages, end
+            if start > pos:
+                self._skip(view[pos:start])
+
+            newline = buffer.find(b"\n", start + 2, start + 2 + MAX_HEADER)
+            if newline < 0:
+                if end - start < 2 + MAX_HEADER:
+                    # The header is incomplete.
+                    return messages, start
+                # Not a frame; skip the marker.
+                self._skip(view[start : start + 1])
+                pos = start + 1
+                continue
+
+            kind = KINDS.get(buffer[start + 1])
+            digits = buffer[start + 2 : newline]
+            # Text mode streams on Windows translate newlines.
+            if digits.endswith(b"\r"):
+                digits = digits[:-1]
+            if kind is None or not digits.isdigit():
+                self._skip(view[start : start + 1])
+                pos = start + 1
+                continue
+
+            payload_end = newline + 1 + int(digits)
+            if payload_end > end:
+                # The payload is incomplete.
+                return messages, start
+
+            try:
+                if payload_end > newline + 1:
+                    body = _decode(str(view[newline + 1 : payload_end], "ascii"))
+                else:
+                    body = {}
+            except ValueError:
+                body = None
+            if not isinstance(body, dict):
+                self._skip(view[start : start + 1])
+                pos = start + 1
+                continue
+
+            messages.append((kind, body))
+            pos = payload_end
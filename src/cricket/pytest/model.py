@@ -11,13 +11,36 @@ class PyTestTestSuite(TestSuite):
         "Command line: Discover all available tests in a project."
         return ["pytest", "--cricket", "discover"]
 
-    def execute_commandline(self, labels):
-        "Return the command line to execute the specified test labels"
+    def execute_commandline(
+        self, labels, labels_file=None, deselect_file=None, dump_file=None, timeout=None
+    ):
+        """Return the command line to execute the specified test labels.
+
+        If `labels_file` is provided, it is the path of a file containing
+        the labels, one per line; it is used instead of passing the labels
+        as arguments. If `deselect_file` is provided, it is the path of a
+        file containing the labels of tests that shouldn't be run. If
+        `dump_file` is provided, a stack dump is written to it if a test
+        times out; `timeout` is the time (in seconds) after which a test
+        has timed out.
+        """
         args = ["pytest", "--cricket", "execute", "-vv"]
         # if self.coverage:
         #     args.append('--coverage')
+
+        # Options and their values are passed as a single argument;
+        # otherwise pytest would treat the file as a test path when
+        # determining the root directory.
+        if deselect_file is not None:
+            args.append(f"--cricket-deselect-file={deselect_file}")
+        if dump_file is not None:
+            args.append(f"--cricket-dump-file={dump_file}")
+        if timeout is not None:
+            args.append(f"--cricket-timeout={timeout}")
         if labels is None:
             return args
+        if labels_file is not None:
+            return [*args, f"--cricket-labels-file={labels_file}"]
         return args + labels
 
     def split_test_id(self, test_id):
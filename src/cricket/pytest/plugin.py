@@ -1,9 +1,17 @@
-import json
+import faulthandler
+import os
+import re
+import signal
 import sys
 import time
 
 import pytest
 
+from cricket import protocol
+
+# The separators between the names in a node id.
+NODE_ID_SEPARATORS = re.compile(r"/|::")
+
 
 def pytest_addoption(parser):
     group = parser.getgroup("cricket", "BeeWare Cricket integration")
@@ -16,6 +24,80 @@ def pytest_addoption(parser):
         default="off",
         help="Cricket output mode",
     )
+    group.addoption(
+        "--cricket-labels-file",
+        dest="cricket_labels_file",
+        metavar="path",
+        action="store",
+        default=None,
+        help="A file listing the test labels to run, one per line",
+    )
+    group.addoption(
+        "--cricket-deselect-file",
+        dest="cricket_deselect_file",
+        metavar="path",
+        action="store",
+        default=None,
+        help="A file listing the test labels to deselect, one per line",
+    )
+    group.addoption(
+        "--cricket-dump-file",
+        dest="cricket_dump_file",
+        metavar="path",
+        action="store",
+        default=None,
+        help="A file where a stack dump is written if a test times out",
+    )
+    group.addoption(
+        "--cricket-timeout",
+        dest="cricket_timeout",
+        metavar="seconds",
+        action="store",
+        type=float,
+        default=None,
+        help="The time after which a test has timed out",
+    )
+
+
+def pytest_load_initial_conftests(early_config, parser, args):
+    labels_file = early_config.known_args_namespace.cricket_labels_file
+    if labels_file is not None:
+        # The labels are passed in a file, rather than as arguments, so
+        # that any number of labels can be passed, and labels don't need
+        # to be quoted. They are handled as if they were arguments.
+        with open(labels_file, encoding="utf-8") as f:
+            args.extend(line for line in f.read().splitlines() if line)
+
+
+def node_id_prefixes(nodeid):
+    "The node id, and the node ids of the ancestors it names"
+    yield nodeid
+    for match in NODE_ID_SEPARATORS.finditer(nodeid):
+        yield nodeid[: match.start()]
+
+
+def pytest_collection_modifyitems(session, config, items):
+    deselect_file = config.option.cricket_deselect_file
+    if deselect_file is None:
+        return
+
+    # Like --deselect, a label deselects the tests below it; but each test
+    # is checked against a set of labels, rather than comparing it with
+    # every label, so a long list of labels can be handled.
+    with open(deselect_file, encoding="utf-8") as f:
+        labels = {line for line in f.read().splitlines() if line}
+
+    remaining = []
+    deselected = []
+    for item in items:
+        if labels.isdisjoint(node_id_prefixes(item.nodeid)):
+            remaining.append(item)
+        else:
+            deselected.append(item)
+
+    if deselected:
+        config.hook.pytest_deselected(items=deselected)
+        items[:] = remaining
 
 
 @pytest.hookimpl(trylast=True)
@@ -68,20 +150,41 @@ class CricketDiscoverReporter(CricketReporter):
 
 
 class CricketExecuteReporter(CricketReporter):
-    def report(self, **kwargs):
-        self.print(json.dumps(kwargs), flush=True)
+    def __init__(self, config, file=None):
+        super().__init__(config, file)
+
+        # If a test times out, Cricket signals the test process to write a
+        # stack dump to the dump file before it is killed. Signals can't be
+        # used on Windows; instead, the dump is written when a test has been
+        # running for longer than the timeout.
+        self.dump = None
+        self.dump_timeout = None
+        if config.option.cricket_dump_file is not None:
+            # faulthandler only needs a file descriptor, which is kept open
+            # until the test process exits.
+            self.dump = os.open(
+                config.option.cricket_dump_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+            )
+            if hasattr(signal, "SIGUSR1"):
+                faulthandler.register(signal.SIGUSR1, file=self.dump, all_threads=True)
+            else:
+                self.dump_timeout = config.option.cricket_timeout
 
-    def pytest_sessionstart(self, session):
-        self._started = False
+    def send(self, kind, body=None):
+        self.file.write(protocol.encode(kind, body))
+        self.file.flush()
+
+    def report(self, **kwargs):
+        self.send(protocol.TEST_RESULT, kwargs)
 
     def pytest_runtest_logstart(self, nodeid, location):
-        if not self._started:
-            self.print("\x02")  # ASCII STX (Start of Text)
-            self._started = True
-        else:
-            self.print("\x1f")  # ASCII US (Unit Separator)
+        self.send(protocol.TEST_START, {"path": nodeid, "start_time": time.time()})
+        if self.dump_timeout is not None:
+            faulthandler.dump_traceback_later(self.dump_timeout, file=self.dump)
 
-        self.report(path=nodeid, start_time=time.time())
+    def pytest_runtest_logfinish(self, nodeid, location):
+        if self.dump_timeout is not None:
+            faulthandler.cancel_dump_traceback_later()
 
     def report_pass(self, report):
         self.report(
@@ -170,4 +273,4 @@ class CricketExecuteReporter(CricketReporter):
                     self.report_expected_failure(report)
 
     def pytest_sessionfinish(self, exitstatus):
-        self.print("\x03")  # ASCII ETX (End of Text)
+        self.send(protocol.RUN_END)
@@ -0,0 +1,91 @@
+import heapq
+from bisect import bisect_left, insort
+
+
+class Ranking:
+    """A collection of items with numeric keys, tracking the largest keys.
+
+    The `size` items with the largest keys are kept in a short sorted list,
+    which is maintained incrementally as keys are updated; the top items
+    can be read at any time without sorting the whole collection.
+
+    If the key of one of the top items is reduced (or the item is removed),
+    an item outside the top may need to take its place. In that case, the
+    top items are recomputed (with a heap) the next time they are read.
+    """
+
+    def __init__(self, size=100):
+        self.size = size
+
+        # The current key of every item.
+        self._keys = {}
+        # (key, tie breaker, item) tuples for the top items, in ascending
+        # order, and the keys of the items in that list.
+        self._top = []
+        self._top_keys = {}
+        # Does the list of top items need to be recomputed?
+        self._stale = False
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, item):
+        return item in self._keys
+
+    def update(self, item, key):
+        "Set the key of an item, adding it to the ranking if required"
+        old_key = self._keys.get(item)
+        if old_key == key:
+            return
+        self._keys[item] = key
+        if self._stale:
+            return
+
+        if item in self._top_keys:
+            self._remove_top(item)
+            if key < old_key and len(self._keys) > self.size:
+                # An item outside the top may now be larger.
+                self._stale = True
+                return
+            self._insert_top(item, key)
+        elif len(self._top) < self.size:
+            # Every item is in the top.
+            self._insert_top(item, key)
+        elif key > self._top[0][0]:
+            # The item displaces the smallest of the top items.
+            self._remove_top(self._top[0][2])
+            self._insert_top(item, key)
+
+    def discard(self, item):
+        "Remove an item from the ranking, if it is present"
+        if self._keys.pop(item, None) is None:
+            return
+        if not self._stale and item in self._top_keys:
+            self._remove_top(item)
+            if len(self._keys) >= self.size:
+                # An item outside the top needs to take its place.
+                self._stale = True
+
+    def _insert_top(self, item, key):
+        insort(self._top, (key, id(item), item))
+        self._top_keys[item] = key
+
+    def _remove_top(self, item):
+        key = self._top_keys.pop(item)
+        del self._top[bisect_left(self._top, (key, id(item)))]
+
+    def top(self, count):
+        "The `count` (at most `size`) items with the largest keys, largest first"
+        if self._stale:
+            largest = heapq.nlargest(self.size, self._keys.items(), key=_by_key)
+            self._top = sorted((key, id(item), item) for item, key in largest)
+            self._top_keys = dict(largest)
+            self._stale = False
+
+        if count <= 0:
+            return []
+        return [item for _, _, item in reversed(self._top[-count:])]
+
+
+def _by_key(item_key):
+    return item_key[1]
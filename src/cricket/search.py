@@ -0,0 +1,114 @@
+import re
+
+# The separators between the parts of a test id.
+SEPARATORS = re.compile(r"::|[/\\]")
+
+
+def trigrams(text):
+    "The set of (lowercase) 3-character substrings of `text`"
+    text = text.lower()
+    return {text[i : i + 3] for i in range(len(text) - 2)}
+
+
+def _is_live(node):
+    "Is the node still attached to its test suite?"
+    while node._parent is not None:
+        node = node._parent
+    return node is node._source
+
+
+class NameIndex:
+    """An index of the nodes in a test suite, for finding nodes by name.
+
+    The same names occur many times in a test suite, so the index is built
+    over the distinct names of nodes. Each name is indexed by its trigrams;
+    a search intersects the names containing each trigram of the query,
+    and then verifies the (small) set of candidates.
+
+    Nodes are added to the index as they are created. Removed nodes are
+    discarded lazily, the next time a search encounters them.
+    """
+
+    def __init__(self):
+        # The nodes with each name.
+        self._nodes = {}
+        # The names containing each trigram.
+        self._trigrams = {}
+
+    def __len__(self):
+        "The number of distinct names in the index"
+        return len(self._nodes)
+
+    def add(self, node):
+        "Add a node to the index"
+        name = node._name
+        try:
+            self._nodes[name].append(node)
+        except KeyError:
+            self._nodes[name] = [node]
+            for trigram in trigrams(name):
+                try:
+                    self._trigrams[trigram].add(name)
+                except KeyError:
+                    self._trigrams[trigram] = {name}
+
+    def names(self, fragment):
+        "Find the names that contain `fragment`, ignoring case"
+        fragment = fragment.lower()
+        if len(fragment) < 3:
+            candidates = self._nodes
+        else:
+            postings = sorted(
+                (self._trigrams.get(trigram, ()) for trigram in trigrams(fragment)),
+                key=len,
+            )
+            candidates = set(postings[0]).intersection(*postings[1:])
+        return [name for name in candidates if fragment in name.lower()]
+
+    def nodes(self, name):
+        "The nodes in the test suite with the given name"
+        nodes = self._nodes.get(name, [])
+        live = [node for node in nodes if _is_live(node)]
+        if len(live) < len(nodes):
+            if live:
+                self._nodes[name] = live
+            else:
+                del self._nodes[name]
+                for trigram in trigrams(name):
+                    self._trigrams[trigram].discard(name)
+        return live
+
+    def search(self, query):
+        """Find the nodes whose path contains `query`, ignoring case.
+
+        A query that doesn't contain a separator is matched against the
+        name of each node. A query that contains separators (e.g.,
+        ``test_module.py::TestCase``) is matched against consecutive nodes;
+        the first part must be at the end of a node's name, any middle
+        parts must match a name exactly, and the last part must be at the
+        start of a name. The deepest node of each match is returned.
+        """
+        parts = SEPARATORS.split(query.strip().lower())
+        while parts and not parts[0]:
+            parts.pop(0)
+        if not parts:
+            return []
+
+        first = parts[0]
+        matches = [
+            node
+            for name in self.names(first)
+            if len(parts) == 1 or name.lower().endswith(first)
+            for node in self.nodes(name)
+        ]
+
+        for depth, part in enumerate(parts[1:], start=2):
+            last = depth == len(parts)
+            matches = [
+                child
+                for node in matches
+                if node.can_have_children()
+                for label, child in node._child_nodes.items()
+                if (label.lower().startswith(part) if last else label.lower() == part)
+            ]
+        return matches
@@ -0,0 +1,86 @@
+import sqlite3
+from pathlib import Path
+
+
+class ResultStore:
+    """A persistent store of the most recent result of every test.
+
+    Results are stored in a single SQLite file, keyed by test id. Results
+    are written in batches; `record()` queues a result, and the queue is
+    written in a single transaction once `batch_size` results have been
+    queued, or when `flush()` is called.
+    """
+
+    def __init__(self, path, batch_size=100):
+        self.path = Path(path)
+        self.batch_size = batch_size
+        self._pending = []
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(self.path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                " test_id TEXT PRIMARY KEY,"
+                " status INTEGER NOT NULL,"
+                " duration REAL,"
+                " description TEXT,"
+                " output TEXT,"
+                " error TEXT"
+                ")"
+            )
+
+    def __repr__(self):
+        return f"<ResultStore {self.path}>"
+
+    def record(self, test_id, status, duration, description, output, error):
+        "Queue the result of a test to be written to the store"
+        self._pending.append(
+            (test_id, status, duration, description, output, error),
+        )
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        "Write all queued results to the store"
+        if self._pending:
+            with self._connection:
+                self._connection.executemany(
+                    "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?)",
+                    self._pending,
+                )
+            self._pending = []
+
+    def get(self, test_id):
+        """Retrieve the stored result for a test.
+
+        Returns a (status, duration, description, output, error) tuple,
+        or None if there is no stored result.
+        """
+        return self._connection.execute(
+            "SELECT status, duration, description, output, error"
+            " FROM results WHERE test_id = ?",
+            (test_id,),
+        ).fetchone()
+
+    def get_many(self, test_ids):
+        """Retrieve the stored results for a collection of tests.
+
+        Returns a dictionary of results, keyed by test id; tests without a
+        stored result are omitted.
+        """
+        test_ids = list(test_ids)
+        placeholders = ", ".join("?" * len(test_ids))
+        return {
+            row[0]: row[1:]
+            for row in self._connection.execute(
+                "SELECT test_id, status, duration, description, output, error"
+                f" FROM results WHERE test_id IN ({placeholders})",
+                test_ids,
+            )
+        }
+
+    def close(self):
+        "Write any queued results, and close the store"
+        self.flush()
+        self._connection.close()
@@ -3,6 +3,7 @@
 This is the "View" of the MVC world.
 """
 
+import asyncio
 import subprocess
 import webbrowser
 
@@ -24,10 +25,41 @@ except ImportError:
     duvet = None
 
 from cricket.executor import Executor
-from cricket.model import TestMethod, TestSuiteProblems
+from cricket.model import (
+    TestMethod,
+    TestSuiteProblems,
+    TestSuiteSearch,
+    TestSuiteSlowest,
+)
+
+# Display constants for test status
+STATUS_SYMBOLS = {
+    TestMethod.STATUS_UNKNOWN: "?",
+    TestMethod.STATUS_PASS: "\u25cf",
+    TestMethod.STATUS_SKIP: "S",
+    TestMethod.STATUS_FAIL: "F",
+    TestMethod.STATUS_EXPECTED_FAIL: "X",
+    TestMethod.STATUS_UNEXPECTED_SUCCESS: "U",
+    TestMethod.STATUS_ERROR: "E",
+}
+
+# The most search matches that are shown expanded. Expanding the whole tree
+# for a broad query on a large suite would freeze the UI.
+MAX_EXPANDED_MATCHES = 500
 
 
 class Cricket(toga.App):
+    # The number of test processes to run concurrently.
+    workers = 1
+
+    # The time (in seconds) after which a test, or a test process that
+    # isn't producing output, is stopped; None means there is no limit.
+    timeout = None
+    output_timeout = None
+
+    # The task loading stored results in the background.
+    _load_results_task = None
+
     def startup(self):
         """
         -----------------------------------------------------
@@ -60,6 +92,9 @@ class Cricket(toga.App):
         # initial display of the status bar and details.
         self.on_tab_selected(self.tree_notebook)
 
+        # Display the initial test counts.
+        self._setup_init_values()
+
         # Now that we've laid out the grid, hide the output and error text
         # until we actually have an error/output to display
         self.error_box.style.visibility = HIDDEN
@@ -71,6 +106,9 @@ class Cricket(toga.App):
         self.main_window.show()
 
     async def on_running(self):
+        # Load the results of previous runs without blocking the GUI.
+        self._load_results_task = asyncio.create_task(self.load_results())
+
         if self.test_load_error:
             abort = await self.dialog(
                 toga.StackTraceDialog(
@@ -80,6 +118,7 @@ class Cricket(toga.App):
                 )
             )
             if abort:
+                self.cmd_quit()
                 self.exit()
         elif self.ignorable_test_load_error:
             abort = await self.dialog(
@@ -90,11 +129,18 @@ class Cricket(toga.App):
                 )
             )
             if abort:
+                self.cmd_quit()
                 self.exit()
 
     def open_document(self, doc):
         pass
 
+    async def load_results(self):
+        "Load the stored results of the test suite in the background"
+        for _ in self.test_suite.load_results():
+            # Let the GUI process events between each batch of results.
+            await asyncio.sleep(0)
+
     #############################################
     # Error handlers from the model or test suite
     #############################################
@@ -228,7 +274,7 @@ class Cricket(toga.App):
         # is the details panel.
         self.split_main_container = toga.SplitContainer(
             content=[
-                (self.tree_notebook, 33),
+                (self.left_box, 33),
                 (self.right_box, 66),
             ],
             flex=1,
@@ -260,13 +306,54 @@ class Cricket(toga.App):
         )
         self.problem_tests_tree.expand()
 
+        # The slowest tests, and the slowest modules and test cases
+        self.slowest_tests_table = toga.Table(
+            columns=[
+                AccessorColumn("Slowest tests", "path"),
+                AccessorColumn("Duration", "duration_label"),
+            ],
+            data=TestSuiteSlowest(self.test_suite, self.test_suite.slowest_tests),
+            on_select=self.on_test_selected,
+            multiple_select=True,
+            flex=1,
+        )
+        self.slowest_nodes_table = toga.Table(
+            columns=[
+                AccessorColumn("Slowest modules and cases", "path"),
+                AccessorColumn("Duration", "duration_label"),
+            ],
+            data=TestSuiteSlowest(self.test_suite, self.test_suite.slowest_nodes),
+            on_select=self.on_test_selected,
+            multiple_select=True,
+            flex=1,
+        )
+        self.slowest_box = toga.Box(
+            children=[self.slowest_tests_table, self.slowest_nodes_table],
+            direction=COLUMN,
+        )
+
         self.tree_notebook = toga.OptionContainer(
             content=[
                 ("All tests", self.all_tests_tree),
                 ("Problems", self.problem_tests_tree),
+                ("Slowest", self.slowest_box),
             ],
             on_select=self.on_tab_selected,
             margin_top=5,
+            flex=1,
+        )
+
+        # Search box, to filter the tree of all tests
+        self.search_results = TestSuiteSearch(self.test_suite)
+        self.search_input = toga.TextInput(
+            placeholder="Search tests",
+            on_change=self.on_search,
+            margin=(5, 5, 0, 5),
+        )
+
+        self.left_box = toga.Box(
+            children=[self.search_input, self.tree_notebook],
+            direction=COLUMN,
         )
 
     def _setup_right_frame(self):
@@ -329,10 +416,25 @@ class Cricket(toga.App):
         self.duration_box.add(self.duration_label)
         self.duration_box.add(self.duration_view)
 
-        # Group the name and duration into a single "identifier" box
+        # Box to put the recent results of the test
+        self.history_box = toga.Box(direction=ROW, margin=(5, 10))
+        # Label to indicate the test history
+        self.history_label = toga.Label(
+            "History:",
+            text_align=RIGHT,
+            width=80,
+            margin_right=10,
+        )
+        # Text input to show the test history
+        self.history_view = toga.TextInput(readonly=True, flex=1)
+        self.history_box.add(self.history_label)
+        self.history_box.add(self.history_view)
+
+        # Group the name, duration and history into a single "identifier" box
         self.identifier_box = toga.Box(direction=COLUMN, flex=1)
         self.identifier_box.add(self.name_box)
         self.identifier_box.add(self.duration_box)
+        self.identifier_box.add(self.history_box)
 
         # Put the identifiers on the same row as the status label
         self.summary_box = toga.Box(direction=ROW, align_items=CENTER)
@@ -401,6 +503,9 @@ class Cricket(toga.App):
         """
         self.run_status = toga.Label("Not running", margin_left=10)
 
+        # Test counts for the module or test case selected in the tree
+        self.selection_summary = toga.Label("", margin_left=10)
+
         self.run_summary = toga.Label(
             "T:0 P:0 F:0 E:0 X:0 U:0 S:0",
             flex=1,
@@ -419,18 +524,40 @@ class Cricket(toga.App):
         self.statusbar = toga.Box(direction=ROW)
 
         self.statusbar.add(self.run_status)
+        self.statusbar.add(self.selection_summary)
         self.statusbar.add(self.run_summary)
         self.statusbar.add(self.progress)
 
     def _setup_init_values(self):
         "Update the layout with the initial values."
         # Get a count of active tests to display in the status bar.
-
-        count, _labels = self.test_suite.find_tests(active=True)
+        count = self.test_suite.active_count
         self.run_summary.text = f"T:{count} P:0 F:0 E:0 X:0 U:0 S:0"
 
         # Update the test suite to make sure coverage status matches the GUI
-        self.on_coverageChange(None)
+        self.test_suite.coverage = self.coverage
+
+    def _update_selection_summary(self):
+        "Display the test counts for the module or test case that is selected."
+        nodes = self.current_tree.selection
+        if nodes and len(nodes) == 1 and nodes[0].can_have_children():
+            node = nodes[0]
+
+            def count(status):
+                return node.count_tests(status=[status])
+
+            self.selection_summary.text = (
+                f"{node.name}: "
+                f"T:{node.test_count} "
+                f"P:{count(TestMethod.STATUS_PASS)} "
+                f"F:{count(TestMethod.STATUS_FAIL)} "
+                f"E:{count(TestMethod.STATUS_ERROR)} "
+                f"X:{count(TestMethod.STATUS_EXPECTED_FAIL)} "
+                f"U:{count(TestMethod.STATUS_UNEXPECTED_SUCCESS)} "
+                f"S:{count(TestMethod.STATUS_SKIP)}"
+            )
+        else:
+            self.selection_summary.text = ""
 
     ######################################################
     # Handlers for setting a new test_suite
@@ -449,10 +576,22 @@ class Cricket(toga.App):
     # User commands
     ######################################################
 
+    def on_exit(self):
+        "Event handler: the app is about to exit"
+        self.cmd_quit()
+        return True
+
     def cmd_quit(self):
         "Command: Quit"
         # If the runner is currently running, kill it.
-        self.stop()
+        if self.executor:
+            self.executor.kill()
+        if self._load_results_task is not None:
+            self._load_results_task.cancel()
+
+        # Write any results that haven't been stored yet, and release the
+        # payload log and result store.
+        self.test_suite.close()
 
     async def cmd_stop(self, widget):
         "Command: The stop button has been pressed"
@@ -482,12 +621,12 @@ class Cricket(toga.App):
         if not self.executor:
             await self.run(labels=tests_to_run)
 
-    def cmd_rerun(self, widget):
+    async def cmd_rerun(self, widget):
         "Command: The run/stop button has been pressed"
         # If the executor isn't currently running, we can
         # start a test run.
         if not self.executor:
-            self.run(status=set(TestMethod.FAILING_STATES))
+            await self.run(status=set(TestMethod.FAILING_STATES))
 
     def cmd_show_coverage(self, widget):
         "Command: Open coverage tool"
@@ -516,17 +655,24 @@ class Cricket(toga.App):
 
     def on_tab_selected(self, widget, **kwargs):
         "Event handler: the tree selection has changed."
-        self.current_tree = widget.current_tab.content
-        self.on_test_selected(self.current_tree)
+        content = widget.current_tab.content
+        if content is self.slowest_box:
+            self.on_test_selected(self.slowest_tests_table)
+        else:
+            self.on_test_selected(content)
 
     def on_test_selected(self, widget, **kwargs):
         "Event handler: a test case has been selected in the tree"
+        # The tree (or table) with the most recent selection is the one
+        # used by "Run selected".
+        self.current_tree = widget
         nodes = widget.selection
         # Multiple tests selected
         if nodes and len(nodes) > 1:
             self.status_label.text = ""
             self.name_view.text = ""
             self.duration_view.text = ""
+            self.history_view.text = ""
             self.description_view.text = ""
 
             self.output_view.text = ""
@@ -539,18 +685,13 @@ class Cricket(toga.App):
             testMethod = nodes[0]
             self.name_view.value = testMethod.path
             try:
+                # The stored result of the test may not have been loaded yet.
+                if not testMethod.result_loaded:
+                    testMethod.load_result()
+
                 self.description_view.value = testMethod.description
 
-                # Display constants for test status
-                self.status_label.text = {
-                    TestMethod.STATUS_UNKNOWN: "?",
-                    TestMethod.STATUS_PASS: "\u25cf",
-                    TestMethod.STATUS_SKIP: "S",
-                    TestMethod.STATUS_FAIL: "F",
-                    TestMethod.STATUS_EXPECTED_FAIL: "X",
-                    TestMethod.STATUS_UNEXPECTED_SUCCESS: "U",
-                    TestMethod.STATUS_ERROR: "E",
-                }[testMethod.status]
+                self.status_label.text = STATUS_SYMBOLS[testMethod.status]
                 self.status_label.style.color = {
                     TestMethod.STATUS_UNKNOWN: "#BFBFBF",
                     TestMethod.STATUS_PASS: "#28C025",
@@ -565,6 +706,17 @@ class Cricket(toga.App):
                     # Test has been executed
                     self.duration_view.value = f"{testMethod.duration:0.2f}s"
 
+                    # Recent results, oldest first, with the range of durations
+                    history = testMethod.history
+                    if history:
+                        durations = [duration for _, duration in history]
+                        self.history_view.value = (
+                            "".join(STATUS_SYMBOLS[status] for status, _ in history)
+                            + f" ({min(durations):0.2f}s - {max(durations):0.2f}s)"
+                        )
+                    else:
+                        self.history_view.value = ""
+
                     if testMethod.error:
                         self.error_view.value = testMethod.error
                         self.error_box.style.visibility = VISIBLE
@@ -579,6 +731,7 @@ class Cricket(toga.App):
                 else:
                     # Test hasn't been executed yet.
                     self.duration_view.value = "Not executed"
+                    self.history_view.value = ""
 
                     self.error_view.text = ""
                     self.error_box.style.visibility = HIDDEN
@@ -591,6 +744,7 @@ class Cricket(toga.App):
                 self.status_label.text = ""
                 self.description_view.text = ""
                 self.duration_view.text = ""
+                self.history_view.text = ""
 
                 self.error_view.text = ""
                 self.error_box.style.visibility = HIDDEN
@@ -603,6 +757,7 @@ class Cricket(toga.App):
             self.name_view.text = ""
             self.description_view.text = ""
             self.duration_view.text = ""
+            self.history_view.text = ""
 
             self.error_view.text = ""
             self.error_box.style.visibility = HIDDEN
@@ -610,9 +765,24 @@ class Cricket(toga.App):
             self.output_view.text = ""
             self.output_box.style.visibility = HIDDEN
 
+        # Show the test counts for the selected node
+        self._update_selection_summary()
+
         # update "run selected" button enabled state
         self.run_selected_command.enabled = not self.executor
 
+    def on_search(self, widget):
+        "Event handler: the search query has been changed"
+        query = widget.value.strip()
+        if query:
+            self.search_results.search(query)
+            if self.all_tests_tree.data is not self.search_results:
+                self.all_tests_tree.data = self.search_results
+            if self.search_results.test_count <= MAX_EXPANDED_MATCHES:
+                self.all_tests_tree.expand()
+        elif self.all_tests_tree.data is not self.test_suite:
+            self.all_tests_tree.data = self.test_suite
+
     def on_coverageChange(self, widget):
         "Event handler: when the coverage checkbox has been toggled"
         self.coverage = not self.coverage
@@ -629,9 +799,16 @@ class Cricket(toga.App):
         self.run_status.text = f"Running {test_path}..."
 
     def executor_test_end(self, test_path, result, remaining_time):
-        "The executor has finished running a test."
+        """The executor has finished running a test.
+
+        When tests finish quickly, this is only invoked for the most recent
+        of the tests that have finished since the last update.
+        """
         # Update the progress meter
-        self.progress.value += 1
+        self.progress.value = self.executor.completed_count
+
+        # Update the counts for the selected node
+        self._update_selection_summary()
 
         # Update the run summary
         e = self.executor
@@ -648,8 +825,16 @@ class Cricket(toga.App):
 
     async def executor_suite_end(self, error=None):
         "The test suite finished running."
-        # Display the final results
-        self.run_status.text = "Finished."
+        # Display the final results, and how much memory was saved
+        # by sharing identical test output.
+        saved = self.test_suite.payloads.bytes_saved
+        finished = "Stopped." if self.executor.stopped else "Finished."
+        if saved:
+            self.run_status.text = (
+                f"{finished} {saved / 1024 / 1024:.1f}MB of duplicate output shared."
+            )
+        else:
+            self.run_status.text = finished
 
         if error:
             await self.dialog(toga.ErrorDialog("Result", error))
@@ -727,7 +912,7 @@ class Cricket(toga.App):
         If labels is provided, only tests with those labels will
             be executed
         """
-        count, labels = self.test_suite.find_tests(
+        count, labels, deselected = self.test_suite.find_selection(
             active=active, status=status, labels=labels
         )
 
@@ -743,23 +928,36 @@ class Cricket(toga.App):
         self.progress.value = 0
 
         # Create the executor...
-        self.executor = Executor(self.test_suite, self)
+        self.executor = Executor(
+            self.test_suite,
+            self,
+            workers=self.workers,
+            timeout=self.timeout,
+            output_timeout=self.output_timeout,
+        )
 
         # ...and run it
-        await self.executor.run(count, labels)
-
-        # Once it's done, clean up.
-        self.executor = None
-        self.reset_button_states()
+        try:
+            await self.executor.run(count, labels, deselected)
+        except OSError as e:
+            # The test processes couldn't be run (rather than any of the
+            # tests failing).
+            self.run_status.text = "Error."
+            await self.dialog(toga.ErrorDialog("Error running tests", str(e)))
+        finally:
+            # Once it's done, clean up.
+            self.executor = None
+            self.reset_button_states()
 
     async def stop(self):
-        "Stop the test suite."
+        """Stop the test suite.
+
+        The test run ends (and the buttons are reset) once the test
+        processes have exited; results that have already been reported
+        are retained.
+        """
         if self.executor:
             self.run_status.text = "Stopping..."
+            self.stop_command.enabled = False
 
-            # await self.executor.terminate()
-
-        self.executor = None
-        self.run_status.text = "Stopped."
-
-        self.reset_button_states()
+            await self.executor.terminate()
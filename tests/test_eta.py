@@ -0,0 +1,184 @@
+import random
+
+import pytest
+
+from cricket.eta import HistoryEstimator, MeanEstimator, format_remaining
+from cricket.executor import Executor
+from cricket.model import TestMethod as CTMethod
+from cricket.pytest.model import PyTestTestSuite as PTSuite
+
+
+@pytest.mark.parametrize(
+    "seconds, label",
+    [
+        (None, "unknown"),
+        (0, "0s"),
+        (59.9, "59s"),
+        (90, "1 min"),
+        (3000, "50 mins"),
+        (3700, "1 hour"),
+        (7300, "2 hours"),
+        (36000, "10 hours"),
+    ],
+)
+def test_format_remaining(seconds, label):
+    assert format_remaining(seconds) == label
+
+
+def timed_suite(durations):
+    "A suite whose tests have recorded durations (None for a new test)"
+    suite = PTSuite()
+    suite.put_tests(durations)
+    for path, duration in durations.items():
+        if duration is not None:
+            suite.find_node(path).set_result("", CTMethod.STATUS_PASS, "", "", duration)
+    return suite
+
+
+def nodes(suite, *paths):
+    return [suite.find_node(path) for path in paths]
+
+
+def test_recorded_durations():
+    "The time remaining is the recorded duration of the tests that remain"
+    suite = timed_suite({"a.py::test_1": 1.0, "a.py::test_2": 2.0, "b.py::test_3": 4.0})
+    estimator = HistoryEstimator()
+    estimator.start([nodes(suite, "a.py::test_1", "a.py::test_2", "b.py::test_3")], 3)
+
+    estimator.finished(suite.find_node("a.py::test_1"), 10.0, 11.0)
+    assert estimator.remaining() == 6.0
+    estimator.finished(suite.find_node("a.py::test_2"), 11.0, 13.0)
+    assert estimator.remaining() == 4.0
+
+
+def test_history_average():
+    "The duration of a test is averaged over its recorded results"
+    suite = timed_suite({"a.py::test_1": 1.0, "a.py::test_2": 1.0})
+    suite.find_node("a.py::test_2").set_result("", CTMethod.STATUS_PASS, "", "", 3.0)
+
+    estimator = HistoryEstimator()
+    estimator.start([nodes(suite, "a.py::test_1", "a.py::test_2")], 2)
+    estimator.finished(suite.find_node("a.py::test_1"), 0.0, 1.0)
+    assert estimator.remaining() == 2.0
+
+
+def test_module_average():
+    "A new test is expected to take as long as the other tests in its module"
+    suite = timed_suite(
+        {
+            "a.py::test_1": 1.0,
+            "a.py::test_2": 3.0,
+            "a.py::test_new": None,
+            "b.py::test_3": 10.0,
+            "b.py::test_4": 1.0,
+        }
+    )
+    estimator = HistoryEstimator()
+    estimator.start([nodes(suite, "b.py::test_4", "a.py::test_new", "a.py::test_1")], 3)
+    estimator.finished(suite.find_node("b.py::test_4"), 0.0, 1.0)
+    assert estimator.remaining() == 3.0
+
+
+def test_unknown():
+    "Tests with nothing to base an estimate on take the average time of the run"
+    suite = timed_suite({"a.py::test_1": None, "a.py::test_2": None})
+    estimator = HistoryEstimator()
+    estimator.start([nodes(suite, "a.py::test_1", "a.py::test_2")], 2)
+
+    assert estimator.remaining() is None
+    estimator.finished(suite.find_node("a.py::test_1"), 0.0, 3.0)
+    assert estimator.remaining() == 3.0
+
+
+def test_parallel():
+    "The time remaining is the time remaining for the slowest shard"
+    suite = timed_suite({"a.py::test_1": 1.0, "a.py::test_2": 2.0, "b.py::test_3": 4.0})
+    estimator = HistoryEstimator()
+    estimator.start(
+        [nodes(suite, "a.py::test_1", "a.py::test_2"), nodes(suite, "b.py::test_3")],
+        3,
+    )
+    estimator.finished(suite.find_node("a.py::test_1"), 0.0, 1.0)
+    assert estimator.remaining() == 4.0
+
+    # A shard that finishes early has no time remaining.
+    estimator.shard_finished(1)
+    assert estimator.remaining() == 2.0
+
+
+def test_calibration():
+    "Expected durations are corrected by how long tests are actually taking"
+    suite = timed_suite({"a.py::test_1": 1.0, "a.py::test_2": 2.0})
+    estimator = HistoryEstimator()
+    estimator.start([nodes(suite, "a.py::test_1", "a.py::test_2")], 2)
+    estimator.finished(suite.find_node("a.py::test_1"), 0.0, 2.0)
+    assert estimator.remaining() == 4.0
+
+
+def test_mean():
+    estimator = MeanEstimator()
+    estimator.start([[]], 4)
+    assert estimator.remaining() is None
+    estimator.finished(None, 10.0, 11.0)
+    estimator.finished(None, 11.0, 12.0)
+    assert estimator.remaining() == 2.0
+
+
+def test_queued_tests():
+    "The tests queued on a shard are found from its labels"
+    suite = timed_suite(
+        {"a.py::test_1": None, "a.py::test_2": None, "b.py::test_3": None}
+    )
+    executor = Executor(suite)
+
+    assert {test.path for test in executor._queued_tests(None, ["a.py::test_2"])} == {
+        "a.py::test_1",
+        "b.py::test_3",
+    }
+    assert {test.path for test in executor._queued_tests(["a.py", "c.py"])} == {
+        "a.py::test_1",
+        "a.py::test_2",
+    }
+
+
+def replay(estimator, suite, shards, durations):
+    "Replay a run of `shards`; returns the mean absolute error of the estimates"
+    estimator.start([nodes(suite, *shard) for shard in shards], len(durations))
+    timings = []
+    for shard in shards:
+        now = 0.0
+        for path in shard:
+            timings.append((now + durations[path], now, path))
+            now += durations[path]
+    end = max(timings)[0]
+
+    errors = []
+    for end_time, start_time, path in sorted(timings):
+        estimator.finished(suite.find_node(path), start_time, end_time)
+        errors.append(abs(estimator.remaining() - (end - end_time)))
+    return sum(errors) / len(errors)
+
+
+def test_replay():
+    "On a suite with a few slow tests, history gives better estimates than the mean"
+    rng = random.Random(42)
+    durations = {
+        f"test_{n // 20}.py::test_{n}": (
+            rng.uniform(1, 5) if n % 50 == 7 else rng.uniform(0.001, 0.01)
+        )
+        for n in range(500)
+    }
+    suite = timed_suite(durations)
+    paths = list(durations)
+    shards = [paths[:250], paths[250:]]
+
+    # The run is slower than the recorded one.
+    actual = {
+        path: duration * rng.uniform(1.2, 1.4) for path, duration in durations.items()
+    }
+    history = replay(HistoryEstimator(), suite, shards, actual)
+    mean = replay(MeanEstimator(), suite, shards, actual)
+
+    total = max(sum(actual[path] for path in shard) for shard in shards)
+    assert history < total * 0.1
+    assert history < mean / 2
@@ -0,0 +1,385 @@
+import asyncio
+import os
+import signal
+import sys
+import textwrap
+import time
+from pathlib import Path
+
+import pytest
+
+from cricket.executor import (
+    ERROR_LINES,
+    INTERRUPTED,
+    NO_OUTPUT,
+    TIMED_OUT,
+    Executor,
+)
+from cricket.model import TestMethod as CTMethod
+from cricket.pytest.model import PyTestTestSuite as PTSuite
+
+
+class ScriptSuite(PTSuite):
+    "A test suite that runs a script instead of pytest."
+
+    def __init__(self, script):
+        super().__init__()
+        self.script = script
+
+    def execute_commandline(
+        self, labels, deselect_file=None, dump_file=None, **options
+    ):
+        # The deselect and dump files are passed to the script as arguments.
+        return [
+            sys.executable,
+            str(self.script),
+            str(deselect_file or ""),
+            str(dump_file or ""),
+        ]
+
+
+class Display:
+    "A display that records the end of the test run."
+
+    def __init__(self):
+        self.errors = []
+        self.started = asyncio.Event()
+
+    def executor_test_start(self, test_path):
+        if test_path == "test_a.py::test_hang":
+            self.started.set()
+
+    def executor_test_end(self, test_path, result, remaining_time):
+        pass
+
+    async def executor_suite_end(self, error=None):
+        self.errors.append(error)
+
+
+def script_suite(tmp_path, *sources):
+    "A test suite that runs a script assembled from `sources`"
+    script = tmp_path / "runner.py"
+    script.write_text(
+        "import sys, time\n"
+        "from cricket import protocol\n"
+        "def send(kind, body=None):\n"
+        "    sys.stdout.write(protocol.encode(kind, body))\n"
+        "    sys.stdout.flush()\n" + "".join(map(textwrap.dedent, sources))
+    )
+    return ScriptSuite(script)
+
+
+def run_script(tmp_path, *sources, **options):
+    suite = script_suite(tmp_path, *sources)
+    display = Display()
+    executor = Executor(suite, display, **options)
+    # The run must complete; if the process is blocked, the test fails.
+    asyncio.run(asyncio.wait_for(executor.run(1, None), timeout=60))
+    return suite, executor, display
+
+
+RESULT = """
+send(protocol.TEST_START, {"path": "test_a.py::test_a", "start_time": 1})
+send(
+    protocol.TEST_RESULT,
+    {"status": "OK", "end_time": 2, "description": "a", "output": ""},
+)
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX line endings")
+def test_large_error_output(tmp_path):
+    "A test process that writes a lot of error output isn't blocked"
+    suite, executor, display = run_script(
+        tmp_path,
+        """
+        for n in range(100_000):
+            print(f"error line {n}" + "." * 40, file=sys.stderr)
+        """,
+        RESULT,
+        """
+        send(protocol.RUN_END)
+        """,
+    )
+
+    assert suite.find_node("test_a.py::test_a").status == CTMethod.STATUS_PASS
+    assert display.errors == [None]
+    # Only the most recent error output is retained.
+    assert len(executor.error_buffer) == ERROR_LINES
+    assert executor.error_buffer[-1] == "error line 99999" + "." * 40
+    suite.close()
+
+
+def test_unexpected_end(tmp_path):
+    "If the test output ends unexpectedly, the error output is reported"
+    suite, executor, display = run_script(
+        tmp_path,
+        RESULT,
+        """
+        print("INTERNALERROR> something broke")
+        print("Traceback: it went wrong", file=sys.stderr)
+        sys.exit(3)
+        """,
+    )
+
+    # Results received before the output ended are kept.
+    assert suite.find_node("test_a.py::test_a").status == CTMethod.STATUS_PASS
+    assert executor.completed_count == 1
+    assert display.errors == [
+        "INTERNALERROR> something broke\nTraceback: it went wrong"
+    ]
+    suite.close()
+
+
+def test_no_output(tmp_path):
+    suite, executor, display = run_script(tmp_path, "sys.exit(4)\n")
+
+    assert executor.completed_count == 0
+    assert display.errors == ["Test output ended unexpectedly"]
+    suite.close()
+
+
+HANG = """
+import subprocess, time
+# Start a process of its own, that should also be stopped.
+child = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+with open("child.pid", "w") as f:
+    f.write(str(child.pid))
+send(protocol.TEST_START, {"path": "test_a.py::test_hang", "start_time": 3})
+time.sleep(60)
+"""
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    # A process that has exited, but hasn't been reaped yet, still exists.
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().split(") ")[-1][0] != "Z"
+    except FileNotFoundError:
+        return True
+
+
+def stop_script(tmp_path, *sources, timeout):
+    "Start a test run with a script, and stop it once a test is hanging"
+    suite = script_suite(tmp_path, *sources)
+    display = Display()
+    executor = Executor(suite, display, interval=0)
+
+    async def run_and_stop():
+        run = asyncio.create_task(executor.run(2, None))
+        await display.started.wait()
+        start = time.monotonic()
+        await executor.terminate(timeout=timeout)
+        await run
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(asyncio.wait_for(run_and_stop(), timeout=60))
+
+    # The process that the test started has also been stopped.
+    child = int((tmp_path / "child.pid").read_text())
+    deadline = time.monotonic() + 5
+    while is_running(child) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not is_running(child)
+
+    return suite, executor, display, elapsed
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses process groups")
+def test_stop(tmp_path, monkeypatch):
+    "A stopped run keeps its results, and reports the running test as an error"
+    monkeypatch.chdir(tmp_path)
+    suite, executor, display, elapsed = stop_script(tmp_path, RESULT, HANG, timeout=10)
+
+    # The test process was interrupted, so it didn't need to be killed.
+    assert elapsed < 5
+    assert executor.procs[0].returncode != -signal.SIGKILL
+    assert executor.stopped
+    assert display.errors == [None]
+
+    assert suite.find_node("test_a.py::test_a").status == CTMethod.STATUS_PASS
+    hang = suite.find_node("test_a.py::test_hang")
+    assert hang.status == CTMethod.STATUS_ERROR
+    assert hang.error == INTERRUPTED
+    assert executor.completed_count == 2
+    suite.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses process groups")
+def test_stop_escalation(tmp_path, monkeypatch):
+    "A test process that ignores interrupts is killed"
+    monkeypatch.chdir(tmp_path)
+    suite, executor, _display, elapsed = stop_script(
+        tmp_path,
+        """
+        import signal
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        """,
+        RESULT,
+        HANG,
+        timeout=0.2,
+    )
+
+    # Interrupted, then terminated, then killed.
+    assert 0.4 <= elapsed < 5
+    assert executor.procs[0].returncode == -signal.SIGKILL
+    assert suite.find_node("test_a.py::test_a").status == CTMethod.STATUS_PASS
+    assert suite.find_node("test_a.py::test_hang").status == CTMethod.STATUS_ERROR
+    suite.close()
+
+
+# A test run that hangs in its second test, unless the test is deselected.
+HANG_SHARD = """
+import faulthandler, signal, time
+deselected = set(open(sys.argv[1]).read().split()) if sys.argv[1] else set()
+if sys.argv[2]:
+    dump = open(sys.argv[2], "w")
+    faulthandler.register(signal.SIGUSR1, file=dump, all_threads=True)
+
+def hang():
+    time.sleep(60)
+
+paths = ["test_a.py::test_a", "test_a.py::test_hang", "test_b.py::test_b"]
+for n, path in enumerate(paths):
+    if path in deselected:
+        continue
+    send(protocol.TEST_START, {"path": path, "start_time": n})
+    if path == "test_a.py::test_hang":
+        hang()
+    send(
+        protocol.TEST_RESULT,
+        {"status": "OK", "end_time": n + 1, "description": path, "output": ""},
+    )
+send(protocol.RUN_END)
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses signals")
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        ({"timeout": 0.5}, TIMED_OUT.format(timeout=0.5)),
+        ({"output_timeout": 0.5}, NO_OUTPUT.format(timeout=0.5)),
+    ],
+)
+def test_timeout(tmp_path, options, message):
+    "A test that times out is stopped, and the remaining tests are run"
+    start = time.monotonic()
+    suite, executor, display = run_script(tmp_path, HANG_SHARD, **options)
+
+    assert time.monotonic() - start < 10
+    assert display.errors == [None]
+    # The test process was killed, and a new one resumed the run.
+    assert len(executor.procs) == 2
+    assert executor.procs[0].returncode == -signal.SIGKILL
+    assert executor.completed_count == 3
+
+    assert suite.find_node("test_a.py::test_a").status == CTMethod.STATUS_PASS
+    assert suite.find_node("test_b.py::test_b").status == CTMethod.STATUS_PASS
+    hang = suite.find_node("test_a.py::test_hang")
+    assert hang.status == CTMethod.STATUS_ERROR
+    # The error includes the stack of the test process.
+    assert hang.error.startswith(message + "\n\n")
+    assert "in hang" in hang.error
+    suite.close()
+
+
+def test_no_output_before_tests(tmp_path):
+    "A test process that stops producing output before any test starts is killed"
+    suite, executor, display = run_script(
+        tmp_path, "time.sleep(60)\n", output_timeout=0.5
+    )
+
+    assert len(executor.procs) == 1
+    assert executor.completed_count == 0
+    assert display.errors == [NO_OUTPUT.format(timeout=0.5)]
+    suite.close()
+
+
+class MissingSuite(PTSuite):
+    "A test suite whose test runner isn't installed."
+
+    def execute_commandline(self, labels, **options):
+        return [str(Path(__file__).parent / "no-such-pytest")]
+
+
+def test_missing_runner():
+    "A test runner that can't be started is reported as an error"
+    suite = MissingSuite()
+    display = Display()
+    asyncio.run(Executor(suite, display).run(1, None))
+
+    assert len(display.errors) == 1
+    assert display.errors[0].startswith("Unable to start ")
+    assert "no-such-pytest" in display.errors[0]
+    # Change notifications are no longer held back.
+    assert suite._held_changes is None
+    suite.close()
+
+
+class BrokenSuite(PTSuite):
+    "A test suite that fails when a run starts."
+
+    def execute_commandline(self, labels, **options):
+        raise RuntimeError("Broken")
+
+
+def test_failed_run():
+    "If a run fails, change notifications are no longer held back"
+    suite = BrokenSuite()
+    with pytest.raises(RuntimeError):
+        asyncio.run(Executor(suite, Display()).run(1, None))
+
+    assert suite._held_changes is None
+    suite.close()
+
+
+class TimedDisplay(Display):
+    "A display that records when each test is shown to start and end."
+
+    def __init__(self):
+        super().__init__()
+        self.shown = {}
+
+    def executor_test_start(self, test_path):
+        self.shown[f"start {test_path}"] = time.monotonic()
+
+    def executor_test_end(self, test_path, result, remaining_time):
+        self.shown[f"end {test_path}"] = time.monotonic()
+
+
+def test_display_before_slow_test(tmp_path):
+    "Quick results, and the start of a slow test, are shown while it runs"
+    suite = script_suite(
+        tmp_path,
+        """
+        for n in range(3):
+            send(protocol.TEST_START, {"path": f"test_a.py::test_{n}", "start_time": n})
+            send(
+                protocol.TEST_RESULT,
+                {"status": "OK", "end_time": n, "description": "", "output": ""},
+            )
+        send(protocol.TEST_START, {"path": "test_a.py::test_slow", "start_time": 3})
+        time.sleep(3)
+        send(
+            protocol.TEST_RESULT,
+            {"status": "OK", "end_time": 6, "description": "", "output": ""},
+        )
+        send(protocol.RUN_END)
+        """,
+    )
+    display = TimedDisplay()
+    executor = Executor(suite, display, interval=0.2)
+    asyncio.run(asyncio.wait_for(executor.run(4, None), timeout=60))
+    end = time.monotonic()
+
+    # The last quick result, and the start of the slow test, are shown
+    # soon after they are reported, rather than when the slow test ends.
+    assert end - display.shown["end test_a.py::test_2"] > 2
+    assert end - display.shown["start test_a.py::test_slow"] > 2
+    suite.close()
@@ -0,0 +1,72 @@
+from cricket.history import ResultHistory
+from cricket.model import TestMethod as CTMethod
+
+
+def test_record():
+    "Results are returned oldest first"
+    history = ResultHistory(depth=4)
+    ordinal = history.allocate()
+    assert history.results(ordinal) == []
+
+    history.record(ordinal, CTMethod.STATUS_PASS, 0.5)
+    history.record(ordinal, CTMethod.STATUS_FAIL, 1.5)
+    assert history.results(ordinal) == [
+        (CTMethod.STATUS_PASS, 0.5),
+        (CTMethod.STATUS_FAIL, 1.5),
+    ]
+
+
+def test_ring_buffer():
+    "Only the most recent results are retained"
+    history = ResultHistory(depth=3)
+    first = history.allocate()
+    second = history.allocate()
+    statuses = [
+        CTMethod.STATUS_PASS,
+        CTMethod.STATUS_SKIP,
+        CTMethod.STATUS_FAIL,
+        CTMethod.STATUS_ERROR,
+        CTMethod.STATUS_EXPECTED_FAIL,
+    ]
+    for n, status in enumerate(statuses):
+        history.record(first, status, float(n))
+    history.record(second, CTMethod.STATUS_UNEXPECTED_SUCCESS, None)
+
+    assert history.count(first) == 5
+    assert history.results(first) == [
+        (CTMethod.STATUS_FAIL, 2.0),
+        (CTMethod.STATUS_ERROR, 3.0),
+        (CTMethod.STATUS_EXPECTED_FAIL, 4.0),
+    ]
+    # Tests don't overwrite each other's history.
+    assert history.results(second) == [(CTMethod.STATUS_UNEXPECTED_SUCCESS, 0.0)]
+
+
+def test_release():
+    "Released ordinals are reused, without their old history"
+    history = ResultHistory(depth=3)
+    first = history.allocate()
+    history.allocate()
+    history.record(first, CTMethod.STATUS_FAIL, 1.0)
+    nbytes = history.nbytes
+
+    history.release(first)
+    assert len(history) == 1
+    assert history.allocate() == first
+    assert history.results(first) == []
+    # Storage doesn't grow when ordinals are reused.
+    assert history.nbytes == nbytes
+
+
+def test_storage_is_bounded():
+    "Storage is proportional to the number of tests, not the number of results"
+    history = ResultHistory(depth=50)
+    ordinals = [history.allocate() for _ in range(1000)]
+    nbytes = history.nbytes
+    for _ in range(60):
+        for ordinal in ordinals:
+            history.record(ordinal, CTMethod.STATUS_PASS, 0.1)
+
+    assert history.nbytes == nbytes
+    # 1 byte of status and 4 bytes of duration per result.
+    assert nbytes <= 1000 * 50 * 5 + 1000 * 8
@@ -2,6 +2,7 @@ import sys
 
 import pytest
 
+from cricket import model
 from cricket.model import (
     TestCase as CTCase,
 )
@@ -11,7 +12,17 @@ from cricket.model import (
 from cricket.model import (
     TestModule as CTModule,
 )
+from cricket.model import (
+    TestSuiteProblems as CTProblems,
+)
+from cricket.model import (
+    TestSuiteSearch as CTSearch,
+)
+from cricket.model import (
+    TestSuiteSlowest as CTSlowest,
+)
 from cricket.pytest.model import PyTestTestSuite as PTSuite
+from cricket.store import ResultStore
 
 
 def _full_tree(node):
@@ -158,6 +169,874 @@ def test_with_tests_and_errors(test_list, errors, expected_errors, expected_tree
     )
 
 
+class Recorder:
+    "A listener that records the notifications emitted by a test suite"
+
+    def __init__(self):
+        self.events = []
+
+    # List sources (unlike tree sources) don't provide a parent.
+    def source_insert(self, index, item, parent=None):
+        self.events.append(("insert", parent, index, item))
+
+    def source_remove(self, index, item, parent=None):
+        self.events.append(("remove", parent, index, item))
+
+    def source_change(self, item):
+        self.events.append(("change", item))
+
+    def source_clear(self):
+        self.events.append(("clear",))
+
+
+def test_children_sorted():
+    "Children are kept in sorted order, regardless of insertion order"
+    test_suite = PTSuite()
+    recorder = Recorder()
+    test_suite.add_listener(recorder)
+
+    for test_id in [
+        "tests.py::test_b",
+        "tests.py::test_d",
+        "tests.py::test_a",
+        "tests.py::test_c",
+        "tests.py::test_e",
+    ]:
+        test_suite.put_test(test_id)
+
+    module = test_suite["tests.py"]
+    assert [module[i].name for i in range(len(module))] == [
+        "test_a",
+        "test_b",
+        "test_c",
+        "test_d",
+        "test_e",
+    ]
+    # Each insert notification reports the sorted position of the new child.
+    assert [
+        (event[2], event[3].name) for event in recorder.events if event[1] is module
+    ] == [(0, "test_b"), (1, "test_d"), (0, "test_a"), (2, "test_c"), (4, "test_e")]
+
+    # Removing a child reports the position it was removed from.
+    test_c = module["test_c"]
+    del module["test_c"]
+    assert recorder.events[-1] == ("remove", module, 2, test_c)
+    assert [module[i].name for i in range(len(module))] == [
+        "test_a",
+        "test_b",
+        "test_d",
+        "test_e",
+    ]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_bulk_load_notifications():
+    "A bulk load emits a single insert for the root of each new subtree"
+    test_suite = PTSuite()
+    recorder = Recorder()
+    test_suite.add_listener(recorder)
+
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "more_tests.py::test_other_method",
+            "more_tests.py::FunkyTestCase::test_this_does_make_sense",
+            "deep_tests/package.py::test_deep_widget",
+        ]
+    )
+
+    assert [
+        (event[0], event[1], event[2], event[3].name) for event in recorder.events
+    ] == [
+        ("insert", test_suite, 0, "deep_tests"),
+        ("insert", test_suite, 1, "more_tests.py"),
+        ("insert", test_suite, 2, "tests.py"),
+    ]
+
+    # Rediscovery only emits inserts for the subtrees that are new.
+    recorder.events = []
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "tests.py::test_another_method",
+            "more_tests.py::test_other_method",
+            "more_tests.py::FunkyTestCase::test_this_does_make_sense",
+            "more_tests.py::FunkyTestCase::test_a_new_method",
+            "more_tests.py::JankyTestCase::test_things",
+            "deep_tests/package.py::test_deep_widget",
+            "app.py::test_app",
+        ]
+    )
+
+    assert [
+        (event[0], event[1].name, event[2], event[3].name) for event in recorder.events
+    ] == [
+        ("insert", "tests.py", 0, "test_another_method"),
+        ("insert", "FunkyTestCase", 0, "test_a_new_method"),
+        ("insert", None, 0, "app.py"),
+        ("insert", "more_tests.py", 1, "JankyTestCase"),
+    ]
+
+    # The resulting tree is sorted.
+    module = test_suite["more_tests.py"]
+    assert [module[i].name for i in range(len(module))] == [
+        "FunkyTestCase",
+        "JankyTestCase",
+        "test_other_method",
+    ]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_rediscovery_removes_stale_tests():
+    "Tests that are no longer discovered are removed from the tree"
+    test_suite = PTSuite()
+    problems = CTProblems(test_suite)
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "tests.py::FunkyTestCase::test_something_unnecessary",
+            "more_tests.py::test_other_method",
+            "more_tests.py::FunkyTestCase::test_this_does_make_sense",
+            "more_tests.py::FunkyTestCase::test_this_doesnt_make_sense",
+            "deep_tests/package.py::test_deep_widget",
+        ]
+    )
+    test_suite.put_test(
+        "more_tests.py::FunkyTestCase::test_this_doesnt_make_sense"
+    ).set_result("", CTMethod.STATUS_FAIL, None, "Broken", 0.1)
+    assert len(problems) == 1
+
+    recorder = Recorder()
+    test_suite.add_listener(recorder)
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "more_tests.py::test_other_method",
+            "more_tests.py::FunkyTestCase::test_this_does_make_sense",
+            "more_tests.py::FunkyTestCase::test_a_new_method",
+        ]
+    )
+
+    assert _full_tree(test_suite) == [
+        (CTModule, "tests.py", ["test_method"]),
+        (
+            CTModule,
+            "more_tests.py",
+            [
+                "test_other_method",
+                (
+                    CTCase,
+                    "FunkyTestCase",
+                    ["test_this_does_make_sense", "test_a_new_method"],
+                ),
+            ],
+        ),
+    ]
+
+    # Only the topmost node of each stale subtree is removed.
+    assert [
+        (event[0], event[1].name, event[2], event[3].name) for event in recorder.events
+    ] == [
+        ("insert", "FunkyTestCase", 0, "test_a_new_method"),
+        ("remove", None, 0, "deep_tests"),
+        ("remove", "tests.py", 0, "FunkyTestCase"),
+        ("remove", "FunkyTestCase", 2, "test_this_doesnt_make_sense"),
+    ]
+
+    # The index and the counts have been updated.
+    assert test_suite.test_count == 4
+    assert sorted(test_suite._tests) == [
+        "more_tests.py::FunkyTestCase::test_a_new_method",
+        "more_tests.py::FunkyTestCase::test_this_does_make_sense",
+        "more_tests.py::test_other_method",
+        "tests.py::test_method",
+    ]
+    assert test_suite.find_tests(labels=["deep_tests"]) == (0, [])
+
+    # Removed tests are no longer problems.
+    assert len(problems) == 0
+
+
+class BulkRecorder(Recorder):
+    "A listener that accepts changes in bulk"
+
+    def source_change_many(self, items):
+        self.events.append(("change_many", items))
+
+
+def test_held_changes():
+    "Change notifications can be held back, and delivered in bulk"
+    test_suite = PTSuite()
+    test_suite.put_tests(["tests.py::test_a", "tests.py::test_b"])
+    test_a = test_suite.put_test("tests.py::test_a")
+    test_b = test_suite.put_test("tests.py::test_b")
+    recorder = Recorder()
+    bulk_recorder = BulkRecorder()
+    test_suite.add_listener(recorder)
+    test_suite.add_listener(bulk_recorder)
+
+    test_suite.hold_changes()
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    test_b.set_result("", CTMethod.STATUS_FAIL, None, "Broken", 0.1)
+    test_a.set_result("", CTMethod.STATUS_ERROR, None, "Error", 0.1)
+    assert recorder.events == []
+
+    # Repeated changes to an item are coalesced.
+    test_suite.flush_changes()
+    assert recorder.events == [("change", test_a), ("change", test_b)]
+    assert bulk_recorder.events == [("change_many", [test_a, test_b])]
+
+    # Held changes are delivered before any structural change.
+    recorder.events = []
+    test_b.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    test_suite.put_test("tests.py::test_c")
+    assert [event[0] for event in recorder.events] == ["change", "insert"]
+
+    # Once released, changes are delivered immediately.
+    recorder.events = []
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    test_suite.release_changes()
+    assert recorder.events == [("change", test_a)]
+    test_b.set_result("", CTMethod.STATUS_SKIP, None, None, 0.1)
+    assert recorder.events == [("change", test_a), ("change", test_b)]
+
+
+def test_overlapping_holds(tmp_path):
+    "Changes are held until every hold has been released"
+    store = ResultStore(tmp_path / "results.sqlite3")
+    store.record("tests.py::test_a", CTMethod.STATUS_PASS, 0.5, "", None, None)
+    store.flush()
+
+    test_suite = PTSuite()
+    test_suite.store = store
+    test_suite.put_tests(["tests.py::test_a", "tests.py::test_b"])
+    test_b = test_suite.put_test("tests.py::test_b")
+    recorder = Recorder()
+    test_suite.add_listener(recorder)
+
+    # Results are loaded in the background, while a test run starts.
+    loading = test_suite.load_results(batch_size=1)
+    next(loading)
+    test_a = test_suite.find_node("tests.py::test_a")
+    assert recorder.events == [("change", test_a)]
+    recorder.events = []
+    test_suite.hold_changes()
+    test_b.set_result("", CTMethod.STATUS_FAIL, None, "Broken", 0.1)
+
+    # Finishing the load doesn't release the hold of the test run.
+    for _ in loading:
+        pass
+    assert recorder.events == []
+
+    test_suite.release_changes()
+    assert recorder.events == [("change", test_b)]
+    assert test_suite._held_changes is None
+    test_suite.close()
+
+
+def test_result_history():
+    "Each test keeps a history of its recent results"
+    test_suite = PTSuite()
+    test_suite.put_tests(["tests.py::test_a", "tests.py::test_b"])
+    test_a = test_suite.put_test("tests.py::test_a")
+    test_b = test_suite.put_test("tests.py::test_b")
+    assert test_a.history == []
+
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 0.5)
+    test_a.set_result("", CTMethod.STATUS_FAIL, None, "Broken", 1.5)
+    assert test_a.history == [
+        (CTMethod.STATUS_PASS, 0.5),
+        (CTMethod.STATUS_FAIL, 1.5),
+    ]
+    assert test_b.history == []
+
+    # The history of removed tests is discarded.
+    test_suite.del_test("tests.py::test_a")
+    assert len(test_suite.history) == 0
+    test_b.set_result("", CTMethod.STATUS_SKIP, None, None, 0.0)
+    assert test_b.history == [(CTMethod.STATUS_SKIP, 0.0)]
+
+
+def test_result_payloads():
+    "Output and errors are kept in the payload log, not on the test"
+    test_suite = PTSuite()
+    test_suite.put_tests(["tests.py::test_a"])
+    test_a = test_suite.put_test("tests.py::test_a")
+
+    test_a.set_result("", CTMethod.STATUS_FAIL, "out", "Broken", 0.5)
+    assert test_a.output == "out"
+    assert test_a.error == "Broken"
+    assert isinstance(test_a._error, int)
+    assert len(test_suite.payloads) == 2
+
+    # Replaced payloads are released.
+    test_a.set_result("", CTMethod.STATUS_PASS, "new out", None, 0.5)
+    assert test_a.output == "new out"
+    assert test_a.error is None
+    assert len(test_suite.payloads) == 1
+
+    # Identical payloads are shared between tests.
+    test_suite.put_tests(["tests.py::test_b"])
+    test_b = test_suite.put_test("tests.py::test_b")
+    test_b.set_result("", CTMethod.STATUS_PASS, "new out", None, 0.5)
+    assert test_b._output == test_a._output
+    assert test_suite.payloads.bytes_saved == len("new out")
+
+    # The payloads of removed tests are released.
+    test_suite.del_test("tests.py::test_a")
+    assert test_b.output == "new out"
+    test_suite.del_test("tests.py::test_b")
+    assert len(test_suite.payloads) == 0
+
+
+def test_stored_results(tmp_path):
+    "Stored results are loaded explicitly, or in batches in the background"
+    store = ResultStore(tmp_path / "results.sqlite3")
+    store.record("tests.py::test_a", CTMethod.STATUS_FAIL, 1.5, "A", None, "Broken")
+    store.record("tests.py::test_b", CTMethod.STATUS_PASS, 0.5, "B", "out", None)
+    store.flush()
+
+    test_suite = PTSuite()
+    test_suite.store = store
+    problems = CTProblems(test_suite)
+    test_suite.put_tests(["tests.py::test_a", "tests.py::test_b", "tests.py::test_c"])
+    test_a = test_suite.put_test("tests.py::test_a")
+    test_b = test_suite.put_test("tests.py::test_b")
+    test_c = test_suite.put_test("tests.py::test_c")
+
+    # Nothing is loaded until it is needed.
+    assert not test_a.result_loaded
+    assert test_suite.count_tests(status={CTMethod.STATUS_UNKNOWN}) == 3
+
+    # Reading a result doesn't load it.
+    assert test_b.status == CTMethod.STATUS_UNKNOWN
+    assert test_b.duration is None
+    assert not test_b.result_loaded
+
+    # A result can be loaded explicitly, which updates the counts.
+    test_b.load_result()
+    assert test_b.duration == 0.5
+    assert test_b.output == "out"
+    assert test_suite.count_tests(status={CTMethod.STATUS_PASS}) == 1
+
+    # The remaining results can be loaded in batches.
+    assert len(list(test_suite.load_results(batch_size=1))) == 2
+    assert test_a.status == CTMethod.STATUS_FAIL
+    assert test_a.error == "Broken"
+    assert test_c.result_loaded
+    assert test_c.status == CTMethod.STATUS_UNKNOWN
+    assert test_a in problems
+
+    # New results replace stored results.
+    test_suite.put_tests(["tests.py::test_d"])
+    test_d = test_suite.put_test("tests.py::test_d")
+    test_d.set_result("", CTMethod.STATUS_SKIP, None, None, 0.1)
+    assert test_d.status == CTMethod.STATUS_SKIP
+    assert list(test_suite.load_results()) == []
+    test_suite.close()
+
+
+def test_close(tmp_path):
+    "Closing a suite writes the results that are waiting to be stored"
+    store = ResultStore(tmp_path / "results.sqlite3", batch_size=100)
+    test_suite = PTSuite()
+    test_suite.store = store
+    test_suite.put_tests(["tests.py::test_a"])
+    test_suite.put_test("tests.py::test_a").set_result(
+        "A", CTMethod.STATUS_PASS, "out", None, 0.5
+    )
+    store.record("tests.py::test_a", CTMethod.STATUS_PASS, 0.5, "A", "out", None)
+
+    test_suite.close()
+    assert test_suite.store is None
+    assert test_suite.payloads._file is None
+
+    store = ResultStore(tmp_path / "results.sqlite3")
+    assert store.get("tests.py::test_a") == (
+        CTMethod.STATUS_PASS,
+        0.5,
+        "A",
+        "out",
+        None,
+    )
+    store.close()
+
+
+def test_search():
+    "Nodes can be found by searching for part of their path"
+    test_suite = PTSuite()
+    test_suite.put_tests(
+        [
+            "tests/test_widgets.py::TestButton::test_press",
+            "tests/test_widgets.py::TestButton::test_release",
+            "tests/test_widgets.py::test_label",
+            "tests/test_window.py::TestWindow::test_press_close",
+        ]
+    )
+    test_suite.put_test("tests/test_app.py::test_startup")
+
+    def paths(query):
+        return sorted(node.path for node in test_suite.search(query))
+
+    assert paths("press") == [
+        "tests/test_widgets.py::TestButton::test_press",
+        "tests/test_window.py::TestWindow::test_press_close",
+    ]
+    # Searches ignore case, and short queries are supported.
+    assert paths("BUTTON") == ["tests/test_widgets.py::TestButton"]
+    assert paths("ap") == ["tests/test_app.py"]
+    assert paths("missing") == []
+    assert paths("") == []
+
+    # Queries can span the parts of a path.
+    assert paths("widgets.py::TestButton::test_p") == [
+        "tests/test_widgets.py::TestButton::test_press",
+    ]
+    assert paths("widgets.py::test") == [
+        "tests/test_widgets.py::TestButton",
+        "tests/test_widgets.py::test_label",
+    ]
+    assert paths("/test_wi") == ["tests/test_widgets.py", "tests/test_window.py"]
+
+    # Removed nodes aren't found.
+    test_suite.del_test("tests/test_window.py::TestWindow::test_press_close")
+    assert paths("press") == ["tests/test_widgets.py::TestButton::test_press"]
+    assert paths("window") == []
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_search_view():
+    "The search view shows the tests that match a query"
+    test_suite = PTSuite()
+    test_suite.put_tests(
+        [
+            "tests/test_widgets.py::TestButton::test_press",
+            "tests/test_widgets.py::TestButton::test_release",
+            "tests/test_widgets.py::test_label",
+            "tests/test_window.py::TestWindow::test_press_close",
+        ]
+    )
+    search = CTSearch(test_suite)
+    recorder = Recorder()
+    search.add_listener(recorder)
+
+    search.search("button")
+    tests = search["tests"]
+    assert [event[0] for event in recorder.events] == ["clear", "insert"]
+    assert len(tests) == 1
+    assert [test.name for test in tests["test_widgets.py"]["TestButton"]] == [
+        "test_press",
+        "test_release",
+    ]
+
+    # Changes to matching tests are passed on.
+    recorder.events = []
+    press = test_suite.put_test("tests/test_widgets.py::TestButton::test_press")
+    press.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    test_suite.put_test("tests/test_widgets.py::test_label").set_result(
+        "", CTMethod.STATUS_PASS, None, None, 0.1
+    )
+    assert recorder.events == [("change", search._tests[press])]
+
+    # A new query replaces the matches.
+    search.search("press")
+    assert sorted(test.path for test in search._tests) == [
+        "tests/test_widgets.py::TestButton::test_press",
+        "tests/test_window.py::TestWindow::test_press_close",
+    ]
+
+    # Removed tests are no longer matches.
+    test_suite.del_test("tests/test_window.py::TestWindow::test_press_close")
+    assert len(search["tests"]) == 1
+
+
+def test_durations():
+    "Total durations and rankings are maintained as results are reported"
+    test_suite = PTSuite()
+    test_suite.put_tests(
+        [
+            "tests.py::TestCase::test_a",
+            "tests.py::TestCase::test_b",
+            "tests.py::test_c",
+            "more_tests.py::test_d",
+        ]
+    )
+    test_a = test_suite.put_test("tests.py::TestCase::test_a")
+    test_b = test_suite.put_test("tests.py::TestCase::test_b")
+    test_c = test_suite.put_test("tests.py::test_c")
+    test_d = test_suite.put_test("more_tests.py::test_d")
+    module = test_suite["tests.py"]
+    case = module["TestCase"]
+
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 2.0)
+    test_b.set_result("", CTMethod.STATUS_PASS, None, None, 1.0)
+    test_c.set_result("", CTMethod.STATUS_PASS, None, None, 0.5)
+    test_d.set_result("", CTMethod.STATUS_PASS, None, None, 2.5)
+    assert case.duration == 3.0
+    assert module.duration == 3.5
+    assert test_suite.duration == 6.0
+    assert test_suite.slowest_tests.top(2) == [test_d, test_a]
+    assert test_suite.slowest_nodes.top(3) == [
+        module,
+        case,
+        test_suite["more_tests.py"],
+    ]
+
+    # A new result replaces the old duration.
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 0.25)
+    assert case.duration == 1.25
+    assert test_suite.slowest_tests.top(2) == [test_d, test_b]
+    assert test_suite.slowest_nodes.top(1) == [test_suite["more_tests.py"]]
+
+    # Removed nodes are removed from the totals and rankings.
+    test_suite.del_test("more_tests.py::test_d")
+    assert test_suite.duration == 1.75
+    assert test_suite.slowest_tests.top(1) == [test_b]
+    assert test_suite.slowest_nodes.top(3) == [module, case]
+
+
+def test_slowest_view():
+    "The slowest view lists the slowest tests, updating as results arrive"
+    test_suite = PTSuite()
+    test_suite.put_tests(["tests.py::test_a", "tests.py::test_b", "tests.py::test_c"])
+    test_a = test_suite.put_test("tests.py::test_a")
+    test_b = test_suite.put_test("tests.py::test_b")
+    test_c = test_suite.put_test("tests.py::test_c")
+    slowest = CTSlowest(test_suite, test_suite.slowest_tests, size=2)
+    recorder = Recorder()
+    slowest.add_listener(recorder)
+    assert len(slowest) == 0
+
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 1.0)
+    test_b.set_result("", CTMethod.STATUS_PASS, None, None, 2.0)
+    assert [row.node for row in slowest] == [test_b, test_a]
+    assert slowest[0].duration_label == "2.00s"
+    assert slowest[0].path == "tests.py::test_b"
+
+    # A test that isn't one of the slowest doesn't change the list.
+    recorder.events = []
+    test_c.set_result("", CTMethod.STATUS_PASS, None, None, 0.5)
+    assert recorder.events == []
+
+    # A change of duration that keeps the order updates the row.
+    test_b.set_result("", CTMethod.STATUS_PASS, None, None, 1.5)
+    assert recorder.events == [("change", slowest[0])]
+
+    # A change of order rebuilds the list.
+    recorder.events = []
+    test_c.set_result("", CTMethod.STATUS_PASS, None, None, 3.0)
+    assert [row.node for row in slowest] == [test_c, test_b]
+    assert [event[0] for event in recorder.events] == ["clear", "insert", "insert"]
+
+
+def test_slowest_view_removal():
+    "A timed module that is no longer discovered leaves the slowest view"
+    test_suite = PTSuite()
+    test_suite.refresh(["a.py::test_a", "b.py::test_b"])
+    test_suite.put_test("a.py::test_a").set_result(
+        "", CTMethod.STATUS_PASS, None, None, 2.0
+    )
+    test_suite.put_test("b.py::test_b").set_result(
+        "", CTMethod.STATUS_PASS, None, None, 1.0
+    )
+    slowest = CTSlowest(test_suite, test_suite.slowest_nodes)
+    assert [row.path for row in slowest] == ["a.py", "b.py"]
+
+    test_suite.refresh(["b.py::test_b"])
+    assert [row.path for row in slowest] == ["b.py"]
+
+
+def test_problems_view():
+    "The problems view is a filtered projection of the suite"
+    test_suite = PTSuite()
+    test_suite.put_tests(
+        [
+            "tests.py::test_method",
+            "tests.py::FunkyTestCase::test_a",
+            "tests.py::FunkyTestCase::test_b",
+            "more_tests.py::test_other_method",
+        ]
+    )
+    problems = CTProblems(test_suite)
+    recorder = Recorder()
+    problems.add_listener(recorder)
+
+    # Passing tests that have never failed don't affect the view.
+    test_suite.put_test("tests.py::test_method").set_result(
+        "", CTMethod.STATUS_PASS, None, None, 0.1
+    )
+    assert len(problems) == 0
+    assert recorder.events == []
+
+    # A failure adds the test, and any missing ancestors, with one notification.
+    test_a = test_suite.put_test("tests.py::FunkyTestCase::test_a")
+    test_a.set_result("output", CTMethod.STATUS_FAIL, None, "Broken", 0.1)
+    module = problems["tests.py"]
+    case = module["FunkyTestCase"]
+    assert test_a in problems
+    assert [(event[0], event[1], event[2], event[3]) for event in recorder.events] == [
+        ("insert", problems, 0, module)
+    ]
+
+    # Filtered nodes share the results of the suite, and don't copy them.
+    assert case[0].node is test_a
+    assert case[0].error == "Broken"
+    assert case[0].path == "tests.py::FunkyTestCase::test_a"
+    assert case.name == "FunkyTestCase"
+    assert not hasattr(case[0], "_impl")
+
+    # A second failure is inserted into the existing subtree, in sorted order.
+    recorder.events = []
+    test_b = test_suite.put_test("tests.py::FunkyTestCase::test_b")
+    test_b.set_result("", CTMethod.STATUS_ERROR, None, "Error", 0.1)
+    test_a.set_result("", CTMethod.STATUS_ERROR, None, "Error", 0.1)
+    assert [event[0] for event in recorder.events] == ["insert", "change"]
+    assert recorder.events[0] == ("insert", case, 1, case[1])
+    assert recorder.events[1] == ("change", case[0])
+
+    # Passing removes the test; empty ancestors are removed with it.
+    recorder.events = []
+    test_a.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    assert [event[:3] for event in recorder.events] == [("remove", case, 0)]
+    test_b.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    assert recorder.events[1][:3] == ("remove", problems, 0)
+    assert recorder.events[1][3].node is test_suite["tests.py"]
+    assert len(problems) == 0
+    assert test_a not in problems
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_test_index():
+    "Tests can be retrieved and removed by test id"
+    test_suite = PTSuite()
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "deep_tests/package.py::DeepTestCase::test_doo_hickey",
+        ]
+    )
+
+    test = test_suite.put_test("deep_tests/package.py::DeepTestCase::test_doo_hickey")
+    assert (
+        test
+        is test_suite["deep_tests"]["package.py"]["DeepTestCase"]["test_doo_hickey"]
+    )
+    assert test_suite.put_test(test.path) is test
+
+    # Removing a test removes it from the index, and prunes empty nodes.
+    test_suite.del_test("deep_tests/package.py::DeepTestCase::test_doo_hickey")
+    assert _full_tree(test_suite) == [(CTModule, "tests.py", ["test_method"])]
+
+    # Removing a test that doesn't exist is a no-op...
+    test_suite.del_test("deep_tests/package.py::DeepTestCase::test_doo_hickey")
+    test_suite.del_test("tests.py::test_unknown")
+    assert _full_tree(test_suite) == [(CTModule, "tests.py", ["test_method"])]
+
+    # ... and removing the last test empties the tree.
+    test_suite.del_test("tests.py::test_method")
+    assert _full_tree(test_suite) == []
+
+    # Once removed, a test can be added again.
+    new_test = test_suite.put_test("tests.py::test_method")
+    assert new_test is test_suite["tests.py"]["test_method"]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_derived_paths():
+    "Node paths are derived from the parent chain"
+    test_suite = PTSuite()
+    test_suite.refresh(
+        [
+            "deep_tests/package.py::DeepTestCase::test_doo_hickey",
+            "deep_tests/other.py::DeepTestCase::test_doo_hickey",
+        ]
+    )
+
+    package = test_suite["deep_tests"]["package.py"]
+    test = package["DeepTestCase"]["test_doo_hickey"]
+    assert test.path == "deep_tests/package.py::DeepTestCase::test_doo_hickey"
+    assert package["DeepTestCase"].path == "deep_tests/package.py::DeepTestCase"
+    assert package.path == "deep_tests/package.py"
+
+    # Test methods don't store their path; nodes cache it once computed.
+    assert test._path is None
+    assert package._path == "deep_tests/package.py"
+
+    # Nodes don't have an instance dictionary.
+    assert not hasattr(test, "__dict__")
+    assert not hasattr(package, "__dict__")
+
+    # Names that occur more than once in the suite are shared.
+    other = test_suite["deep_tests"]["other.py"]["DeepTestCase"]["test_doo_hickey"]
+    assert other.name is test.name
+
+
+def test_shared_icons(monkeypatch):
+    "Icons are loaded once, and shared by every node"
+    loaded = []
+
+    def Icon(path):
+        loaded.append(path)
+        return object()
+
+    monkeypatch.setattr(model, "_icons", {})
+    monkeypatch.setattr(model.toga, "Icon", Icon)
+
+    test_suite = PTSuite()
+    test_suite.refresh(
+        [
+            "tests.py::TestCase::test_method",
+            "tests.py::TestCase::test_other_method",
+            "more_tests.py::TestCase::test_method",
+        ]
+    )
+    # No icons are loaded until a label is requested.
+    assert loaded == []
+
+    test = test_suite.put_test("tests.py::TestCase::test_method")
+    other_test = test_suite.put_test("more_tests.py::TestCase::test_method")
+    assert test.label[0] is other_test.label[0]
+    assert test_suite["tests.py"].label[0] is test_suite["more_tests.py"].label[0]
+    assert (
+        test_suite["tests.py"]["TestCase"].label[0]
+        is test_suite["more_tests.py"]["TestCase"].label[0]
+    )
+
+    test.set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    assert test.label[0] is not other_test.label[0]
+    assert test.label[0] is test.label[0]
+
+    assert sorted(loaded) == [
+        "resources/status/pass.png",
+        "resources/status/unknown.png",
+        "resources/test_case.png",
+        "resources/test_module.png",
+    ]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_counts():
+    "Nodes keep aggregate counts of the tests below them"
+    test_suite = PTSuite()
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "tests.py::FunkyTestCase::test_something_unnecessary",
+            "deep_tests/package.py::test_deep_widget",
+            "deep_tests/package.py::DeepTestCase::test_doo_hickey",
+            "deep_tests/package.py::DeepTestCase::test_thingamajig",
+        ]
+    )
+    deep_tests = test_suite["deep_tests"]
+    test_case = deep_tests["package.py"]["DeepTestCase"]
+
+    assert test_suite.test_count == 5
+    assert test_suite.active_count == 5
+    assert deep_tests.test_count == 3
+    assert test_case.test_count == 2
+
+    # Results are counted by status.
+    test_case["test_doo_hickey"].set_result(
+        "", CTMethod.STATUS_FAIL, None, "Broken", 0.1
+    )
+    test_suite.put_test("tests.py::test_method").set_result(
+        "", CTMethod.STATUS_PASS, None, None, 0.1
+    )
+    assert test_suite.count_tests(status=[CTMethod.STATUS_FAIL]) == 1
+    assert test_suite.count_tests(status=[CTMethod.STATUS_PASS]) == 1
+    assert test_suite.count_tests(status=[CTMethod.STATUS_UNKNOWN]) == 3
+    assert deep_tests.count_tests(status=[CTMethod.STATUS_FAIL]) == 1
+    assert deep_tests.count_tests(status=[CTMethod.STATUS_PASS]) == 0
+    assert test_suite.find_tests(status=[CTMethod.STATUS_FAIL]) == (
+        1,
+        ["deep_tests/package.py::DeepTestCase::test_doo_hickey"],
+    )
+
+    # A new result replaces the old status in the counts.
+    test_case["test_doo_hickey"].set_result("", CTMethod.STATUS_PASS, None, None, 0.1)
+    assert test_suite.count_tests(status=[CTMethod.STATUS_FAIL]) == 0
+    assert test_suite.count_tests(status=[CTMethod.STATUS_PASS]) == 2
+
+    # Inactive tests are counted, but aren't active.
+    test_case["test_thingamajig"].set_active(False)
+    assert test_suite.test_count == 5
+    assert test_suite.active_count == 4
+    assert test_case.active_count == 1
+    assert test_suite.find_tests() == (
+        4,
+        [
+            "deep_tests/package.py::DeepTestCase::test_doo_hickey",
+            "deep_tests/package.py::test_deep_widget",
+            "tests.py",
+        ],
+    )
+
+    # Adding and removing tests updates the counts of all ancestors.
+    test_suite.put_test("deep_tests/package.py::DeepTestCase::test_whatsit")
+    assert test_suite.test_count == 6
+    assert test_case.active_count == 2
+
+    test_suite.del_test("deep_tests/package.py::DeepTestCase::test_thingamajig")
+    test_suite.del_test("deep_tests/package.py::DeepTestCase::test_doo_hickey")
+    assert test_suite.test_count == 4
+    assert test_suite.active_count == 4
+    assert test_suite.count_tests(status=[CTMethod.STATUS_PASS]) == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_active_state():
+    "The active state of a node is derived from the tests below it"
+    test_suite = PTSuite()
+    test_suite.refresh(
+        [
+            "tests.py::test_method",
+            "deep_tests/package.py::test_deep_widget",
+            "deep_tests/package.py::DeepTestCase::test_doo_hickey",
+            "deep_tests/package.py::DeepTestCase::test_thingamajig",
+        ]
+    )
+    deep_tests = test_suite["deep_tests"]
+    package = deep_tests["package.py"]
+    test_case = package["DeepTestCase"]
+
+    # Deactivating a single test makes its ancestors partially active.
+    test_case["test_doo_hickey"].toggle_active()
+    assert not test_case["test_doo_hickey"].active
+    assert (test_case.active, test_case.partially_active) == (True, True)
+    assert (deep_tests.active, deep_tests.partially_active) == (True, True)
+    assert (test_suite.active, test_suite.partially_active) == (True, True)
+    assert test_suite["tests.py"].partially_active is False
+
+    # Deactivating the remaining test deactivates the test case...
+    test_case["test_thingamajig"].set_active(False)
+    assert (test_case.active, test_case.partially_active) == (False, False)
+    assert (package.active, package.partially_active) == (True, True)
+
+    # ... and toggling it re-activates every test in the test case.
+    test_case.toggle_active()
+    assert (test_case.active, test_case.partially_active) == (True, False)
+    assert test_case["test_doo_hickey"].active
+    assert test_case["test_thingamajig"].active
+
+    # Deactivating a subtree deactivates every test below it.
+    deep_tests.set_active(False)
+    assert test_suite.active_count == 1
+    assert not package["test_deep_widget"].active
+    assert not test_case["test_doo_hickey"].active
+    assert test_suite.find_tests() == (1, ["tests.py"])
+
+    # Toggling a partially active node activates everything.
+    test_case["test_doo_hickey"].set_active(True)
+    test_suite.toggle_active()
+    assert test_suite.active_count == 4
+    assert test_suite.find_tests() == (4, None)
+
+    # Toggling a fully active node deactivates everything.
+    test_suite.toggle_active()
+    assert test_suite.active_count == 0
+    assert test_suite.find_tests() == (0, [])
+
+
 @pytest.fixture
 def test_suite():
     suite = PTSuite()
@@ -191,6 +1070,82 @@ def test_suite():
     return suite
 
 
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_select_labels(test_suite):
+    "Labels are compiled into a tree of name components"
+    assert test_suite.select_labels(
+        [
+            "app2.py::TestCase2::test_method1",
+            "app6/package2/tests2.py::TestCase1",
+            "app6/package2",
+            "app6/package2/tests1.py::TestCase::test_method",
+            "app8/package2/subpackage2/tests2.py",
+        ]
+    ) == {
+        "app2.py": {"TestCase2": {"test_method1": None}},
+        "app6": {"package2": None},
+        "app8": {"package2": {"subpackage2": {"tests2.py": None}}},
+    }
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_find_selection(test_suite):
+    # Every test is selected.
+    assert test_suite.find_selection() == (23, None, [])
+
+    # When a few tests are deselected, it is cheaper to list the exclusions
+    # than the 13 labels needed to select the remaining tests.
+    test_suite.find_node("app2.py::TestCase2::test_method2").set_active(False)
+    test_suite.find_node("app6/package2/tests2.py").set_active(False)
+    test_suite.find_node("app8/package2/subpackage2/tests1.py").set_active(False)
+    count, labels = test_suite.find_tests()
+    assert (count, len(labels)) == (18, 13)
+    assert test_suite.find_selection() == (
+        18,
+        None,
+        [
+            "app2.py::TestCase2::test_method2",
+            "app6/package2/tests2.py",
+            "app8/package2/subpackage2/tests1.py",
+        ],
+    )
+
+    # Below the suite, the node's own label selects the tests that remain.
+    assert test_suite["app8"].find_selection() == (
+        5,
+        ["app8"],
+        ["app8/package2/subpackage2/tests1.py"],
+    )
+
+    # When the selected labels are the shorter list, they are used.
+    assert test_suite.find_selection(labels=["app6", "app8"]) == (
+        7,
+        [
+            "app6/package1",
+            "app6/package2/tests1.py",
+            "app8/package1",
+            "app8/package2/subpackage1",
+            "app8/package2/subpackage2/tests2.py",
+        ],
+        [],
+    )
+
+    test_suite.set_active(False)
+    test_suite.find_node("app3/tests.py::TestCase::test_method").set_active(True)
+    assert test_suite.find_selection() == (1, ["app3"], [])
+
+
+def test_unknown_labels(test_suite):
+    "Labels that don't match any test are ignored"
+    assert test_suite.find_tests(
+        labels=[
+            "app2.py::TestCase2::test_method1",
+            "app2.py::TestCase3::test_method",
+            "app9/tests.py",
+        ]
+    ) == (1, ["app2.py::TestCase2::test_method1"])
+
+
 @pytest.mark.parametrize(
     "label, expected",
     [
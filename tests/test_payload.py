@@ -0,0 +1,126 @@
+from cricket.payload import PayloadLog
+
+
+def test_append_and_read(tmp_path):
+    "Payloads are read back from the segment"
+    log = PayloadLog(tmp_path)
+    first = log.append("Some output")
+    second = log.append("Traceback: \N{SNOWMAN}")
+    empty = log.append("")
+
+    assert log.read(first) == "Some output"
+    assert log.read(second) == "Traceback: \N{SNOWMAN}"
+    assert log.read(empty) == ""
+
+    # Appending after a read remaps the segment.
+    third = log.append("More output")
+    assert log.read(third) == "More output"
+    assert log.read(first) == "Some output"
+    assert len(log) == 4
+    log.close()
+
+
+def test_empty_payloads(tmp_path):
+    "Empty output doesn't create a segment, or change its size"
+    log = PayloadLog(tmp_path)
+    stdout = log.append("")
+    stderr = log.append("")
+    assert log._file is None
+    assert list(tmp_path.iterdir()) == []
+    assert log.size == 0
+
+    first = log.append("Some output")
+    size = log.size
+    empty = log.append("")
+    assert log.size == size
+    log._file.seek(0, 2)
+    assert log._file.tell() == size
+
+    assert log.read(stdout) == log.read(stderr) == log.read(empty) == ""
+    assert log.read(first) == "Some output"
+    log.close()
+
+
+def test_release_and_compact(tmp_path):
+    "Compaction recovers the space of released records, without changing ids"
+    log = PayloadLog(tmp_path)
+    records = [log.append(f"payload {n}" * 10) for n in range(10)]
+    size = log.size
+
+    # Compaction doesn't do anything while most of the segment is in use.
+    log.release(records[0])
+    log.compact()
+    assert log.size == size
+
+    for record in records[1:8]:
+        log.release(record)
+    log.compact()
+    assert log.size == log.live_size == size * 2 // 10
+    assert log.read(records[8]) == "payload 8" * 10
+    assert log.read(records[9]) == "payload 9" * 10
+
+    # Released ids are reused.
+    assert log.append("new") in records[:8]
+    assert len(log) == 3
+    log.close()
+
+
+def test_interning(tmp_path):
+    "Identical payloads are only stored once"
+    log = PayloadLog(tmp_path)
+    traceback = "Traceback:\n  fixture broken\n"
+    first = log.append(traceback)
+    second = log.append(traceback)
+    other = log.append("Something else")
+
+    assert first == second
+    assert other != first
+    assert len(log) == 2
+    assert log.size == len(traceback) + len("Something else")
+    assert log.bytes_saved == len(traceback)
+
+    # The record is kept until every reference is released.
+    log.release(first)
+    assert log.read(second) == traceback
+    assert log.bytes_saved == 0
+    log.release(second)
+    assert len(log) == 1
+
+    # Once released, the payload is written again.
+    third = log.append(traceback)
+    assert log.read(third) == traceback
+    assert log.bytes_saved == 0
+    log.close()
+
+
+def test_near_duplicates(tmp_path):
+    "Payloads that only differ in addresses and timestamps are stored separately"
+    log = PayloadLog(tmp_path)
+    first = log.append("<Widget object at 0x7f3a2b1c4d50> at 2024-01-02 10:11:12.345")
+    second = log.append("<Widget object at 0x7f3a2b1c9e80> at 2024-01-02 10:11:13.001")
+    third = log.append("<Widget object at 0x7f3a2b1c9e80> at line 42")
+
+    assert len({first, second, third}) == 3
+    assert log.read(first).endswith("0x7f3a2b1c4d50> at 2024-01-02 10:11:12.345")
+    assert log.read(second).endswith("0x7f3a2b1c9e80> at 2024-01-02 10:11:13.001")
+    assert log.near_duplicates == 1
+
+    log.release(second)
+    assert log.near_duplicates == 0
+    log.close()
+
+
+def test_distinct_failures(tmp_path):
+    "Failures that differ in a time or a hex literal are read back as written"
+    log = PayloadLog(tmp_path)
+    payloads = [
+        "assert '10:00:00' == '10:00:01'",
+        "assert '23:59:58' == '00:00:00'",
+        "assert 0xDEADBEEF == 0x12345678",
+        "assert 0xCAFEBABE == 0x12345678",
+    ]
+    records = [log.append(payload) for payload in payloads]
+
+    assert [log.read(record) for record in records] == payloads
+    assert log.near_duplicates == 0
+    log.close()
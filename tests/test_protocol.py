@@ -0,0 +1,183 @@
+import asyncio
+import random
+import sys
+
+import pytest
+
+from cricket import protocol
+from cricket.executor import Executor
+from cricket.model import TestMethod as CTMethod
+from cricket.pytest.model import PyTestTestSuite as PTSuite
+
+
+def sample_messages(rng, count):
+    "A random stream of messages, as a test run would produce"
+    messages = []
+    for n in range(count):
+        path = f"tests/test_{n}.py::test_{rng.choice(['a', 'b', 'ümlaut'])}"
+        messages.append((protocol.TEST_START, {"path": path, "start_time": n}))
+        for _ in range(rng.randint(1, 3)):
+            output = "".join(
+                rng.choice('ab\n\x1e\x1f\x02\x03{}\\"\r é')
+                for _ in range(rng.randint(0, 200))
+            )
+            messages.append(
+                (
+                    protocol.TEST_RESULT,
+                    {
+                        "status": "OK",
+                        "end_time": n + 0.5,
+                        "description": path,
+                        "output": output,
+                    },
+                )
+            )
+    messages.append((protocol.RUN_END, {}))
+    return messages
+
+
+def encode_stream(messages):
+    return "".join(protocol.encode(kind, body) for kind, body in messages).encode(
+        "ascii"
+    )
+
+
+def split(rng, data):
+    "Split data into randomly sized chunks"
+    chunks = []
+    pos = 0
+    while pos < len(data):
+        size = rng.choice([1, 2, 7, 64, 1000, 65536])
+        chunks.append(data[pos : pos + size])
+        pos += size
+    return chunks
+
+
+def parse(chunks):
+    parser = protocol.FrameParser()
+    messages = []
+    for chunk in chunks:
+        messages.extend(parser.feed(chunk))
+    return parser, messages
+
+
+def test_encode():
+    frame = protocol.encode(protocol.TEST_START, {"path": "ä"})
+    assert frame == '\x1eS18\n{"path": "\\u00e4"}'
+    assert protocol.encode(protocol.RUN_END) == "\x1eE0\n"
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_chunking(seed):
+    "The messages parsed don't depend on how the stream is split"
+    rng = random.Random(seed)
+    messages = sample_messages(rng, 50)
+    parser, parsed = parse(split(rng, encode_stream(messages)))
+
+    assert parsed == messages
+    assert parser.pending == 0
+    assert parser.unframed == b""
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_noise(seed):
+    "Output outside of frames is skipped"
+    rng = random.Random(seed)
+    messages = sample_messages(rng, 20)
+
+    data = b""
+    for kind, body in messages:
+        # Noise (that doesn't contain a frame marker) between frames.
+        noise = bytes(rng.choice(b"\x1b[?1034h\n\r\x00\xff{}Sx9") for _ in range(20))
+        data += noise + protocol.encode(kind, body).encode("ascii")
+
+    parser, parsed = parse(split(rng, data))
+    assert parsed == messages
+    assert parser.pending == 0
+    assert len(parser.unframed) == 20 * len(messages)
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_garbage(seed):
+    "Arbitrary input doesn't raise errors, or prevent later frames being parsed"
+    rng = random.Random(seed)
+    alphabet = b'\x1eSRE0123456789\n\r{}":ab'
+    garbage = bytes(rng.choice(alphabet) for _ in range(rng.randint(0, 2000)))
+    messages = sample_messages(rng, 5)
+
+    parser = protocol.FrameParser()
+    for chunk in split(rng, garbage):
+        parser.feed(chunk)
+    # Whatever state the garbage has left, a valid stream is recovered once
+    # any partial frame is complete.
+    parsed = []
+    for chunk in split(rng, encode_stream(messages) * 3):
+        parsed.extend(parser.feed(chunk))
+    assert parsed[-len(messages) :] == messages
+
+
+def test_truncated():
+    "A frame that is incomplete is retained, and not reported"
+    data = encode_stream([(protocol.TEST_START, {"path": "a"}), (protocol.RUN_END, {})])
+
+    parser = protocol.FrameParser()
+    assert parser.feed(data[:-3]) == [(protocol.TEST_START, {"path": "a"})]
+    assert parser.pending == len(data) - 3 - len(b'\x1eS13\n{"path": "a"}')
+    assert parser.feed(data[-3:]) == [(protocol.RUN_END, {})]
+    assert parser.pending == 0
+
+
+def test_windows_newlines():
+    data = protocol.encode(protocol.TEST_START, {"path": "a"}).replace("\n", "\r\n")
+    assert protocol.FrameParser().feed(data.encode("ascii")) == [
+        (protocol.TEST_START, {"path": "a"})
+    ]
+
+
+class ReplaySuite(PTSuite):
+    "A test suite that replays recorded output instead of running tests."
+
+    def __init__(self, output):
+        super().__init__()
+        self.output = output
+
+    def execute_commandline(self, labels, labels_file=None):
+        return ["cat", str(self.output)]
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses cat")
+def test_large_output(tmp_path):
+    "Tests that produce a lot of output are handled"
+    output = "".join(f"line {n}\n" for n in range(200_000))
+    messages = [
+        (protocol.TEST_START, {"path": "test_big.py::test_big", "start_time": 1}),
+        (
+            protocol.TEST_RESULT,
+            {
+                "status": "OK",
+                "end_time": 2,
+                "description": "big",
+                "output": output,
+            },
+        ),
+        (protocol.TEST_START, {"path": "test_big.py::test_small", "start_time": 2}),
+        (
+            protocol.TEST_RESULT,
+            {"status": "F", "end_time": 3, "description": "small", "error": "bad"},
+        ),
+        (protocol.RUN_END, {}),
+    ]
+    stream = tmp_path / "stream"
+    stream.write_bytes(encode_stream(messages))
+
+    suite = ReplaySuite(stream)
+    executor = Executor(suite)
+    asyncio.run(executor.run(2, None))
+
+    big = suite.find_node("test_big.py::test_big")
+    assert big.status == CTMethod.STATUS_PASS
+    assert big.output == output
+    assert big.duration == 1
+    assert suite.find_node("test_big.py::test_small").status == CTMethod.STATUS_FAIL
+    assert executor.completed_count == 2
+    suite.close()
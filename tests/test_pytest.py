@@ -1,11 +1,14 @@
-import json
+import asyncio
 import os
 import subprocess
 import sys
+import time
 from pathlib import Path
 
 import pytest
 
+from cricket import protocol
+from cricket.executor import INTERRUPTED, TIMED_OUT, Executor
 from cricket.model import (
     TestCase as CTCase,
 )
@@ -117,18 +120,16 @@ def execute(*args, success=True):
 
     found = set()
     results = {}
-    for line in runner.stdout.decode("utf-8").split("\n"):
-        try:
-            payload = json.loads(line)
-            if "path" in payload:
-                found.add(payload["path"])
-            elif "status" in payload:
-                count = results.setdefault(payload["status"], 0)
-                results[payload["status"]] = count + 1
-            else:
-                pytest.fail(f"Unknown payload line: '{payload}'")
-        except json.JSONDecodeError:
-            pass
+    messages = protocol.FrameParser().feed(runner.stdout)
+    assert messages[-1] == (protocol.RUN_END, {})
+    for kind, payload in messages[:-1]:
+        if kind == protocol.TEST_START:
+            found.add(payload["path"])
+        elif kind == protocol.TEST_RESULT:
+            count = results.setdefault(payload["status"], 0)
+            results[payload["status"]] = count + 1
+        else:
+            pytest.fail(f"Unexpected message: {kind} '{payload}'")
 
     return found, results
 
@@ -395,3 +396,177 @@ def test_join_module(sample_suite):
 def test_join_submodule(sample_suite):
     suite = PTSuite()
     assert suite.join_path(suite, CTModule, "tests") == "tests"
+
+
+def test_run_sharded(sample_suite):
+    suite = PTSuite()
+    runner = subprocess.run(
+        suite.discover_commandline(),
+        stdin=None,
+        capture_output=True,
+        shell=False,
+        check=True,
+    )
+    suite.refresh(runner.stdout.decode("utf-8").split())
+
+    count, labels = suite.find_tests()
+    executor = Executor(suite, workers=3)
+    asyncio.run(executor.run(count, labels))
+    suite.close()
+
+    # The results of every worker are merged into the suite.
+    assert len(executor.procs) == 3
+    assert executor.completed_count == count == 51
+    assert sum(executor.result_count.values()) == 51
+    assert executor.result_count[CTMethod.STATUS_PASS] == 39
+    assert all(test.status != CTMethod.STATUS_UNKNOWN for test in suite._tests.values())
+
+
+def test_run_labels_file(tmp_path, monkeypatch):
+    "Labels that need quoting, and large numbers of labels, are passed to pytest"
+    (tmp_path / "pyproject.toml").write_text("[tool.pytest.ini_options]\n")
+    (tmp_path / "test_params.py").write_text(
+        "import pytest\n"
+        "\n"
+        "@pytest.mark.parametrize('value', ['a b', 'c[d]', \"e'f\", '$HOME'])\n"
+        "def test_quoting(value):\n"
+        "    pass\n"
+        "\n"
+        "@pytest.mark.parametrize('value', range(2000))\n"
+        "def test_many(value):\n"
+        "    pass\n"
+    )
+    (tmp_path / "test_other.py").write_text("def test_other():\n    pass\n")
+    monkeypatch.chdir(tmp_path)
+
+    suite = PTSuite()
+    labels = [
+        "test_params.py::test_quoting[a b]",
+        "test_params.py::test_quoting[c[d]]",
+        "test_params.py::test_quoting[e'f]",
+        "test_params.py::test_quoting[$HOME]",
+        # Module labels aren't expanded into the tests they contain.
+        "test_other.py",
+    ] + [f"test_params.py::test_many[{n}]" for n in range(0, 2000, 2)]
+    executor = Executor(suite)
+    asyncio.run(executor.run(len(labels), labels))
+    suite.close()
+
+    assert executor.completed_count == len(labels)
+    assert executor.result_count == {CTMethod.STATUS_PASS: len(labels)}
+    assert set(suite._tests) == {
+        label if label != "test_other.py" else "test_other.py::test_other"
+        for label in labels
+    }
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses signals")
+def test_run_timeout(tmp_path, monkeypatch):
+    "A test that hangs is stopped, with a stack dump, and the run continues"
+    (tmp_path / "pyproject.toml").write_text("[tool.pytest.ini_options]\n")
+    (tmp_path / "test_hang.py").write_text(
+        "import time\n"
+        "\n"
+        "def test_before():\n"
+        "    pass\n"
+        "\n"
+        "def test_hang():\n"
+        "    time.sleep(60)\n"
+        "\n"
+        "def test_after():\n"
+        "    pass\n"
+    )
+    monkeypatch.chdir(tmp_path)
+
+    suite = PTSuite()
+    executor = Executor(suite, timeout=1)
+    start = time.monotonic()
+    asyncio.run(executor.run(3, None))
+
+    assert time.monotonic() - start < 30
+    assert len(executor.procs) == 2
+    assert executor.result_count == {
+        CTMethod.STATUS_PASS: 2,
+        CTMethod.STATUS_ERROR: 1,
+    }
+    hang = suite.find_node("test_hang.py::test_hang")
+    assert hang.error.startswith(TIMED_OUT.format(timeout=1))
+    assert 'test_hang.py", line 7 in test_hang' in hang.error
+    assert suite.find_node("test_hang.py::test_after").status == CTMethod.STATUS_PASS
+    suite.close()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses POSIX paths")
+def test_run_deselected(sample_suite):
+    "Tests can be excluded from a run, rather than listing the tests to run"
+    suite = PTSuite()
+    runner = subprocess.run(
+        suite.discover_commandline(),
+        stdin=None,
+        capture_output=True,
+        shell=False,
+        check=True,
+    )
+    suite.refresh(runner.stdout.decode("utf-8").split())
+    suite.find_node("tests/test_unusual.py").set_active(False)
+    suite.find_node("tests/units/test_unusual.py::UnusualTests").set_active(False)
+    suite.find_node("tests/test_outcomes.py::test_failing_item").set_active(False)
+
+    count, labels, deselected = suite.find_selection()
+    assert (count, labels) == (28, None)
+    assert deselected == [
+        "tests/test_outcomes.py::test_failing_item",
+        "tests/test_unusual.py",
+        "tests/units/test_unusual.py",
+    ]
+
+    executor = Executor(suite, workers=2)
+    asyncio.run(executor.run(count, labels, deselected))
+    suite.close()
+
+    assert executor.completed_count == 28
+    assert suite.find_node("tests/test_unusual.py::test_slow_0").status is None
+    assert suite.find_node("tests/test_outcomes.py::test_failing_item").status is None
+    assert (
+        suite.find_node("tests/test_outcomes.py::test_passing_item").status
+        == CTMethod.STATUS_PASS
+    )
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Test uses process groups")
+def test_stop_sharded(sample_suite):
+    "Every worker stops promptly, and the results so far are kept"
+    suite = PTSuite()
+    runner = subprocess.run(
+        suite.discover_commandline(),
+        stdin=None,
+        capture_output=True,
+        shell=False,
+        check=True,
+    )
+    suite.refresh(runner.stdout.decode("utf-8").split())
+    count, labels = suite.find_tests()
+    executor = Executor(suite, workers=3)
+
+    async def run_and_stop():
+        run = asyncio.create_task(executor.run(count, labels))
+        await asyncio.sleep(1.5)
+        start = time.monotonic()
+        await executor.terminate(timeout=2)
+        await run
+        return time.monotonic() - start
+
+    elapsed = asyncio.run(run_and_stop())
+
+    assert elapsed < 5
+    assert len(executor.procs) == 3
+    assert all(proc.returncode is not None for proc in executor.procs)
+    assert 0 < executor.completed_count < count
+
+    # Every test that started has a result; those that were running
+    # when the run was stopped are errors.
+    statuses = [test.status for test in suite._tests.values()]
+    assert statuses.count(CTMethod.STATUS_UNKNOWN) == count - executor.completed_count
+    interrupted = [test for test in suite._tests.values() if test.error == INTERRUPTED]
+    assert 1 <= len(interrupted) <= 3
+    suite.close()
@@ -0,0 +1,52 @@
+import random
+
+from cricket.ranking import Ranking
+
+
+def test_ranking():
+    "Items are ranked by their key, largest first"
+    ranking = Ranking()
+    ranking.update("a", 1.0)
+    ranking.update("b", 3.0)
+    ranking.update("c", 2.0)
+    ranking.update("d", 2.0)
+
+    assert len(ranking) == 4
+    assert ranking.top(2) == ["b", ranking.top(2)[1]]
+    assert set(ranking.top(3)[1:]) == {"c", "d"}
+    assert ranking.top(10)[-1] == "a"
+    assert ranking.top(0) == []
+
+    # Updating a key moves the item.
+    ranking.update("a", 5.0)
+    ranking.update("b", 0.5)
+    assert ranking.top(1) == ["a"]
+    assert ranking.top(10)[-1] == "b"
+    assert len(ranking) == 4
+
+    # Items can be removed.
+    ranking.discard("a")
+    ranking.discard("missing")
+    assert "a" not in ranking
+    assert len(ranking) == 3
+    assert ranking.top(10)[-1] == "b"
+
+
+def test_ranking_matches_sort():
+    "The top items always match a full sort"
+    rng = random.Random(42)
+    ranking = Ranking(size=5)
+    keys = {}
+    for _ in range(2000):
+        item = rng.randrange(30)
+        if rng.random() < 0.1:
+            ranking.discard(item)
+            keys.pop(item, None)
+        else:
+            key = rng.choice([rng.random(), 0.5])
+            ranking.update(item, key)
+            keys[item] = key
+
+        expected = sorted(keys.values(), reverse=True)[:5]
+        assert [keys[item] for item in ranking.top(5)] == expected
+        assert len(ranking) == len(keys)
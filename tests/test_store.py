@@ -0,0 +1,40 @@
+from cricket.model import TestMethod as CTMethod
+from cricket.store import ResultStore
+
+
+def test_round_trip(tmp_path):
+    "Results are persisted between sessions"
+    store = ResultStore(tmp_path / "results.sqlite3")
+    store.record("tests.py::test_a", CTMethod.STATUS_PASS, 0.5, "A", "out", None)
+    store.record("tests.py::test_b", CTMethod.STATUS_FAIL, 1.5, "B", None, "Broken")
+    store.close()
+
+    store = ResultStore(tmp_path / "results.sqlite3")
+    assert store.get("tests.py::test_a") == (
+        CTMethod.STATUS_PASS,
+        0.5,
+        "A",
+        "out",
+        None,
+    )
+    assert store.get("tests.py::test_c") is None
+    assert store.get_many(["tests.py::test_b", "tests.py::test_c"]) == {
+        "tests.py::test_b": (CTMethod.STATUS_FAIL, 1.5, "B", None, "Broken"),
+    }
+
+
+def test_batching(tmp_path):
+    "Results are written once a batch is complete, or when flushed"
+    path = tmp_path / "results.sqlite3"
+    store = ResultStore(path, batch_size=2)
+    reader = ResultStore(path)
+
+    store.record("tests.py::test_a", CTMethod.STATUS_PASS, 0.5, "", None, None)
+    assert reader.get("tests.py::test_a") is None
+
+    store.record("tests.py::test_b", CTMethod.STATUS_PASS, 0.5, "", None, None)
+    assert reader.get("tests.py::test_a") is not None
+
+    store.record("tests.py::test_a", CTMethod.STATUS_ERROR, 0.1, "", None, "Error")
+    store.flush()
+    assert reader.get("tests.py::test_a")[0] == CTMethod.STATUS_ERROR
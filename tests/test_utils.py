@@ -1,7 +1,8 @@
 import pytest
 
-from cricket.executor import parse_status_and_error
+from cricket.executor import parse_status_and_error, plan_shards
 from cricket.model import TestMethod as CTMethod
+from cricket.pytest.model import PyTestTestSuite as PTSuite
 
 
 @pytest.mark.parametrize(
@@ -56,3 +57,111 @@ def test_error_not_returned(error_code):
         }
     )
     assert error is None
+
+
+def shard_suite():
+    suite = PTSuite()
+    suite.refresh(
+        [f"tests/test_fast.py::test_{i}" for i in range(10)]
+        + [f"tests/test_slow.py::test_{i}" for i in range(4)]
+        + ["tests/test_new.py::test_new"]
+    )
+    for i in range(10):
+        suite.find_node(f"tests/test_fast.py::test_{i}").set_result(
+            description="",
+            status=CTMethod.STATUS_PASS,
+            output="",
+            error="",
+            duration=0.1,
+        )
+    for i in range(4):
+        suite.find_node(f"tests/test_slow.py::test_{i}").set_result(
+            description="",
+            status=CTMethod.STATUS_PASS,
+            output="",
+            error="",
+            duration=2.0,
+        )
+    return suite
+
+
+def shard_tests(suite, shard):
+    "The paths of the tests that will be run by a shard"
+    return [
+        path
+        for label in shard
+        for path in suite._tests
+        if path == label or path.startswith((f"{label}/", f"{label}::"))
+    ]
+
+
+def shard_load(suite, shard):
+    # Tests without a duration are expected to take the average time.
+    average = suite.duration / 14
+    durations = [suite.find_node(path).duration for path in shard_tests(suite, shard)]
+    return sum(average if duration is None else duration for duration in durations)
+
+
+def test_plan_shards_single_worker():
+    suite = shard_suite()
+    assert plan_shards(suite, None, 1) == [None]
+    assert plan_shards(suite, ["tests"], 1) == [["tests"]]
+
+
+def test_plan_shards_balanced():
+    suite = shard_suite()
+    shards = plan_shards(suite, None, 2)
+
+    assert len(shards) == 2
+    # Every test is in exactly one shard.
+    covered = sorted(path for shard in shards for path in shard_tests(suite, shard))
+    assert covered == sorted(suite._tests)
+
+    # The slow tests are split evenly between the shards
+    loads = [shard_load(suite, shard) for shard in shards]
+    assert abs(loads[0] - loads[1]) <= 0.2
+
+
+def test_plan_shards_labels():
+    suite = shard_suite()
+    labels = ["tests/test_slow.py", "tests/test_new.py::test_new", "missing"]
+    shards = plan_shards(suite, labels, 3)
+
+    # Labels are split down to the individual slow tests; labels that
+    # can't be found are kept as they are.
+    assert sorted(label for shard in shards for label in shard) == [
+        "missing",
+        "tests/test_new.py::test_new",
+        "tests/test_slow.py::test_0",
+        "tests/test_slow.py::test_1",
+        "tests/test_slow.py::test_2",
+        "tests/test_slow.py::test_3",
+    ]
+    assert len(shards) == 3
+    assert sorted(len(shard) for shard in shards) == [2, 2, 2]
+
+
+def test_plan_shards_balanced_labels():
+    "Labels that are already balanced aren't split"
+    suite = PTSuite()
+    suite.refresh(
+        [f"tests/test_{m}.py::test_{n}" for m in range(10) for n in range(100)]
+    )
+    for test in suite._tests.values():
+        test.set_result(
+            description="",
+            status=CTMethod.STATUS_PASS,
+            output="",
+            error="",
+            duration=0.01,
+        )
+
+    labels = [f"tests/test_{m}.py" for m in range(10)]
+    for shards in [plan_shards(suite, labels, 2), plan_shards(suite, None, 2)]:
+        assert sorted(label for shard in shards for label in shard) == labels
+        assert sorted(len(shard) for shard in shards) == [5, 5]
+
+
+def test_plan_shards_empty_suite():
+    suite = PTSuite()
+    assert plan_shards(suite, None, 4) == [None]
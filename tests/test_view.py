@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+from cricket import view
+from cricket.model import TestMethod as CTMethod
+from cricket.model import TestSuiteSearch as CTSearch
+from cricket.pytest.model import PyTestTestSuite as PTSuite
+from cricket.store import ResultStore
+
+
+def widget():
+    "A stand-in for a widget, with the attributes the details pane uses"
+    return SimpleNamespace(text="", value="", style=SimpleNamespace())
+
+
+def details_pane():
+    "A stand-in for the app, with just the widgets of the details pane"
+    return SimpleNamespace(
+        _update_selection_summary=lambda: None,
+        executor=None,
+        run_selected_command=widget(),
+        **{
+            name: widget()
+            for name in [
+                "status_label",
+                "name_view",
+                "duration_view",
+                "history_view",
+                "description_view",
+                "output_view",
+                "error_view",
+                "error_box",
+                "output_box",
+            ]
+        },
+    )
+
+
+def test_select_stored_result(tmp_path):
+    "A test with a result from the result store can be selected"
+    store = ResultStore(tmp_path / "results.sqlite3")
+    store.record("tests.py::test_a", CTMethod.STATUS_FAIL, 1.5, "A", "out", "Broken")
+    store.flush()
+
+    suite = PTSuite()
+    suite.store = store
+    suite.refresh(["tests.py::test_a"])
+    test = suite.find_node("tests.py::test_a")
+
+    # Selecting a test loads its stored result, if it hasn't been loaded.
+    assert not test.result_loaded
+
+    app = details_pane()
+    view.Cricket.on_test_selected(app, SimpleNamespace(selection=[test]))
+
+    assert app.name_view.value == "tests.py::test_a"
+    assert app.duration_view.value == "1.50s"
+    assert app.history_view.value == "F (1.50s - 1.50s)"
+    assert app.error_view.value == "Broken"
+    assert app.output_view.value == "out"
+    suite.close()
+
+
+class TreeStub:
+    "A stand-in for a tree widget, that records when it is expanded"
+
+    def __init__(self, data):
+        self.data = data
+        self.expanded = False
+
+    def expand(self):
+        self.expanded = True
+
+
+@pytest.mark.parametrize(
+    "query, expanded",
+    [
+        ("test_1", True),
+        ("test_", False),
+    ],
+)
+def test_search_expansion(monkeypatch, query, expanded):
+    "Search results are only expanded when there aren't too many of them"
+    monkeypatch.setattr(view, "MAX_EXPANDED_MATCHES", 20)
+    suite = PTSuite()
+    suite.put_tests(f"tests.py::test_{n}" for n in range(100))
+    app = SimpleNamespace(
+        test_suite=suite,
+        search_results=CTSearch(suite),
+        all_tests_tree=TreeStub(suite),
+    )
+
+    view.Cricket.on_search(app, SimpleNamespace(value=query))
+    assert app.all_tests_tree.data is app.search_results
+    assert app.all_tests_tree.expanded == expanded
+    suite.close()